@@ -0,0 +1,56 @@
+"""
+Cost of serving /apispec_1.json: flasgger (docstrings parsed on the first
+request of each worker, the spec serialized on every request) against the
+prebuilt spec (API_SPEC_FILE, bytes in memory with an ETag), and a client that
+polls with If-None-Match.
+
+Usage:
+    set -a && source .env && set +a && python -m benchmarks.apispec_serving [requests]
+"""
+
+import sys
+import time
+
+from questrya.common.apispec import DEFAULT_SPEC_FILE, PrebuiltApiSpec
+from questrya.factory import create_app
+
+
+def timed_get(client, headers=None) -> tuple:
+    started = time.perf_counter()
+    response = client.get('/apispec_1.json', headers=headers or {})
+    return (time.perf_counter() - started) * 1000, response
+
+
+def run_first(label: str, client):
+    first_ms, response = timed_get(client)
+    print(f'{label:>34}: {first_ms * 1000:8.1f} us ({len(response.data)} bytes)')
+    return response
+
+
+def run(label: str, client, requests: int, headers=None) -> None:
+    timings = sorted(timed_get(client, headers)[0] for _ in range(requests))
+    print(
+        f'{label:>34}: {timings[len(timings) // 2] * 1000:8.1f} us per request (median)'
+    )
+
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    app = create_app()
+    client = app.test_client()
+    run_first('flasgger, first request', client)
+    run('flasgger, next requests', client, requests)
+
+    app = create_app()
+    app.config['API_SPEC_FILE'] = DEFAULT_SPEC_FILE
+    PrebuiltApiSpec().init_app(app)
+    client = app.test_client()
+    response = run_first('prebuilt, first request', client)
+    run('prebuilt, next requests', client, requests)
+    run(
+        'prebuilt, If-None-Match (304)',
+        client,
+        requests,
+        headers={'If-None-Match': response.headers['ETag']},
+    )
@@ -0,0 +1,94 @@
+"""
+Concurrent signup stress test, before and after the one-query registration.
+
+Several threads POST /api/users/user at the same time, and every user is
+signed up by more than one thread (so most requests are duplicates racing
+each other). It prints the status codes and the latency of each flow:
+- "before": the previous register_user (get_by_email, then save);
+- "after": the current register_user (one insert, conflicts mapped to 400).
+
+It needs the local Postgres from docker-compose.yml (make dev-infra-start)
+with the migrations applied. Every user created here is deleted at the end.
+bcrypt runs with the minimum cost here, so it does not hide the database time.
+
+Usage:
+    set -a && source .env && set +a
+    python -m benchmarks.concurrent_signup [users] [attempts_per_user] [threads]
+"""
+
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from uuid import uuid4
+
+from questrya.extensions import db, password_hasher
+from questrya.factory import create_app
+from questrya.sql_db.models import UserSQLModel
+from questrya.users.domain import User
+from questrya.users.repository import UserRepository
+from questrya.users.routes import user_service
+
+
+def legacy_register_user(username, email, password) -> User:
+    if UserRepository.get_by_email(email):
+        raise ValueError(f'Email already registered ({email})')
+    return UserRepository.save(
+        user=User(username=username, email=email, password=password)
+    )
+
+
+def run(app, label: str, users: int, attempts_per_user: int, threads: int) -> None:
+    prefix = f'bench-{uuid4().hex[:8]}'
+    payloads = [
+        json.dumps(
+            {
+                'username': f'{prefix}-{index}',
+                'email': f'{prefix}-{index}@bench.questrya.dev',
+                'password': 'password123',
+            }
+        )
+        for index in range(users)
+        for _ in range(attempts_per_user)
+    ]
+
+    def signup(payload):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post(
+            '/api/users/user', data=payload, content_type='application/json'
+        )
+        return response.status_code, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(signup, payloads))
+
+    statuses = Counter(status for status, _ in results)
+    latencies = sorted(elapsed * 1000 for _, elapsed in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f'{label:>7}: {dict(sorted(statuses.items()))}'
+        f' | p50 {statistics.median(latencies):6.2f} ms | p95 {p95:6.2f} ms'
+    )
+
+    with app.app_context():
+        UserSQLModel.query.filter(UserSQLModel.username.like(f'{prefix}-%')).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+
+if __name__ == '__main__':
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    attempts_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    app = create_app()
+    password_hasher.configure(workers=0, queue_size=threads, rounds=4)
+
+    with patch.object(user_service, 'register_user', side_effect=legacy_register_user):
+        run(app, 'before', users, attempts_per_user, threads)
+    run(app, 'after', users, attempts_per_user, threads)
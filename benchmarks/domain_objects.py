@@ -0,0 +1,111 @@
+"""
+Memory per 1M objects and construction throughput of the User/Email domain objects.
+
+"before" are dict-backed copies of the previous User and Email (re.match with
+the regex string on every Email), kept here only for comparison. "after" are
+the current slotted classes, built the way the repository and the bulk jobs
+build them (Email() validating, Email.from_trusted and User.from_trusted).
+
+It needs no database.
+
+Usage:
+    python -m benchmarks.domain_objects [objects]
+"""
+
+import gc
+import re
+import sys
+import time
+import tracemalloc
+from datetime import UTC, datetime
+from uuid import uuid4
+
+from questrya.common.value_objects.email import Email
+from questrya.users.domain import User
+
+
+class DictEmail:
+    EMAIL_REGEX = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
+
+    def __init__(self, address: str):
+        if not re.match(DictEmail.EMAIL_REGEX, address):
+            raise ValueError(address)
+        self._address = address.lower()
+
+
+class DictUser:
+    def __init__(
+        self, uuid, username, email, password_hash, created_at, last_updated_at
+    ):
+        self.uuid = uuid
+        self.username = username
+        self.email = email
+        self.password_hash = password_hash
+        self.created_at = created_at
+        self.last_updated_at = last_updated_at
+
+
+def measure(name: str, build, count: int):
+    gc.collect()
+    started = time.perf_counter()
+    objects = [build(index) for index in range(count)]
+    elapsed = time.perf_counter() - started
+
+    # the same objects again, traced (tracemalloc slows the construction down)
+    del objects
+    gc.collect()
+    tracemalloc.start()
+    objects = [build(index) for index in range(count)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+
+    print(
+        f'{name:<40} | {count / elapsed:>12,.0f} objects/s '
+        f'| {allocated / count * 1_000_000 / 1024 / 1024:>8,.1f} MiB per 1M objects'
+    )
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    addresses = [f'crew-member-{index}@enterprise.org' for index in range(count)]
+    repeated_addresses = [
+        f'crew-member-{index % 1000}@enterprise.org' for index in range(count)
+    ]
+    uuids = [uuid4() for _ in range(count)]
+    now = datetime.now(UTC).replace(tzinfo=None)
+
+    measure('before: Email (dict, re.match)', lambda i: DictEmail(addresses[i]), count)
+    measure('after:  Email (slots, compiled)', lambda i: Email(addresses[i]), count)
+    measure(
+        'after:  Email.from_trusted', lambda i: Email.from_trusted(addresses[i]), count
+    )
+    measure(
+        'before: Email, 1k distinct addresses',
+        lambda i: DictEmail(repeated_addresses[i]),
+        count,
+    )
+    measure(
+        'after:  Email(intern=True), 1k distinct',
+        lambda i: Email(repeated_addresses[i], intern=True),
+        count,
+    )
+    measure(
+        'before: User (dict)',
+        lambda i: DictUser(
+            uuids[i], f'crew-{i}', DictEmail(addresses[i]), 'hash', now, now
+        ),
+        count,
+    )
+    measure(
+        'after:  User.from_trusted (slots)',
+        lambda i: User.from_trusted(
+            uuid=uuids[i],
+            username=f'crew-{i}',
+            email=Email.from_trusted(addresses[i]),
+            password_hash='hash',
+            created_at=now,
+            last_updated_at=now,
+        ),
+        count,
+    )
@@ -0,0 +1,229 @@
+"""
+Load test of the gunicorn sizing (workers x threads), behind the defaults of
+gunicorn_settings.py.
+
+For each sizing, it starts gunicorn with gunicorn_settings.py on a free port,
+then several client threads send a mix of requests for a few seconds:
+- GET /api/monitor/liveness (no dependency, the framework overhead);
+- GET /api/users/user with an access token (jwt + one database read; it answers
+  500 for now, failing to serialize the Email after the read);
+- POST /api/users/user (a signup: bcrypt, on the password hasher pool, + one insert).
+It prints the throughput, the p50/p95/p99 latency, the errors and the RSS of
+the gunicorn processes (master + workers + password hasher pools).
+
+It needs the local Postgres from docker-compose.yml (make dev-infra-start)
+with the migrations applied. Every user created here is deleted at the end.
+bcrypt runs with the minimum cost here, so it does not hide the other layers.
+
+Usage:
+    set -a && source .env && set +a
+    python -m benchmarks.gunicorn_sizing [seconds] [clients] [workers:threads ...]
+"""
+
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from uuid import uuid4
+
+from flask_jwt_extended import create_access_token
+
+from gunicorn_settings import SIZING
+from questrya.extensions import db
+from questrya.factory import create_app
+from questrya.sql_db.models import UserSQLModel
+from questrya.users.domain import User
+from questrya.users.repository import UserRepository
+
+DEFAULT_SIZINGS = ['1:1', '1:4', '1:16', '3:1', '3:4', '3:16', '6:4']
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_rss_mb(pid: int) -> float:
+    """RSS of the process and of its children, from /proc."""
+    pids = [pid]
+    rss_pages = 0
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f'/proc/{current}/statm', encoding='utf-8') as statm:
+                rss_pages += int(statm.read().split()[1])
+            with open(
+                f'/proc/{current}/task/{current}/children', encoding='utf-8'
+            ) as children:
+                pids.extend(int(child) for child in children.read().split())
+        except OSError:
+            continue
+    return rss_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def start_gunicorn(
+    port: int, workers: int, threads: int, **extra_env
+) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_THREADS=str(threads),
+        PASSWORD_HASHER_ROUNDS='4',
+        **extra_env,
+    )
+    server = subprocess.Popen(
+        [
+            'gunicorn',
+            '-c',
+            'gunicorn_settings.py',
+            'questrya:app',
+            '-b',
+            f'127.0.0.1:{port}',
+            '--log-level',
+            'WARNING',
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(
+                f'http://127.0.0.1:{port}/api/monitor/liveness', timeout=1
+            )
+            return server
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(
+        f'gunicorn did not start with {workers} workers x {threads} threads'
+    )
+
+
+def run(
+    port: int, label: str, seconds: float, clients: int, token: str, prefix: str
+) -> None:
+    base_url = f'http://127.0.0.1:{port}'
+    requests = count()
+    signups = count()
+
+    def build_request() -> urllib.request.Request:
+        kind = next(requests) % 4
+        if kind in (0, 1):
+            return urllib.request.Request(f'{base_url}/api/monitor/liveness')
+        if kind == 2:
+            return urllib.request.Request(
+                f'{base_url}/api/users/user',
+                headers={'Authorization': f'Bearer {token}'},
+            )
+        number = next(signups)
+        payload = {
+            'username': f'{prefix}-{number}',
+            'email': f'{prefix}-{number}@bench.questrya.dev',
+            'password': 'password123',
+        }
+        return urllib.request.Request(
+            f'{base_url}/api/users/user',
+            data=json.dumps(payload).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+
+    def client(_):
+        results = []
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(build_request(), timeout=30) as response:
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except (urllib.error.URLError, OSError):
+                status = 'error'
+            results.append((status, time.perf_counter() - started))
+        return results
+
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = [
+            result
+            for client_results in executor.map(client, range(clients))
+            for result in client_results
+        ]
+
+    statuses = Counter(status for status, _ in results)
+    latencies = sorted(elapsed * 1000 for _, elapsed in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f'{label:>14}: {len(results) / seconds:7.1f} req/s'
+        f' | p50 {statistics.median(latencies):7.2f} ms'
+        f' | p95 {p95:7.2f} ms | p99 {p99:7.2f} ms'
+        f' | {dict(sorted(statuses.items(), key=str))}',
+        end='',
+    )
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    sizings = sys.argv[3:] or DEFAULT_SIZINGS
+
+    print(
+        f'Defaults here: {SIZING["workers"]} workers (by {SIZING["workers_source"]})'
+        f' x {SIZING["threads"]} threads,'
+        f' for {SIZING["cpus"]} cpus ({SIZING["cpus_source"]})'
+        f' and {SIZING["memory_mb"]}MB ({SIZING["memory_source"]})'
+    )
+    print(
+        f'{clients} clients for {seconds:g}s per sizing, '
+        '50% liveness / 25% get user / 25% signup'
+    )
+
+    app = create_app()
+    prefix = f'bench-{uuid4().hex[:8]}'
+    with app.app_context():
+        user = UserRepository.save(
+            user=User(
+                username=f'{prefix}-reader',
+                email=f'{prefix}-reader@bench.questrya.dev',
+                password='password123',
+            )
+        )
+        token = create_access_token(identity=str(user.uuid))
+
+    try:
+        for sizing in sizings:
+            workers, threads = (int(value) for value in sizing.split(':'))
+            port = get_free_port()
+            server = start_gunicorn(port, workers, threads)
+            try:
+                run(
+                    port,
+                    f'{workers}w x {threads:>2}t',
+                    seconds,
+                    clients,
+                    token,
+                    f'{prefix}-{workers}-{threads}',
+                )
+                print(f' | rss {get_rss_mb(server.pid):6.1f} MB')
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+    finally:
+        with app.app_context():
+            UserSQLModel.query.filter(UserSQLModel.username.like(f'{prefix}-%')).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
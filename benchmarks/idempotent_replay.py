@@ -0,0 +1,73 @@
+"""
+Latency of POST /api/users/user (a signup: bcrypt and an INSERT) against its retries
+with the same Idempotency-Key, replayed from the cache of the worker and from the
+database (e.g. when the retry reaches another worker).
+
+The users and keys it creates are deleted at the end.
+
+Usage (needs the local postgres):
+    set -a && source .env && set +a && python -m benchmarks.idempotent_replay [requests]
+"""
+
+import json
+import statistics
+import sys
+import time
+from uuid import uuid4
+
+from sqlalchemy import delete
+
+from questrya.extensions import db, idempotency_cache
+from questrya.factory import create_app
+from questrya.sql_db.models import IdempotencyKeySQLModel, UserSQLModel
+
+USERNAME_PREFIX = 'bench-idempotent-'
+
+
+def timed_post(client, key: str, number: int) -> float:
+    data = {
+        'username': f'{USERNAME_PREFIX}{number}',
+        'email': f'bench{number}@questrya.com',
+        'password': '12345678',
+    }
+    started = time.perf_counter()
+    response = client.post(
+        '/api/users/user',
+        data=json.dumps(data),
+        content_type='application/json',
+        headers={'Idempotency-Key': key},
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return elapsed
+
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    app = create_app()
+    client = app.test_client()
+    keys = [str(uuid4()) for _ in range(requests)]
+    timings = {
+        'first request': [],
+        'retry, from the cache': [],
+        'retry, from the database': [],
+    }
+    try:
+        for number, key in enumerate(keys):
+            timings['first request'].append(timed_post(client, key, number))
+            timings['retry, from the cache'].append(timed_post(client, key, number))
+            idempotency_cache.clear()
+            timings['retry, from the database'].append(timed_post(client, key, number))
+        for label, values in timings.items():
+            median = statistics.median(values)
+            print(f'{label:>26}: {median:8.2f} ms (median of {requests})')
+    finally:
+        with app.app_context():
+            db.session.execute(
+                delete(UserSQLModel).where(
+                    UserSQLModel.username.startswith(USERNAME_PREFIX)
+                )
+            )
+            db.session.execute(delete(IdempotencyKeySQLModel))
+            db.session.commit()
@@ -0,0 +1,90 @@
+"""
+Import time of the app ("import questrya" builds it), against a startup budget.
+
+Every gunicorn worker without the preload, every celery worker and every flask
+CLI command (migrations, shell, routes) pays it before doing anything. It runs
+"python -X importtime -c 'import questrya'" several times, on new processes,
+and prints:
+- the wall time of the import (median and best of the runs);
+- the packages that take the most of it (their own import time, summed up
+  per top level package, from the median run).
+
+It exits with 1 when the median is over the budget (STARTUP_BUDGET_MS, or the
+second argument), so it can run on CI. The budget has some headroom over the
+time measured when it was set, it is there to catch a new heavy import on the
+startup path (e.g. a library imported at the top of a module instead of inside
+the function that needs it).
+
+Usage:
+    set -a && source .env && set +a
+    python -m benchmarks.import_time [runs] [budget_ms]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+# Measured at ~890ms here with API_DOCS_ENABLED=false (1 cpu, warm page cache).
+STARTUP_BUDGET_MS = 1100
+IMPORT_SCRIPT = (
+    'import time; started = time.perf_counter(); '
+    'import questrya; print(time.perf_counter() - started)'
+)
+
+
+def measure(env: dict) -> tuple:
+    """(wall time of the import in ms, own import time in ms per top level package)."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    packages = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own_us, _, name = (
+            field.strip() for field in line[len('import time:') :].split('|')
+        )
+        packages[name.split('.')[0]] += int(own_us) / 1000
+    return float(result.stdout.strip().splitlines()[-1]) * 1000, packages
+
+
+def report(label: str, runs: int, env: dict) -> float:
+    measurements = sorted(
+        (measure(env) for _ in range(runs)), key=lambda measurement: measurement[0]
+    )
+    wall_times = [wall_ms for wall_ms, _ in measurements]
+    median_ms = statistics.median(wall_times)
+    print(
+        f'{label}: median {median_ms:7.1f} ms'
+        f' | best {wall_times[0]:7.1f} ms ({runs} runs)'
+    )
+    for package, own_ms in measurements[len(measurements) // 2][1].most_common(12):
+        print(f'  {package:<24} {own_ms:7.1f} ms')
+    return median_ms
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    budget_ms = (
+        float(sys.argv[2])
+        if len(sys.argv) > 2
+        else float(os.environ.get('STARTUP_BUDGET_MS', STARTUP_BUDGET_MS))
+    )
+
+    report('API_DOCS_ENABLED=true', runs, dict(os.environ, API_DOCS_ENABLED='true'))
+    median_ms = report(
+        'API_DOCS_ENABLED=false (production)',
+        runs,
+        dict(os.environ, API_DOCS_ENABLED='false'),
+    )
+
+    if median_ms > budget_ms:
+        print(f'Over the startup budget: {median_ms:.1f} ms > {budget_ms:.0f} ms')
+        sys.exit(1)
+    print(f'Within the startup budget: {median_ms:.1f} ms <= {budget_ms:.0f} ms')
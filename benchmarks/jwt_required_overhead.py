@@ -0,0 +1,53 @@
+"""
+Overhead of @jwt_required() on a request that carries the same access token
+over and over, with the verified-token cache disabled and enabled.
+
+The view does nothing, so the timing is the decorator itself: reading the
+header, decoding and verifying the token (or looking it up on the cache)
+and the type/blocklist/claims checks.
+
+It needs no database.
+
+Usage:
+    set -a && source .env && set +a
+    python -m benchmarks.jwt_required_overhead [calls]
+"""
+
+import sys
+import time
+
+from flask_jwt_extended import create_access_token, jwt_required
+
+from questrya.extensions import jwt_token_cache
+from questrya.factory import create_app
+
+
+@jwt_required()
+def protected_view():
+    return None
+
+
+def measure(name: str, calls: int):
+    started = time.perf_counter()
+    for _ in range(calls):
+        protected_view()
+    elapsed = time.perf_counter() - started
+    microseconds_per_call = elapsed / calls * 1_000_000
+    print(
+        f'{name:<14} | {microseconds_per_call:7.2f} us/call | '
+        f'{calls / elapsed:>10,.0f} calls/s'
+    )
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    app = create_app()
+    with app.app_context():
+        token = create_access_token(identity='12345678-1234-5678-1234-567812345678')
+        with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+            jwt_token_cache.configure(maxsize=0, ttl=300.0)
+            measure('without cache', calls)
+            jwt_token_cache.configure(maxsize=10000, ttl=300.0)
+            measure('with cache', calls)
+            print(jwt_token_cache.stats())
@@ -0,0 +1,65 @@
+"""
+Cost of the transactional outbox:
+- on the request: OutboxService.enqueue, one INSERT on the transaction of the request
+  (committed with the change), instead of a publish to the broker;
+- on the relay: tasks per second published from the outbox (to kombu's in-memory
+  transport), by batch size. Each batch is one SELECT ... FOR UPDATE SKIP LOCKED, the
+  publishes on one broker connection, one DELETE and one COMMIT.
+
+Usage (needs the local postgres):
+    set -a && source .env && set +a && python -m benchmarks.outbox_relay [tasks]
+"""
+
+import sys
+import time
+
+from celery import Celery
+
+from questrya import settings
+from questrya.extensions import db
+from questrya.factory import create_app
+from questrya.outbox.repository import OutboxRepository
+from questrya.outbox.service import OutboxService
+
+
+def enqueue(service: OutboxService, tasks: int) -> float:
+    """
+    Seconds per enqueue, committed every 10 tasks (as a request with a few of them).
+    """
+    started = time.perf_counter()
+    for number in range(tasks):
+        service.enqueue('questrya.tasks.compute', args=(number, '2025-01-01T00:00:00'))
+        if number % 10 == 9:
+            db.session.commit()
+    db.session.commit()
+    return (time.perf_counter() - started) / tasks
+
+
+def relay(service: OutboxService, batch_size: int) -> tuple:
+    relayed = 0
+    started = time.perf_counter()
+    while batch_relayed := service.relay_batch(batch_size=batch_size):
+        relayed += batch_relayed
+    return relayed, time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    app = create_app()
+    celery = Celery('bench-outbox', broker='memory://')
+    celery.conf.update(task_routes=settings.TASKS_QUEUES, task_serializer='json')
+    service = OutboxService(celery=celery)
+
+    with app.app_context():
+        db.create_all()
+        if OutboxRepository.count():
+            sys.exit('The outbox is not empty, relay it first ("flask outbox relay")')
+        for batch_size in (1, 10, 100):
+            seconds_per_enqueue = enqueue(service, tasks)
+            relayed, elapsed = relay(service, batch_size)
+            print(
+                f'enqueue: {seconds_per_enqueue * 1e6:6.0f} us per task | '
+                f'relay, batches of {batch_size:>3}: '
+                f'{relayed / elapsed:7.0f} tasks/s ({relayed} tasks)'
+            )
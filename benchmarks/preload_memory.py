@@ -0,0 +1,119 @@
+"""
+Memory of the gunicorn workers with and without the preloaded app (GUNICORN_PRELOAD).
+
+For each mode, it starts gunicorn with gunicorn_settings.py, warms every
+worker up with a few hundred requests (liveness, readiness, signups), then
+reads /proc/<pid>/smaps_rollup of the master and of each worker:
+- RSS: every page the process maps, shared or not (what `ps` shows);
+- PSS: the shared pages split between the processes sharing them;
+- private: the pages only this process has (what a new worker really costs).
+The RSS barely changes with the preload, the PSS and the private memory is
+where the shared (copy on write) pages show up.
+
+It needs the local Postgres from docker-compose.yml (make dev-infra-start)
+with the migrations applied. Every user created here is deleted at the end.
+
+Usage:
+    set -a && source .env && set +a
+    python -m benchmarks.preload_memory [workers] [requests]
+"""
+
+import json
+import signal
+import sys
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from benchmarks.gunicorn_sizing import get_free_port, start_gunicorn
+from questrya.extensions import db
+from questrya.factory import create_app
+from questrya.sql_db.models import UserSQLModel
+
+
+def get_memory_kb(pid: int) -> dict:
+    with open(f'/proc/{pid}/smaps_rollup', encoding='utf-8') as smaps:
+        fields = dict(line.split(':', 1) for line in smaps.read().splitlines()[1:])
+    kb = {name: int(value.split()[0]) for name, value in fields.items()}
+    return {
+        'rss': kb['Rss'],
+        'pss': kb['Pss'],
+        'private': kb['Private_Clean'] + kb['Private_Dirty'],
+    }
+
+
+def get_children(pid: int) -> list:
+    with open(f'/proc/{pid}/task/{pid}/children', encoding='utf-8') as children:
+        return [int(child) for child in children.read().split()]
+
+
+def warm_up(port: int, requests: int, prefix: str) -> None:
+    base_url = f'http://127.0.0.1:{port}'
+
+    def send(index: int):
+        if index % 3 == 0:
+            payload = {
+                'username': f'{prefix}-{index}',
+                'email': f'{prefix}-{index}@bench.questrya.dev',
+                'password': 'password123',
+            }
+            request = urllib.request.Request(
+                f'{base_url}/api/users/user',
+                data=json.dumps(payload).encode(),
+                headers={'Content-Type': 'application/json'},
+                method='POST',
+            )
+        else:
+            probe = 'liveness' if index % 3 == 1 else 'readiness'
+            request = f'{base_url}/api/monitor/{probe}'
+        with urllib.request.urlopen(request, timeout=30):
+            pass
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(send, range(requests)))
+
+
+def report(label: str, server_pid: int) -> None:
+    workers = [get_memory_kb(pid) for pid in get_children(server_pid)]
+    master = get_memory_kb(server_pid)
+    print(f'{label}:')
+    print(
+        f'  master:            rss {master["rss"] / 1024:6.1f} MB'
+        f' | pss {master["pss"] / 1024:6.1f} MB'
+    )
+    for field in ('rss', 'pss', 'private'):
+        values = [worker[field] / 1024 for worker in workers]
+        print(
+            f'  per worker {field:>7}: {sum(values) / len(values):6.1f} MB'
+            f' (min {min(values):6.1f}, max {max(values):6.1f})'
+        )
+    total_pss = (master['pss'] + sum(worker['pss'] for worker in workers)) / 1024
+    print(f'  master + {len(workers)} workers pss: {total_pss:6.1f} MB')
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+
+    app = create_app()
+    prefix = f'bench-{uuid4().hex[:8]}'
+    try:
+        for preload in ('false', 'true'):
+            port = get_free_port()
+            server = start_gunicorn(port, workers, 4, GUNICORN_PRELOAD=preload)
+            try:
+                warm_up(port, requests, f'{prefix}-{preload}')
+                report(
+                    f'GUNICORN_PRELOAD={preload}, {workers} workers, '
+                    f'after {requests} requests',
+                    server.pid,
+                )
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+    finally:
+        with app.app_context():
+            UserSQLModel.query.filter(UserSQLModel.username.like(f'{prefix}-%')).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
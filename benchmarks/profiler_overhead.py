@@ -0,0 +1,56 @@
+"""
+Overhead of the sampling profiler on a CPU bound workload.
+
+The workload runs on the main thread while other threads sit idle (like the
+gunicorn gthread workers), first without the profiler and then with a
+StackSampler sampling every thread at PROFILER_INTERVAL_MS intervals.
+
+It needs no database.
+
+Usage:
+    python -m benchmarks.profiler_overhead [idle_threads] [interval_ms]
+"""
+
+import sys
+import threading
+import time
+
+from questrya.common.profiling import StackSampler
+
+ROUNDS = 5
+
+
+def workload() -> float:
+    started = time.perf_counter()
+    total = 0
+    for index in range(3_000_000):
+        total += index % 7
+    return time.perf_counter() - started
+
+
+def best_of(rounds: int) -> float:
+    return min(workload() for _ in range(rounds))
+
+
+if __name__ == '__main__':
+    idle_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    interval_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+
+    stop = threading.Event()
+    for _ in range(idle_threads):
+        threading.Thread(target=stop.wait, daemon=True).start()
+
+    baseline = best_of(ROUNDS)
+    sampler = StackSampler(interval=interval_ms / 1000)
+    sampler.start()
+    profiled = best_of(ROUNDS)
+    sampler.stop()
+    stop.set()
+
+    print(
+        f'{idle_threads} idle threads, sampling every {interval_ms}ms '
+        f'({sampler.sample_count} samples)'
+    )
+    print(f'without profiler: {baseline * 1000:.1f} ms')
+    overhead = (profiled / baseline - 1) * 100
+    print(f'with profiler:    {profiled * 1000:.1f} ms ({overhead:+.2f}%)')
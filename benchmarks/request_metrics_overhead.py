@@ -0,0 +1,43 @@
+"""
+Cost that the request metrics add to every request: the before_request,
+after_request and teardown_request hooks of RequestMetrics, run on a
+request context of /api/monitor/liveness.
+
+Run it with PROMETHEUS_MULTIPROC_DIR set to measure the mmap (gunicorn) mode.
+It needs no database.
+
+Usage:
+    set -a && source .env && set +a
+    python -m benchmarks.request_metrics_overhead [requests]
+    PROMETHEUS_MULTIPROC_DIR=/dev/shm/questrya-bench \\
+        python -m benchmarks.request_metrics_overhead [requests]
+"""
+
+import os
+import sys
+import time
+
+from flask import Response
+
+from questrya.extensions import request_metrics
+from questrya.factory import create_app
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    app = create_app()
+    response = Response(status=200)
+    with app.test_request_context('/api/monitor/liveness'):
+        started = time.perf_counter()
+        for _ in range(requests):
+            request_metrics.before_request()
+            request_metrics.after_request(response)
+            request_metrics.teardown_request()
+        elapsed = time.perf_counter() - started
+
+    mode = (
+        'multiprocess (mmap)'
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+        else 'single process'
+    )
+    print(f'{mode}: {elapsed / requests * 1_000_000:.2f} us/request')
@@ -0,0 +1,101 @@
+"""
+Events per second of a celery worker, on kombu's in-memory transport, for
+high frequency events stored on the database: one task (and one INSERT and
+COMMIT) per event, against a BatchTask (one INSERT of many rows and one
+COMMIT per batch), with flush_every of 10 and 100.
+
+The worker runs on a thread of this process (solo pool, as the memory transport is per
+process), with a prefetch of 2 x flush_every. The events go to bench_task_batching, a
+table created and dropped by the benchmark.
+
+Usage (needs the local postgres):
+    set -a && source .env && set +a && python -m benchmarks.task_batching [events]
+"""
+
+import logging
+import sys
+import threading
+import time
+
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from sqlalchemy import text
+
+from questrya.common.task_batches import BatchTask
+from questrya.common.task_context import WorkerAppContext
+from questrya.extensions import db, dispose_engines
+from questrya.factory import create_app
+
+INSERT = text(
+    'INSERT INTO bench_task_batching (user_id, played_seconds) '
+    'VALUES (:user_id, :played_seconds)'
+)
+
+
+def run(app, label: str, events: int, flush_every: int = 0):
+    celery = Celery(f'bench-{flush_every}', broker='memory://')
+    celery.conf.update(
+        task_default_queue=f'bench-task-batching-{flush_every}',
+        worker_hijack_root_logger=False,
+        worker_prefetch_multiplier=max(
+            flush_every * 2, 4
+        ),  # the batches are held unacked
+    )
+    WorkerAppContext().init_app(app, celery, db=db, dispose_engines=dispose_engines)
+    done = threading.Semaphore(0)
+
+    if flush_every:
+
+        @celery.task(
+            name=f'bench.batch.{flush_every}',
+            base=BatchTask,
+            flush_every=flush_every,
+            flush_interval=0.5,
+        )
+        def record_ping(items):
+            db.session.execute(INSERT, [item.kwargs for item in items])
+            db.session.commit()
+            for _ in items:
+                done.release()
+
+    else:
+
+        @celery.task(name='bench.single')
+        def record_ping(user_id: int, played_seconds: int):
+            db.session.execute(
+                INSERT, {'user_id': user_id, 'played_seconds': played_seconds}
+            )
+            db.session.commit()
+            done.release()
+
+    for index in range(events):
+        record_ping.delay(user_id=index, played_seconds=30)
+    with start_worker(celery, pool='solo', perform_ping_check=False):
+        started = time.perf_counter()
+        for _ in range(events):
+            done.acquire()
+        elapsed = time.perf_counter() - started
+    print(f'{label:>28}: {events / elapsed:8.0f} events/s ({events} events)')
+
+
+if __name__ == '__main__':
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    app = create_app()
+    logging.getLogger('celery').setLevel(logging.WARNING)  # no log line per task
+    with app.app_context():
+        db.session.execute(
+            text(
+                'CREATE TABLE IF NOT EXISTS bench_task_batching '
+                '(user_id int, played_seconds int)'
+            )
+        )
+        db.session.commit()
+    try:
+        run(app, 'one task per event', events)
+        run(app, 'BatchTask, flush_every=10', events, flush_every=10)
+        run(app, 'BatchTask, flush_every=100', events, flush_every=100)
+    finally:
+        with app.app_context():
+            db.session.execute(text('DROP TABLE bench_task_batching'))
+            db.session.commit()
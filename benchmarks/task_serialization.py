@@ -0,0 +1,101 @@
+"""
+Messages per second (encoded and decoded) and bytes on the wire of the Celery
+task messages, for json, pickle and msgpack-questrya, without and with the
+threshold compression (TASK_COMPRESSION over TASK_COMPRESSION_THRESHOLD bytes),
+on a small (one id), a medium (a user row) and a large (a report) payload.
+
+Usage:
+    set -a && source .env && set +a
+    python -m benchmarks.task_serialization [messages]
+"""
+
+import sys
+import time
+import uuid
+from datetime import UTC, datetime
+
+from kombu.compression import decompress
+from kombu.serialization import dumps, loads, register
+
+from questrya import settings
+from questrya.common.task_messages import (
+    CONTENT_TYPE,
+    SERIALIZER_NAME,
+    TaskMessageCodec,
+)
+
+NOW = datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC)
+
+
+def get_user(index: int) -> dict:
+    return {
+        'uuid': str(uuid.UUID(int=index)),
+        'username': f'user{index}',
+        'email': f'user{index}@questrya.com',
+        'first_name': 'Some',
+        'last_name': 'User',
+        'created_at': NOW.isoformat(),
+        'active': True,
+    }
+
+
+PAYLOADS = {
+    'small': ((42,), {}),
+    'medium': ((get_user(1),), {'notify': True}),
+    'large': (([get_user(index) for index in range(200)],), {'format': 'csv'}),
+}
+
+
+def round_trip(
+    codec: TaskMessageCodec, serializer: str, payload, compress: bool
+) -> int:
+    content_type, content_encoding, body = dumps(payload, serializer=serializer)
+    headers = {}
+    if compress:
+        body = codec.compress(body, headers)
+    size = len(body)
+    if 'compression' in headers:
+        body = decompress(body, headers['compression'])
+    loads(body, content_type, content_encoding, accept={content_type})
+    return size
+
+
+def run(
+    codec: TaskMessageCodec, label: str, serializer: str, compress: bool, messages: int
+):
+    results = []
+    for name, payload in PAYLOADS.items():
+        started = time.perf_counter()
+        for _ in range(messages):
+            size = round_trip(codec, serializer, payload, compress)
+        results.append(
+            f'{name} {messages / (time.perf_counter() - started):9.0f}/s {size:7d} B'
+        )
+    print(f'{label:>30}: ' + ' | '.join(results))
+
+
+if __name__ == '__main__':
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    codec = TaskMessageCodec()
+    codec.configure(
+        compression=settings.TASK_COMPRESSION,
+        compression_threshold=settings.TASK_COMPRESSION_THRESHOLD,
+        claim_check_dir='',
+        claim_check_threshold=0,
+    )
+    register(
+        SERIALIZER_NAME,
+        codec.dumps,
+        codec.loads,
+        content_type=CONTENT_TYPE,
+        content_encoding='binary',
+    )
+
+    print(
+        f'compression: {settings.TASK_COMPRESSION} '
+        f'over {settings.TASK_COMPRESSION_THRESHOLD} bytes'
+    )
+    for serializer in ('json', 'pickle', SERIALIZER_NAME):
+        run(codec, serializer, serializer, False, messages)
+        run(codec, f'{serializer} + compression', serializer, True, messages)
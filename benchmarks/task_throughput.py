@@ -0,0 +1,78 @@
+"""
+Tasks per second of a celery worker, on kombu's in-memory transport, for a task that
+does nothing and one that runs one query on db.session: an app context pushed and popped
+per task (the ContextTask the app used before) against the app context of the worker
+process with a clean session per task (WorkerAppContext).
+
+The worker runs on a thread of this process (solo pool, as the memory
+transport is per process), so the numbers are the cost of a task on the
+worker, without the network of a real broker.
+
+Usage (needs the local postgres):
+    set -a && source .env && set +a && python -m benchmarks.task_throughput [tasks]
+"""
+
+import logging
+import sys
+import threading
+import time
+
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from sqlalchemy import text
+
+from questrya.common.task_context import WorkerAppContext
+from questrya.extensions import db, dispose_engines
+from questrya.factory import create_app
+
+
+def get_celery(app, mode: str) -> Celery:
+    celery = Celery(f'bench-{mode}', broker='memory://', backend='cache+memory://')
+    celery.conf.update(
+        task_default_queue=f'bench-{mode}', worker_hijack_root_logger=False
+    )
+    if mode == 'per task':
+        task_class = celery.Task
+
+        class ContextTask(task_class):
+            def __call__(self, *args, **kwargs):
+                with app.app_context():
+                    return task_class.__call__(self, *args, **kwargs)
+
+        celery.Task = ContextTask
+    else:
+        WorkerAppContext().init_app(app, celery, db=db, dispose_engines=dispose_engines)
+    return celery
+
+
+def run(app, mode: str, with_query: bool, tasks: int):
+    celery = get_celery(app, mode)
+    done = threading.Semaphore(0)
+
+    @celery.task(name=f'bench.task.{mode}')
+    def task():
+        if with_query:
+            db.session.execute(text('SELECT 1'))
+        done.release()
+
+    for _ in range(tasks):
+        task.delay()
+    with start_worker(
+        celery, pool='solo', perform_ping_check=False, shutdown_timeout=10
+    ):
+        started = time.perf_counter()
+        for _ in range(tasks):
+            done.acquire()
+        elapsed = time.perf_counter() - started
+    label = f'{"query" if with_query else "no query"}, context {mode}'
+    print(f'{label:>30}: {tasks / elapsed:8.0f} tasks/s ({tasks} tasks)')
+
+
+if __name__ == '__main__':
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    app = create_app()
+    logging.getLogger('celery').setLevel(logging.WARNING)  # no log line per task
+    for with_query in (False, True):
+        for mode in ('per task', 'per process'):
+            run(app, mode, with_query, tasks)
@@ -0,0 +1,94 @@
+"""
+Per-row cost of loading domain Users: the ORM path against the Core path.
+
+- "orm": UserSQLModel.query (identity map, ORM instances) + UserRepository.to_domain
+  (User.__init__, with its defaults, and the Email validation);
+- "core": select() on the users table (plain rows) + UserRepository.row_to_domain
+  (trusted constructors, no validation).
+
+Both are timed with the query ("query + hydrate") and over rows already fetched
+("hydrate only"), from the best of a few runs.
+
+It needs the local Postgres from docker-compose.yml (make dev-infra-start)
+with the migrations applied. Every user created here is deleted at the end.
+
+Usage:
+    set -a && source .env && set +a && python -m benchmarks.user_hydration [rows]
+"""
+
+import sys
+import time
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from questrya.common.value_objects.email import Email
+from questrya.extensions import db
+from questrya.factory import create_app
+from questrya.sql_db.models import UserSQLModel
+from questrya.users.domain import User
+from questrya.users.repository import USERS_TABLE, UserRepository
+
+RUNS = 20
+
+
+def best_of(func) -> float:
+    timings = []
+    for _ in range(RUNS):
+        db.session.expunge_all()  # the ORM must build its instances again
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    prefix = f'bench-{uuid4().hex[:8]}'
+
+    app = create_app()
+    with app.app_context():
+        UserRepository.save_many(
+            [
+                User(
+                    username=f'{prefix}-{index}',
+                    email=Email(f'{prefix}-{index}@bench.questrya.dev'),
+                    password_hash='hash',
+                )
+                for index in range(rows)
+            ]
+        )
+        orm_query = UserSQLModel.query.filter(UserSQLModel.username.like(f'{prefix}-%'))
+        core_query = select(USERS_TABLE).where(
+            USERS_TABLE.c.username.like(f'{prefix}-%')
+        )
+
+        timings = {
+            ('orm', 'query + hydrate'): best_of(
+                lambda: [
+                    UserRepository.to_domain(user_model=m) for m in orm_query.all()
+                ]
+            ),
+            ('core', 'query + hydrate'): best_of(
+                lambda: [
+                    UserRepository.row_to_domain(db_row=r)
+                    for r in db.session.execute(core_query).all()
+                ]
+            ),
+        }
+        orm_models = orm_query.all()
+        core_rows = db.session.execute(core_query).all()
+        timings[('orm', 'hydrate only')] = best_of(
+            lambda: [UserRepository.to_domain(user_model=m) for m in orm_models]
+        )
+        timings[('core', 'hydrate only')] = best_of(
+            lambda: [UserRepository.row_to_domain(db_row=r) for r in core_rows]
+        )
+
+        for (path, measure), elapsed in timings.items():
+            print(
+                f'{path:>4} | {measure:<15} | {elapsed / rows * 1_000_000:7.2f} us/row'
+            )
+
+        orm_query.delete(synchronize_session=False)
+        db.session.commit()
@@ -0,0 +1,84 @@
+"""
+Writes per second of UserRepository.save, before and after the upsert.
+
+"before" is the previous ORM write path (SELECT by uuid, UPDATE or INSERT,
+COMMIT and refresh), kept here only for comparison. "after" is the current
+UserRepository.save (one INSERT ... ON CONFLICT ... RETURNING plus COMMIT).
+
+It needs the local Postgres from docker-compose.yml (make dev-infra-start)
+with the migrations applied. Every user created here is deleted at the end.
+
+Usage:
+    set -a && source .env && set +a
+    python -m benchmarks.user_repository_save [writes]
+"""
+
+import sys
+import time
+from datetime import UTC, datetime
+from uuid import uuid4
+
+from questrya.common.value_objects.email import Email
+from questrya.extensions import db
+from questrya.factory import create_app
+from questrya.sql_db.models import UserSQLModel
+from questrya.users.domain import User
+from questrya.users.repository import UserRepository
+
+
+def orm_save(user: User) -> User:
+    db_user = None
+    if user.uuid:
+        db_user = UserSQLModel.query.filter_by(uuid=user.uuid).first()
+    if db_user:
+        db_user.username = user.username
+        db_user.email = user.email.address
+        db_user.password_hash = user.password_hash
+        db_user.last_updated_at = datetime.now(UTC).replace(tzinfo=None)
+    else:
+        db_user = UserRepository.from_domain(user=user)
+    db.session.add(db_user)
+    db.session.commit()
+    db.session.refresh(db_user)
+    return UserRepository.to_domain(user_model=db_user)
+
+
+def new_user(prefix: str, index: int) -> User:
+    return User(
+        username=f'{prefix}-{index}',
+        email=Email(f'{prefix}-{index}@bench.questrya.dev'),
+        password_hash='$2b$12$benchmarkbenchmarkbenchmarkbenchmarkbenchmarkbenchma',
+    )
+
+
+def run(label: str, save, writes: int) -> None:
+    prefix = f'bench-{uuid4().hex[:8]}'
+    users = [new_user(prefix, index) for index in range(writes)]
+
+    started = time.perf_counter()
+    users = [save(user) for user in users]  # inserts
+    inserts_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for user in users:  # updates
+        user.username = f'{user.username}-updated'
+        save(user)
+    updates_elapsed = time.perf_counter() - started
+
+    print(
+        f'{label:>7}: inserts {writes / inserts_elapsed:8.1f} writes/s'
+        f' | updates {writes / updates_elapsed:8.1f} writes/s'
+    )
+
+    UserSQLModel.query.filter(UserSQLModel.username.like(f'{prefix}-%')).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+if __name__ == '__main__':
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    app = create_app()
+    with app.app_context():
+        run('before', orm_save, writes)
+        run('after', UserRepository.save, writes)
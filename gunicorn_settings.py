@@ -1,11 +1,139 @@
 # https://pythonspeed.com/articles/gunicorn-in-docker/
 
-import multiprocessing
-
-# http://docs.gunicorn.org/en/latest/design.html#how-many-workers
-cpus = multiprocessing.cpu_count()
-WORKERS = (2 * cpus) + 1
-THREADS = WORKERS * 2
+import math
+import os
+
+# gunicorn reads every module level name as a setting, and `config` is one of them.
+import decouple
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+# RSS budget per worker (with its password hasher pool), used to cap the workers to
+# the memory limit. A worker takes ~85MB right after the boot, this leaves room to grow.
+WORKER_MEMORY_MB = decouple.config('GUNICORN_WORKER_MEMORY_MB', default=256, cast=int)
+# Threads per worker: constant, not proportional to the workers (or the cpus). The
+# requests mostly wait on the database, and bcrypt runs on the password hasher pool,
+# so a few threads keep a cpu busy; more only add GIL contention to the tail
+# latency. See benchmarks/gunicorn_sizing.py.
+DEFAULT_THREADS = 4
+
+
+def read_cgroup_file(*path) -> str:
+    try:
+        with open(os.path.join(CGROUP_ROOT, *path), encoding='utf-8') as cgroup_file:
+            return cgroup_file.read().strip()
+    except (OSError, ValueError):
+        return None
+
+
+def get_cpu_quota() -> float:
+    """The cgroup cpu limit (cpus, may be fractional), or None when there is none."""
+    cpu_max = read_cgroup_file(
+        'cpu.max'
+    )  # cgroup v2: "<quota> <period>" or "max <period>"
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max':
+            return int(quota) / int(period or 100000)
+        return None
+
+    quota = read_cgroup_file('cpu', 'cpu.cfs_quota_us')  # cgroup v1, -1 without a limit
+    period = read_cgroup_file('cpu', 'cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def get_effective_cpus() -> tuple:
+    """
+    (cpus, where they came from): the smallest of the cpus this process may run on and
+    the cgroup quota.
+    """
+    cpus = (
+        len(os.sched_getaffinity(0))
+        if hasattr(os, 'sched_getaffinity')
+        else os.cpu_count()
+    )
+    source = 'cpu affinity'
+    quota = get_cpu_quota()
+    if quota is not None and math.ceil(quota) < cpus:
+        cpus, source = math.ceil(quota), f'cgroup quota ({quota:g} cpus)'
+    return max(cpus, 1), source
+
+
+def get_memory_limit() -> tuple:
+    """
+    (bytes, where they came from): the cgroup memory limit, or the physical memory.
+    """
+    limit = read_cgroup_file('memory.max')  # cgroup v2, "max" without a limit
+    if limit is None:
+        limit = read_cgroup_file(
+            'memory', 'memory.limit_in_bytes'
+        )  # cgroup v1, a huge number without a limit
+    physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    if limit and limit.isdigit() and int(limit) < physical:
+        return int(limit), 'cgroup limit'
+    return physical, 'physical memory'
+
+
+def get_sizing() -> dict:
+    """
+    Workers: effective cpus + 1, capped by how many workers of GUNICORN_WORKER_MEMORY_MB
+    fit in the memory limit. Not the (2 * cpus) + 1 of the sync workers
+    (http://docs.gunicorn.org/en/latest/design.html#how-many-workers): the gthread
+    workers already overlap the I/O waits, and bcrypt takes its own processes.
+    Threads: a constant per worker.
+
+    GUNICORN_WORKERS (or gunicorn's own WEB_CONCURRENCY) and GUNICORN_THREADS override
+    them.
+    """
+    cpus, cpus_source = get_effective_cpus()
+    memory, memory_source = get_memory_limit()
+    workers_by_cpu = cpus + 1
+    workers_by_memory = max(memory // (WORKER_MEMORY_MB * 1024 * 1024), 1)
+    workers = min(workers_by_cpu, workers_by_memory)
+    workers_source = (
+        'cpus'
+        if workers == workers_by_cpu
+        else f'memory ({WORKER_MEMORY_MB}MB per worker)'
+    )
+
+    workers_override = decouple.config(
+        'GUNICORN_WORKERS', default=None
+    ) or os.environ.get('WEB_CONCURRENCY')
+    if workers_override:
+        workers, workers_source = int(workers_override), 'environment'
+    threads_override = decouple.config('GUNICORN_THREADS', default=None)
+    threads = int(threads_override) if threads_override else DEFAULT_THREADS
+
+    return {
+        'cpus': cpus,
+        'cpus_source': cpus_source,
+        'memory_mb': memory // (1024 * 1024),
+        'memory_source': memory_source,
+        'workers': workers,
+        'workers_source': workers_source,
+        'threads': threads,
+        'threads_source': 'environment' if threads_override else 'default',
+    }
+
+
+SIZING = get_sizing()
+WORKERS = SIZING['workers']
+THREADS = SIZING['threads']
+
+# Preload: the master builds the app once and the workers share its memory (copy on
+# write) instead of each importing flask, sqlalchemy, celery, flasgger and pydantic
+# on its own. The catch: a HUP then restarts the workers with the code already loaded
+# on the master, a code change needs a new master (USR2 + QUIT, or a restart).
+# See benchmarks/preload_memory.py.
+PRELOAD = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+# A worker is replaced after MAX_REQUESTS plus a random 0..MAX_REQUESTS_JITTER requests
+# (the jitter keeps the workers from restarting together). 0 disables it. Its RSS is
+# also capped by the memory watchdog (WORKER_MAX_RSS_MB, questrya/common/watchdog.py).
+MAX_REQUESTS = decouple.config('GUNICORN_MAX_REQUESTS', default=10000, cast=int)
+MAX_REQUESTS_JITTER = decouple.config(
+    'GUNICORN_MAX_REQUESTS_JITTER', default=1000, cast=int
+)
 
 # Gunicorn configuration file.
 
@@ -82,6 +210,9 @@ backlog = 500
 workers = WORKERS
 worker_class = 'gthread'
 threads = THREADS
+preload_app = PRELOAD
+max_requests = MAX_REQUESTS
+max_requests_jitter = MAX_REQUESTS_JITTER
 
 worker_connections = 1000
 
@@ -193,21 +324,145 @@ proc_name = None
 #
 #       A callable that takes a server instance as the sole argument.
 #
+#   post_worker_init - Called just after a worker has initialized the application.
+#
+#   on_starting - Called just before the master process is initialized.
+#
+#   child_exit - Called just after a worker has been exited, in the master process.
+#
+#   worker_exit - Called just after a worker has been exited, in the worker process.
+#
+
+
+def on_starting(server):
+    import glob
+    import os
+
+    # The metrics files of a previous run would be aggregated as if they were current.
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    import os
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
 
 
 def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from questrya import app
+        from questrya.extensions import reset_after_fork
+
+        reset_after_fork(app)
+
     server.log.info('Worker spawned (pid: %s)', worker.pid)
 
 
+def post_worker_init(worker):
+    import signal
+
+    from questrya import settings
+    from questrya.common.profiling import profile_for_signal
+    from questrya.extensions import worker_profiler
+
+    # "kill -USR2 <worker pid>" profiles that worker (never send it to the master: it
+    # re-execs it).
+    signal.signal(
+        signal.SIGUSR2,
+        profile_for_signal(worker_profiler, seconds=settings.PROFILER_SIGNAL_SECONDS),
+    )
+
+    if not worker.cfg.preload_app and worker.age == 1:
+        log_connection_budget(worker.log, worker.cfg)
+
+    from questrya.extensions import memory_watchdog
+
+    def retire(rss):
+        # As with max_requests: the worker finishes its requests, exits and is replaced.
+        worker.recycle_reason = 'memory'
+        worker.log.warning(
+            'Worker %s is over the memory limit (rss %.1fMB > %sMB) after %s requests, '
+            'retiring it',
+            worker.pid,
+            rss / (1024 * 1024),
+            memory_watchdog.max_rss_mb,
+            worker.nr,
+        )
+        worker.alive = False
+
+    memory_watchdog.start(on_exceeded=retire)
+
+
+def worker_exit(server, worker):
+    reason = getattr(worker, 'recycle_reason', None)
+    if reason is None and worker.cfg.max_requests and worker.nr >= worker.max_requests:
+        reason = 'max_requests'
+    if reason is None:  # a shutdown, or a worker that did not boot
+        return
+
+    from questrya.common.watchdog import get_rss_bytes
+    from questrya.extensions import request_metrics
+
+    request_metrics.count_worker_recycle(reason)
+    server.log.info(
+        'Worker %s recycled (%s) after %s requests, rss %.1fMB',
+        worker.pid,
+        reason,
+        worker.nr,
+        (get_rss_bytes() or 0) / (1024 * 1024),
+    )
+
+
 def pre_fork(server, worker):
-    pass
+    if server.cfg.preload_app:
+        import gc
+
+        # Moves every object the master has to a generation the collector never visits,
+        # so the workers' collections do not write to (and copy) the pages they share.
+        gc.freeze()
 
 
 def pre_exec(server):
     server.log.info('Forked child, re-executing.')
 
 
+def log_connection_budget(log, cfg):
+    from questrya.sql_db.pool import check_connection_budget
+
+    for warning in check_connection_budget(workers=cfg.workers, threads=cfg.threads):
+        log.warning('Database connection budget: %s', warning)
+
+
 def when_ready(server):
+    server.log.info(
+        'Sizing: %s workers (by %s) x %s threads (%s), '
+        'for %s cpus (by %s) and %sMB of memory (by %s)',
+        server.cfg.workers,
+        SIZING['workers_source'],
+        server.cfg.threads,
+        SIZING['threads_source'],
+        SIZING['cpus'],
+        SIZING['cpus_source'],
+        SIZING['memory_mb'],
+        SIZING['memory_source'],
+    )
+
+    # Importing questrya builds the app: without the preload, the master must not do it
+    # (or the workers would inherit it anyway), so the first worker checks the budget.
+    if server.cfg.preload_app:
+        import gc
+
+        log_connection_budget(server.log, server.cfg)
+        # The garbage of the app build is collected before gc.freeze() pins it for good.
+        gc.collect()
+        server.log.info('App preloaded on the master (pid: %s)', os.getpid())
+
     server.log.info('Server is ready. Spawning workers')
 
 
@@ -0,0 +1,40 @@
+"""idempotency_keys table
+
+Revision ID: 0c5e8b4f2a17
+Revises: 6f1d2c9a7e43
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c5e8b4f2a17'
+down_revision = '6f1d2c9a7e43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('key', sa.LargeBinary(length=16), nullable=False),
+        sa.Column('fingerprint', sa.LargeBinary(length=16), nullable=False),
+        sa.Column('status_code', sa.SmallInteger(), nullable=True),
+        sa.Column('response', sa.LargeBinary(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index(
+        op.f('ix_idempotency_keys_expires_at'),
+        'idempotency_keys',
+        ['expires_at'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_idempotency_keys_expires_at'), table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,33 @@
+"""
+LAYER: routes
+ROLE: API endpoints access control
+CAN communicate with: Services, Schemas
+MUST NOT communicate with: Domain, Repositories, ORM models
+
+Decorators to protect the API endpoints
+"""
+
+from functools import wraps
+
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from questrya import settings
+from questrya.common.schemas import GenericClientResponseError
+
+
+def admin_required(fn):
+    """
+    Requires an access token from one of the users listed on the ADMIN_USER_UUIDS
+    setting.
+    """
+
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if get_jwt_identity() not in settings.ADMIN_USER_UUIDS:
+            return GenericClientResponseError(
+                error='Admin privileges required'
+            ).model_dump(), 403
+        return fn(*args, **kwargs)
+
+    return wrapper
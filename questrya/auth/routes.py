@@ -12,20 +12,22 @@ from datetime import timedelta
 from flask import Blueprint, request
 from flask_jwt_extended import (
     create_access_token,
-    jwt_required,
     get_jwt_identity,
+    jwt_required,
 )
 
-from questrya.common.schemas import (
-    GenericClientResponseError,
-    GenericServerResponseError,
-)
 from questrya.auth.schemas import (
     LoginRequest,
     LoginResponseSuccess,
     TokenRefreshResponseSuccess,
 )
 from questrya.auth.service import AuthService
+from questrya.common.exceptions import ServiceUnavailableException
+from questrya.common.schemas import (
+    GenericClientResponseError,
+    GenericServerResponseError,
+)
+from questrya.common.timing import timed_block
 
 auth_bp = Blueprint('auth', __name__)
 auth_service = AuthService()
@@ -52,10 +54,13 @@ def login():
         description: client error
       500:
         description: server error
+      503:
+        description: password hashing is saturated, retry later
     """
     data = request.get_json()
     try:
-        validated_data = LoginRequest.model_validate(data)
+        with timed_block('validation'):
+            validated_data = LoginRequest.model_validate(data)
 
         access_token, refresh_token = auth_service.authenticate(
             email=validated_data.email, password=validated_data.password
@@ -68,6 +73,8 @@ def login():
         )
     except ValueError as e:
         return GenericClientResponseError(error=str(e)).model_dump(), 400
+    except ServiceUnavailableException as e:
+        return GenericServerResponseError(error=str(e)).model_dump(), 503
     except Exception as e:
         return GenericServerResponseError(error=str(e)).model_dump(), 500
 
@@ -7,8 +7,11 @@ MUST NOT communicate with: ORM models, Routes
 This must have the application use cases
 """
 
-from flask_jwt_extended import create_access_token, create_refresh_token
 from datetime import timedelta
+
+from flask_jwt_extended import create_access_token, create_refresh_token
+
+from questrya.common.timing import timed
 from questrya.users.repository import UserRepository
 
 
@@ -16,8 +19,11 @@ class AuthService:
     def __init__(self):
         self.user_repository = UserRepository()
 
+    @timed('service')
     def authenticate(self, email: str, password: str):
-        user = self.user_repository.get_by_email(email)
+        # Not from the user cache: another worker may still have the password hash of
+        # before a change
+        user = self.user_repository.get_by_email(email, primary=True)
         if not user or not user.check_password(password):
             raise ValueError('Invalid credentials')
 
@@ -0,0 +1,115 @@
+"""
+Prebuilt OpenAPI (Swagger 2.0) spec.
+
+flasgger builds the spec by parsing the YAML of every route docstring, on the
+first request of each worker, and serializes it again on every request.
+Instead, "flask apispec build" builds it once (e.g. on the image build, or
+before a release) into a JSON file, and with API_SPEC_FILE set the app serves
+that file from memory on /apispec_1.json:
+- with a strong ETag (a hash of the file), so a client that polls the spec
+  (e.g. a client generator) gets a 304 with no body while it has not changed;
+- with Cache-Control, so the browsers and proxies can keep it for API_SPEC_MAX_AGE.
+
+With the Swagger UI on (API_DOCS_ENABLED) the UI reads the prebuilt spec too.
+etc/apispec.json is the spec of this tree, a test fails when it is outdated.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import click
+from flask import Response, current_app, request
+from flask.cli import AppGroup
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_SPEC_FILE = 'etc/apispec.json'
+SPEC_ROUTE = '/apispec_1.json'
+FLASGGER_SPEC_ENDPOINT = 'flasgger.apispec_1'
+
+apispec_cli = AppGroup('apispec', help='Build the prebuilt OpenAPI spec.')
+
+
+def resolve_spec_path(path: str) -> Path:
+    """Relative paths are relative to the project root, not to the current directory."""
+    spec_path = Path(path)
+    return spec_path if spec_path.is_absolute() else PROJECT_ROOT / spec_path
+
+
+def build_api_spec(app) -> dict:
+    """
+    The spec flasgger builds from the route docstrings (it needs API_DOCS_ENABLED).
+    """
+    swagger = app.extensions.get('swagger')
+    if swagger is None:
+        raise RuntimeError(
+            'The API docs are disabled, set API_DOCS_ENABLED=true to build the spec'
+        )
+    with app.test_request_context():
+        return swagger.get_apispecs()
+
+
+def dump_api_spec(spec: dict) -> str:
+    # Sorted and indented: the file is stable and its changes read well on a diff.
+    return json.dumps(spec, sort_keys=True, indent=2) + '\n'
+
+
+@apispec_cli.command('build')
+@click.option(
+    '--output',
+    default=DEFAULT_SPEC_FILE,
+    show_default=True,
+    help='Where to write the spec.',
+)
+def build_command(output: str):
+    """Build the OpenAPI spec from the route docstrings into a JSON file."""
+    try:
+        spec = build_api_spec(current_app)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    path = resolve_spec_path(output)
+    path.write_text(dump_api_spec(spec), encoding='utf-8')
+    click.echo(
+        f'OpenAPI spec with {len(spec.get("paths", {}))} paths written to {path}'
+    )
+
+
+class PrebuiltApiSpec:
+    def __init__(self):
+        self.body = None
+        self.etag = None
+        self.max_age = 0
+
+    def init_app(self, app):
+        app.cli.add_command(apispec_cli)
+        if not app.config['API_SPEC_FILE']:
+            return
+        self.load(
+            resolve_spec_path(app.config['API_SPEC_FILE']),
+            max_age=app.config['API_SPEC_MAX_AGE'],
+        )
+        if FLASGGER_SPEC_ENDPOINT in app.view_functions:
+            # the Swagger UI keeps its URL, which now serves the prebuilt spec
+            app.view_functions[FLASGGER_SPEC_ENDPOINT] = self.view
+        else:
+            app.add_url_rule(SPEC_ROUTE, 'apispec', self.view)
+
+    def load(self, path: Path, max_age: int):
+        """
+        Reads (and validates) the spec once, on startup: a missing or broken file fails
+        the boot.
+        """
+        # served without the indentation of the file, which is there for the diffs
+        body = json.dumps(
+            json.loads(path.read_bytes()), sort_keys=True, separators=(',', ':')
+        ).encode()
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.max_age = max_age
+
+    def view(self):
+        response = Response(self.body, mimetype='application/json')
+        response.set_etag(self.etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        return response.make_conditional(request)
@@ -0,0 +1,204 @@
+"""
+Read-through caches used in front of the repositories.
+
+There are two tiers:
+- local: a per-process LRU with TTL (always available);
+- shared: an optional tier shared by all the workers (redis, only when a URL is
+  configured).
+
+Reads check local -> shared -> loader, and write back into the tiers that missed.
+"""
+
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe, per-process LRU cache where every entry expires after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class RedisCacheTier:
+    """
+    Shared tier on redis. The `redis` package is an optional dependency,
+    only needed when a shared cache URL is configured.
+
+    Errors are logged and treated as misses: the cache must never break a request.
+    """
+
+    def __init__(self, url: str, ttl: float, namespace: str):
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            raise ImportError(
+                'The shared cache tier requires the "redis" package '
+                '(pip install redis).'
+            ) from e
+
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=0.05, socket_connect_timeout=0.05
+        )
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key, default=None):
+        try:
+            payload = self._client.get(f'{self.namespace}:{key}')
+        except self._errors as e:
+            self.errors += 1
+            logger.warning(f'Shared cache get failed: {e}')
+            return default
+        if payload is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(payload)
+
+    def set(self, key, value):
+        try:
+            self._client.set(
+                f'{self.namespace}:{key}', pickle.dumps(value), px=int(self.ttl * 1000)
+            )
+        except self._errors as e:
+            self.errors += 1
+            logger.warning(f'Shared cache set failed: {e}')
+
+    def delete(self, key):
+        try:
+            self._client.delete(f'{self.namespace}:{key}')
+        except self._errors as e:
+            self.errors += 1
+            logger.warning(f'Shared cache delete failed: {e}')
+
+    def clear(self):
+        pass  # entries on the shared tier expire by themselves
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'errors': self.errors}
+
+
+class TieredCache:
+    """The local LRU, optionally backed by a shared tier."""
+
+    def __init__(
+        self, namespace: str, maxsize: int = 0, ttl: float = 0.0, shared_url: str = ''
+    ):
+        self.namespace = namespace
+        self.configure(maxsize=maxsize, ttl=ttl, shared_url=shared_url)
+
+    def configure(self, maxsize: int, ttl: float, shared_url: str = ''):
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.shared = (
+            RedisCacheTier(
+                url=shared_url, ttl=ttl, namespace=f'questrya:{self.namespace}'
+            )
+            if shared_url
+            else None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.local.maxsize > 0
+
+    def get(self, key, default=None):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key, _MISSING)
+            if value is not _MISSING:
+                self.local.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> dict:
+        return {
+            'namespace': self.namespace,
+            'local': self.local.stats(),
+            'shared': self.shared.stats() if self.shared is not None else None,
+        }
@@ -4,3 +4,23 @@ class DomainException(Exception):
     def __init__(self, message: str = ''):
         self.message = message
         super().__init__(self.message)
+
+
+class ServiceUnavailableException(Exception):
+    """
+    Raised when a shared resource is saturated and the request should be retried later
+    (HTTP 503).
+    """
+
+    def __init__(self, message: str = ''):
+        self.message = message
+        super().__init__(self.message)
+
+
+class DuplicateRecordException(Exception):
+    """Raised by the repositories when a write violates a unique constraint."""
+
+    def __init__(self, field: str, message: str = ''):
+        self.field = field
+        self.message = message
+        super().__init__(self.message)
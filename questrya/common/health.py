@@ -0,0 +1,153 @@
+"""
+Dependency checks behind the readiness probe.
+
+The checks (database, broker) run on a background thread every
+`refresh_interval` seconds and the probe only reads the last result, so a
+storm of probes never reaches the dependencies. All the checks of a round run
+in parallel under one overall time budget (`timeout`): a dependency that does
+not answer in time (e.g. the connection pool is exhausted and the checkout
+blocks) is reported as not ready, and its check is not started again while it
+is still hanging.
+
+A result older than `max_age` (the refresher died or is stuck) is not trusted:
+the next probe refreshes it inline, still under the time budget.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, wait
+from datetime import UTC, datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessChecker:
+    def __init__(
+        self, timeout: float = 1.0, refresh_interval: float = 5.0, max_age: float = 15.0
+    ):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._pid = None
+        self._generation = 0
+        self.configure(
+            checks={},
+            timeout=timeout,
+            refresh_interval=refresh_interval,
+            max_age=max_age,
+        )
+
+    def init_app(self, app, checks: dict):
+        self.configure(
+            checks=checks,
+            timeout=app.config['READINESS_TIMEOUT'],
+            refresh_interval=app.config['READINESS_REFRESH_INTERVAL'],
+            max_age=app.config['READINESS_MAX_AGE'],
+        )
+
+    def configure(
+        self, checks: dict, timeout: float, refresh_interval: float, max_age: float
+    ):
+        """
+        checks: dependency name -> callable that raises when the dependency is not
+        ready.
+        """
+        self.checks = checks
+        self.timeout = timeout
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._running = {}  # dependency name -> future of its last check
+        self._result = None  # (time.monotonic() of the check, status)
+        with self._lock:
+            # the refresher is started again, with the new settings
+            self._generation += 1
+            self._pid = None
+
+    def get_status(self) -> dict:
+        self._start()
+        result = self._result
+        if result is None or time.monotonic() - result[0] > self.max_age:
+            with self._refresh_lock:  # concurrent probes wait for a single refresh
+                result = self._result
+                if result is None or time.monotonic() - result[0] > self.max_age:
+                    return self.refresh()
+        return result[1]
+
+    def refresh(self) -> dict:
+        started = time.monotonic()
+        futures = {}
+        for name, check in self.checks.items():
+            future = self._running.get(name)
+            if future is None or future.done():
+                future = self._running[name] = self._submit(name, check)
+            futures[name] = future
+
+        done, _ = wait(futures.values(), timeout=self.timeout)
+        dependencies = {}
+        for name, future in futures.items():
+            if future in done:
+                latency_ms, error = future.result()
+            else:
+                latency_ms, error = (
+                    (time.monotonic() - started) * 1000,
+                    f'timed out after {self.timeout}s',
+                )
+            dependencies[name] = {
+                'ready': error is None,
+                'latency_ms': round(latency_ms, 2),
+                'error': error,
+            }
+
+        status = {
+            'ready': all(dependency['ready'] for dependency in dependencies.values()),
+            'checked_at': datetime.now(UTC).replace(tzinfo=None).isoformat(),
+            'dependencies': dependencies,
+        }
+        self._result = (time.monotonic(), status)
+        return status
+
+    @staticmethod
+    def _submit(name: str, check) -> Future:
+        # A daemon thread per check (instead of an executor, whose threads are joined
+        # on exit), so that a hanging dependency can never hold the worker shutdown.
+        future = Future()
+
+        def run():
+            started = time.perf_counter()
+            try:
+                check()
+                error = None
+            except Exception as e:
+                logger.debug(f'Readiness check {name} failed', exc_info=True)
+                error = f'{type(e).__name__}: {e}'
+            future.set_result(((time.perf_counter() - started) * 1000, error))
+
+        threading.Thread(
+            target=run, name=f'readiness-check-{name}', daemon=True
+        ).start()
+        return future
+
+    def _start(self):
+        # Threads do not survive a fork, so the refresher is started per pid.
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._running = {}
+                if self.refresh_interval > 0:
+                    threading.Thread(
+                        target=self._refresh_forever,
+                        args=(self._generation,),
+                        name='readiness-refresher',
+                        daemon=True,
+                    ).start()
+
+    def _refresh_forever(self, generation: int):
+        pid = os.getpid()
+        while self._generation == generation and self._pid == pid:
+            try:
+                with self._refresh_lock:
+                    self.refresh()
+            except Exception:
+                logger.exception('Readiness refresh failed')
+            time.sleep(self.refresh_interval)
@@ -0,0 +1,94 @@
+"""
+Opt-in cache of verified JWTs.
+
+Clients send the same access token on every request until it expires, and
+flask_jwt_extended decodes it (twice) and checks its signature every time.
+With this cache, a token that was already fully verified by this process is
+served from a bounded LRU, keyed by the token digest, until its `exp` (or the
+cache TTL, whichever comes first).
+
+Only the decoding and the signature check are skipped: the token type, the
+freshness, the blocklist (token_in_blocklist_loader) and the claims
+verification callbacks still run on every request, so a revoked token is
+rejected even while it is cached. Revoking a token outside of those callbacks
+(or rotating JWT_SECRET_KEY) must call invalidate() / clear().
+"""
+
+import hashlib
+import time
+
+from flask_jwt_extended import JWTManager
+
+from questrya.common.cache import LRUCache
+
+
+class VerifiedTokenCache:
+    """maxsize=0 disables the cache (every token is fully verified)."""
+
+    def __init__(self, maxsize: int = 0, ttl: float = 300.0):
+        self.configure(maxsize=maxsize, ttl=ttl)
+
+    def configure(self, maxsize: int, ttl: float):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.maxsize > 0
+
+    def get(self, encoded_token: str) -> dict:
+        key = self.get_key(encoded_token)
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+
+        expires_at, claims = entry
+        if expires_at is not None and expires_at <= time.time():
+            self.cache.delete(key)
+            return None
+        return dict(claims)  # the callers must not be able to change the cached claims
+
+    def set(self, encoded_token: str, claims: dict):
+        self.cache.set(self.get_key(encoded_token), (claims.get('exp'), dict(claims)))
+
+    def invalidate(self, encoded_token: str):
+        self.cache.delete(self.get_key(encoded_token))
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+    @staticmethod
+    def get_key(encoded_token: str) -> bytes:
+        return hashlib.sha256(encoded_token.encode('utf-8')).digest()
+
+
+class CachingJWTManager(JWTManager):
+    """
+    JWTManager that looks the verified tokens up on a VerifiedTokenCache before decoding
+    them.
+    """
+
+    def __init__(self, token_cache: VerifiedTokenCache, *args, **kwargs):
+        self.token_cache = token_cache
+        super().__init__(*args, **kwargs)
+
+    def init_app(self, app, *args, **kwargs):
+        self.token_cache.clear()  # the secret key may have changed
+        super().init_app(app, *args, **kwargs)
+
+    def _decode_jwt_from_config(
+        self, encoded_token: str, csrf_value=None, allow_expired: bool = False
+    ) -> dict:
+        # CSRF double submit values and expired tokens always take the full path.
+        if not self.token_cache.enabled or csrf_value or allow_expired:
+            return super()._decode_jwt_from_config(
+                encoded_token, csrf_value, allow_expired
+            )
+
+        claims = self.token_cache.get(encoded_token)
+        if claims is None:
+            claims = super()._decode_jwt_from_config(encoded_token)
+            self.token_cache.set(encoded_token, claims)
+        return claims
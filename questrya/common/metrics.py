@@ -0,0 +1,261 @@
+"""
+Prometheus metrics of the HTTP requests, per blueprint and per route.
+
+The gunicorn workers are separate processes, so with PROMETHEUS_MULTIPROC_DIR
+set (e.g. a directory under /dev/shm) every worker writes its samples to its own
+mmap files there, and /api/monitor/metrics aggregates the files of all the
+workers. Without it, the metrics are those of the current process only
+(development server and tests).
+
+The dir must be empty when the server starts, and the files of a dead worker
+are cleaned up by gunicorn_settings.child_exit.
+
+The celery worker has no /api/monitor/metrics route: with WORKER_METRICS_PORT
+set, its main process serves the metrics of the worker (e.g. the tasks not run
+again by the idempotency keys) on that port, aggregating its prefork children
+through a PROMETHEUS_MULTIPROC_DIR of its own (see init_celery).
+
+Recording a request is a couple of dict lookups (the labeled children are
+cached) plus the mmap writes, i.e. a few microseconds.
+"""
+
+import glob
+import os
+import time
+
+from celery.signals import worker_init, worker_process_shutdown
+from flask import g, request
+
+from questrya import settings
+
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    # prometheus_client decides between the in-memory and the mmap values on import.
+    os.makedirs(settings.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', settings.PROMETHEUS_MULTIPROC_DIR)
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+# Requests that did not match any route are grouped, so that scanners
+# hitting random URLs cannot blow up the number of series.
+UNMATCHED_ENDPOINT = 'unmatched'
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+STATEMENTS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.latency = Histogram(
+            'questrya_http_request_duration_seconds',
+            'HTTP request latency, per blueprint and route.',
+            ['blueprint', 'endpoint', 'method'],
+            buckets=LATENCY_BUCKETS,
+        )
+        self.requests = Counter(
+            'questrya_http_requests',
+            'HTTP responses, per blueprint, route and status code.',
+            ['blueprint', 'endpoint', 'method', 'status'],
+        )
+        self.in_flight = Gauge(
+            'questrya_http_requests_in_flight',
+            'HTTP requests being served, per blueprint.',
+            ['blueprint'],
+            multiprocess_mode='livesum',
+        )
+        # fed by the SQL statements accounting (questrya/sql_db/accounting.py)
+        self.db_statements = Histogram(
+            'questrya_db_statements_per_request',
+            'SQL statements executed by a request, per blueprint and route.',
+            ['blueprint', 'endpoint', 'method'],
+            buckets=STATEMENTS_BUCKETS,
+        )
+        self.db_time = Histogram(
+            'questrya_db_time_per_request_seconds',
+            'Time spent on SQL statements by a request, per blueprint and route.',
+            ['blueprint', 'endpoint', 'method'],
+            buckets=LATENCY_BUCKETS,
+        )
+        self.db_slow_statements = Counter(
+            'questrya_db_slow_statements',
+            'SQL statements slower than SQL_SLOW_QUERY_MS, per blueprint and route.',
+            ['blueprint', 'endpoint', 'method'],
+        )
+        self.db_n_plus_one = Counter(
+            'questrya_db_n_plus_one',
+            'Statements repeated more than SQL_N_PLUS_ONE_THRESHOLD times '
+            'on a request, per blueprint and route.',
+            ['blueprint', 'endpoint', 'method'],
+        )
+        # fed by the memory watchdog (questrya/common/watchdog.py) and by
+        # gunicorn_settings.worker_exit
+        self.worker_rss = Gauge(
+            'questrya_worker_rss_bytes',
+            'Resident memory of each worker.',
+            multiprocess_mode='liveall',
+        )
+        self.worker_recycles = Counter(
+            'questrya_worker_recycles',
+            'Workers retired to be replaced by a new one, '
+            'per reason (memory, max_requests).',
+            ['reason'],
+        )
+        # fed by the idempotency keys (questrya/idempotency)
+        self.idempotent_duplicates = Counter(
+            'questrya_idempotent_duplicates',
+            'Retried requests and redelivered tasks not run again, '
+            'per kind (request, task) and outcome (replayed, in_progress, mismatch).',
+            ['kind', 'outcome'],
+        )
+        # labels() takes a lock and builds a key on every call, so the children are
+        # cached: (blueprint, endpoint, method) -> (latency, in_flight)
+        self._route_children = {}
+        # (blueprint, endpoint, method) -> (statements, time, slow, n_plus_one)
+        self._db_children = {}
+        # ((blueprint, endpoint, method), status) -> requests
+        self._requests_children = {}
+
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def before_request(self):
+        current_request = request._get_current_object()  # resolve the proxy only once
+        route = (
+            current_request.blueprint or '',
+            current_request.endpoint
+            if current_request.url_rule is not None
+            else UNMATCHED_ENDPOINT,
+            current_request.method,
+        )
+        children = self._route_children.get(route)
+        if children is None:
+            children = self._route_children[route] = (
+                self.latency.labels(*route),
+                self.in_flight.labels(route[0]),
+            )
+        children[1].inc()
+        g.request_metrics = (time.perf_counter(), route, children)
+
+    def after_request(self, response):
+        state = g.get('request_metrics')
+        if state is None:
+            return response
+
+        started_at, route, children = state
+        children[0].observe(time.perf_counter() - started_at)
+        key = (route, response.status_code)
+        requests_child = self._requests_children.get(key)
+        if requests_child is None:
+            requests_child = self._requests_children[key] = self.requests.labels(
+                *route, str(response.status_code)
+            )
+        requests_child.inc()
+        return response
+
+    def observe_queries(
+        self, statements: int, seconds: float, slow: int, n_plus_one: int
+    ):
+        """The SQL statements of the current request."""
+        state = g.get('request_metrics')
+        if state is None:
+            return
+
+        route = state[1]
+        children = self._db_children.get(route)
+        if children is None:
+            children = self._db_children[route] = tuple(
+                metric.labels(*route)
+                for metric in (
+                    self.db_statements,
+                    self.db_time,
+                    self.db_slow_statements,
+                    self.db_n_plus_one,
+                )
+            )
+        children[0].observe(statements)
+        children[1].observe(seconds)
+        if slow:
+            children[2].inc(slow)
+        if n_plus_one:
+            children[3].inc(n_plus_one)
+
+    def observe_worker_rss(self, rss_bytes: int):
+        self.worker_rss.set(rss_bytes)
+
+    def count_worker_recycle(self, reason: str):
+        self.worker_recycles.labels(reason).inc()
+
+    def count_idempotent_duplicate(self, kind: str, outcome: str):
+        self.idempotent_duplicates.labels(kind, outcome).inc()
+
+    def teardown_request(self, exception=None):
+        state = g.pop('request_metrics', None)
+        if state is not None:
+            state[2][1].dec()
+
+    def get_registry(self) -> CollectorRegistry:
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return registry
+        return REGISTRY
+
+    def generate(self) -> tuple:
+        """The metrics in the Prometheus text format, and their content type."""
+        return generate_latest(self.get_registry()), CONTENT_TYPE_LATEST
+
+    def serve(self, port: int, addr: str = '0.0.0.0') -> tuple:
+        """
+        Serves the metrics on a port of their own (the celery worker). Returns (server,
+        thread).
+        """
+        return start_http_server(port, addr=addr, registry=self.get_registry())
+
+    def init_celery(self, celery, port: int):
+        """The workers of celery serve their metrics on port (0 disables it)."""
+        if not port:
+            return
+        self._celery = celery
+        self._worker_port = port
+        worker_init.connect(self.on_worker_init, weak=False)
+        worker_process_shutdown.connect(self.on_worker_process_shutdown, weak=False)
+
+    def on_worker_init(self, sender=None, **kwargs):
+        """On the main process of the worker, before its pool starts."""
+        if getattr(sender, 'app', None) is not self._celery:
+            return
+        metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+        if (
+            metrics_dir
+        ):  # the files of a previous run would be aggregated as if they were current
+            for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+                os.remove(path)
+        self.serve(self._worker_port)
+
+    def on_worker_process_shutdown(self, **kwargs):
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,179 @@
+"""
+Runs bcrypt on a dedicated, bounded process pool.
+
+bcrypt is CPU bound by design, so hashing it inline on the gunicorn gthread
+workers makes a burst of logins starve every other request served by the
+same worker. Here it is pushed to a small process pool instead, sized
+independently from the gunicorn threads. When the pool and its queue are
+full, new requests fail fast with a ServiceUnavailableException (503)
+instead of piling up behind the ones already waiting.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+import bcrypt as bcrypt_lib
+
+from questrya.common.exceptions import ServiceUnavailableException
+from questrya.common.timing import timed
+
+BCRYPT_PREFIX = b'2b'  # the same prefix used by flask_bcrypt
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords with bcrypt.
+
+    With workers=0 the hashing runs inline on the calling thread (useful for
+    development and tests), but the queue bounds and the statistics still apply.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        queue_size: int = 0,
+        rounds: int = 12,
+        timeout: float | None = None,
+    ):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self.configure(
+            workers=workers, queue_size=queue_size, rounds=rounds, timeout=timeout
+        )
+
+    def init_app(self, app):
+        self.configure(
+            workers=app.config['PASSWORD_HASHER_WORKERS'],
+            queue_size=app.config['PASSWORD_HASHER_QUEUE_SIZE'],
+            rounds=app.config['PASSWORD_HASHER_ROUNDS'],
+            timeout=app.config['PASSWORD_HASHER_TIMEOUT'],
+        )
+
+    def configure(
+        self, workers: int, queue_size: int, rounds: int, timeout: float | None = None
+    ):
+        self.shutdown()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._in_flight = 0
+        self._rejected = 0
+        self._timed_out = 0  # the caller stopped waiting, the job still ran on the pool
+        self._completed = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    @timed('bcrypt')
+    def hash(self, password: str) -> str:
+        salt = bcrypt_lib.gensalt(rounds=self.rounds, prefix=BCRYPT_PREFIX)
+        pw_hash = self._run(bcrypt_lib.hashpw, password.encode('utf-8'), salt)
+        return pw_hash.decode('utf-8')
+
+    @timed('bcrypt')
+    def check(self, pw_hash: str, password: str) -> bool:
+        return self._run(
+            bcrypt_lib.checkpw, password.encode('utf-8'), pw_hash.encode('utf-8')
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'in_flight': self._in_flight,
+                'queue_depth': max(self._in_flight - max(self.workers, 1), 0),
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'completed': self._completed,
+                'avg_latency_ms': (self._total_seconds / self._completed * 1000)
+                if self._completed
+                else 0.0,
+                'max_latency_ms': self._max_seconds * 1000,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor and self._executor_pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ServiceUnavailableException(
+                message='Password hashing queue is full, try again later.'
+            )
+
+        with self._lock:
+            self._in_flight += 1
+        started = time.perf_counter()
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._record(started)
+                self._release()
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            self._release()
+            self.shutdown()
+            raise ServiceUnavailableException(
+                message='Password hashing is unavailable, try again later.'
+            )
+        # The slot is held until the job is done on the pool, even when the caller
+        # stopped waiting for it (timeout), so that the bound on the queue still holds.
+        future.add_done_callback(lambda future: self._release())
+
+        timed_out = False
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            timed_out = True
+            raise ServiceUnavailableException(
+                message='Password hashing timed out, try again later.'
+            )
+        except BrokenProcessPool:
+            # A pool process died (e.g. OOM killed): a new pool starts on the next call.
+            self.shutdown()
+            raise ServiceUnavailableException(
+                message='Password hashing is unavailable, try again later.'
+            )
+        finally:
+            self._record(started, timed_out=timed_out)
+
+    def _record(self, started: float, timed_out: bool = False):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            if timed_out:
+                self._timed_out += 1
+                return
+            self._completed += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily and per pid, so that a pool started before
+        # gunicorn forks its workers is never shared between them.
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=get_context('spawn')
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
@@ -0,0 +1,221 @@
+"""
+Statistical (sampling) profiler for the live workers.
+
+A daemon thread wakes up every `interval` seconds and records the stack of
+the other threads (sys._current_frames), so the profiled code is not
+instrumented and only pays for the sampler holding the GIL a few microseconds
+per sample (under 1% at the default 100 samples/s, see benchmarks/profiler_overhead.py).
+
+The result is written in the collapsed stacks format ("frame;frame;frame count"
+per line), which flamegraph.pl, speedscope and inferno read directly.
+
+A profile is started:
+- for the whole worker for N seconds, by POST /api/monitor/profile (admin) or by
+  sending SIGUSR2 to a worker pid (see gunicorn_settings.post_worker_init);
+- for a single request, with the X-Profile-Token header (PROFILER_REQUEST_TOKEN).
+"""
+
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import UTC, datetime
+from hmac import compare_digest
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = 'X-Profile-Token'
+PROFILE_FILE_HEADER = 'X-Profile-File'
+
+
+class StackSampler:
+    """Samples the stacks of the threads of this process (or of only one thread)."""
+
+    def __init__(self, interval: float = 0.01, thread_id: int | None = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples = Counter()  # collapsed stack -> samples
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name='stack-sampler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def write(self, path: str) -> str:
+        with open(path, 'w', encoding='utf-8') as collapsed_file:
+            collapsed_file.writelines(
+                f'{stack} {count}\n' for stack, count in self.samples.most_common()
+            )
+        return path
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            if self.thread_id is not None:
+                frames = (
+                    {self.thread_id: frames[self.thread_id]}
+                    if self.thread_id in frames
+                    else {}
+                )
+            for thread_id, frame in frames.items():
+                if thread_id != own_id:
+                    self.samples[self._collapse(frame)] += 1
+            self.sample_count += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(
+                f'{code.co_name} '
+                f'({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            )
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+
+class WorkerProfiler:
+    def __init__(
+        self,
+        output_dir: str = '/dev/shm',
+        interval: float = 0.01,
+        max_seconds: float = 60.0,
+        request_token: str = '',
+    ):
+        self._lock = threading.Lock()
+        self._sampler = None
+        self.configure(
+            output_dir=output_dir,
+            interval=interval,
+            max_seconds=max_seconds,
+            request_token=request_token,
+        )
+
+    def init_app(self, app):
+        self.configure(
+            output_dir=app.config['PROFILER_OUTPUT_DIR'],
+            interval=app.config['PROFILER_INTERVAL_MS'] / 1000,
+            max_seconds=app.config['PROFILER_MAX_SECONDS'],
+            request_token=app.config['PROFILER_REQUEST_TOKEN'],
+        )
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+
+    def configure(
+        self,
+        output_dir: str,
+        interval: float,
+        max_seconds: float,
+        request_token: str = '',
+    ):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.request_token = request_token
+
+    def profile_worker(self, seconds: float) -> dict:
+        """
+        Samples every thread of this worker for `seconds` on the background, then writes
+        the profile. Only one worker profile runs at a time.
+        """
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(
+                f'The profile must last between 0 and {self.max_seconds} seconds'
+            )
+
+        path = self.get_output_path(label='worker')
+        with self._lock:
+            if self._sampler is not None:
+                raise ValueError('A profile is already running on this worker')
+            self._sampler = StackSampler(interval=self.interval)
+        self._sampler.start()
+        timer = threading.Timer(seconds, self._finish_worker_profile, args=(path,))
+        timer.daemon = True
+        timer.start()
+        return {
+            'pid': os.getpid(),
+            'seconds': seconds,
+            'interval_ms': self.interval * 1000,
+            'path': path,
+        }
+
+    def _finish_worker_profile(self, path: str):
+        with self._lock:
+            sampler, self._sampler = self._sampler, None
+        sampler.stop()
+        sampler.write(path)
+        logger.info(
+            f'Profile of worker {os.getpid()} written to {path} '
+            f'({sampler.sample_count} samples)'
+        )
+
+    def before_request(self):
+        token = request.headers.get(PROFILE_TOKEN_HEADER)
+        if (
+            token
+            and self.request_token
+            and compare_digest(token.encode(), self.request_token.encode())
+        ):
+            sampler = StackSampler(
+                interval=self.interval, thread_id=threading.get_ident()
+            )
+            sampler.start()
+            g.request_profiler = sampler
+
+    def after_request(self, response):
+        sampler = g.pop('request_profiler', None)
+        if sampler is not None:
+            sampler.stop()
+            path = sampler.write(
+                self.get_output_path(
+                    label=(request.endpoint or 'unmatched').replace('.', '-')
+                )
+            )
+            response.headers[PROFILE_FILE_HEADER] = path
+        return response
+
+    def get_output_path(self, label: str) -> str:
+        timestamp = datetime.now(UTC).strftime('%Y%m%dT%H%M%S%f')
+        return os.path.join(
+            self.output_dir,
+            f'questrya-profile-{os.getpid()}-{label}-{timestamp}.collapsed',
+        )
+
+
+def profile_for_signal(profiler: WorkerProfiler, seconds: float):
+    """
+    Signal handler factory. The handler only starts a thread: it runs on the main
+    thread, between any two bytecodes, so it must not take locks (e.g. logging's) nor
+    raise.
+    """
+
+    def start_profile():
+        try:
+            result = profiler.profile_worker(seconds=seconds)
+            logger.info(
+                f'Profiling worker {result["pid"]} for {seconds}s, '
+                f'writing to {result["path"]}'
+            )
+        except ValueError as e:
+            logger.warning(f'Could not start the profiler: {e}')
+
+    def handler(signum, frame):
+        threading.Thread(
+            target=start_profile, name='profiler-signal', daemon=True
+        ).start()
+
+    return handler
@@ -0,0 +1,183 @@
+"""
+Batch tasks: many small messages, one task run.
+
+A task with base=BatchTask is not run once per message. The worker buffers
+its messages and runs it with the list of them (BatchItem) when it has
+`flush_every` of them, or every `flush_interval` seconds, whatever comes
+first. E.g. for the high frequency events (playtime pings, activity), so that
+the handler does one bulk insert instead of a task run and a transaction
+per event:
+
+    @shared_task(base=BatchTask, flush_every=100, flush_interval=1.0)
+    def record_pings(items: list[BatchItem]):
+        PingRepository.bulk_create([item.kwargs for item in items])
+
+    record_pings.delay(user_uuid=..., played_seconds=...)
+
+Acks: the messages are acked only after the handler returns (acks_late), so
+the ones buffered or being handled when the worker stops (a restart, a
+crash, a child killed by the OOM killer) are redelivered by the broker: the
+handler must be idempotent. When the handler raises, the whole batch
+is acked, as celery does for a failed task (task_acks_on_failure_or_timeout),
+or else rejected to the dead letter exchange. The unacked messages count
+for the prefetch limit of the worker (concurrency x WORKER_PREFETCH_MULTIPLIER):
+below flush_every, the batches are flushed by flush_interval only.
+
+An eager call (task_always_eager, on the dev app) runs the handler at once,
+with a list of one item.
+"""
+
+import logging
+from collections import deque
+from typing import NamedTuple
+
+from celery import Task
+from celery.utils import uuid
+from celery.utils.imports import symbol_by_name
+from celery.utils.nodenames import gethostname
+from celery.worker.strategy import hybrid_to_proto2, proto1_to_proto2
+
+logger = logging.getLogger(__name__)
+
+
+class BatchItem(NamedTuple):
+    """One call of a batch task: what its handler gets, a list of them."""
+
+    id: str
+    args: tuple
+    kwargs: dict
+    delivery_info: dict
+    hostname: str
+
+
+def run_batch(task, items: list) -> bool:
+    """Runs on the pool (e.g. a prefork child): whether the handler succeeded."""
+    try:
+        task(items)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Batch of %d %s failed', len(items), task.name)
+        return False
+    return True
+
+
+class BatchTask(Task):
+    abstract = True
+    ignore_result = True
+    # the calls do not have the signature of the handler (a list of BatchItem)
+    typing = False
+    flush_every = 100
+    flush_interval = 1.0  # seconds
+
+    def __init__(self):
+        self._buffer = deque()
+        self._timer_entry = None
+        self._pool = None
+
+    def __call__(self, *args, **kwargs):
+        # through the task class of the app: the worker app context (see
+        # questrya/common/task_context.py)
+        return self.app.Task.__call__(self, *args, **kwargs)
+
+    def apply(self, args=None, kwargs=None, *options_args, **options):
+        """The eager call: the handler runs with one item."""
+        item = BatchItem(
+            options.get('task_id') or uuid(),
+            tuple(args or ()),
+            kwargs or {},
+            {},
+            gethostname(),
+        )
+        return super().apply(([item],), {}, *options_args, **options)
+
+    def Strategy(self, task, app, consumer):  # pylint: disable=invalid-name
+        """
+        Used by the worker instead of its default strategy: buffer the requests, instead
+        of running them.
+        """
+        self._pool = consumer.pool
+        Request = symbol_by_name(task.Request)  # pylint: disable=invalid-name
+        revoked_tasks = consumer.controller.state.revoked
+
+        def task_message_handler(message, body, ack, reject, callbacks, **kwargs):
+            if body is None and 'args' not in message.payload:
+                body, headers, decoded, utc = (
+                    message.body,
+                    message.headers,
+                    False,
+                    app.uses_utc_timezone(),
+                )
+            elif 'args' in message.payload:
+                body, headers, decoded, utc = hybrid_to_proto2(message, message.payload)
+            else:
+                body, headers, decoded, utc = proto1_to_proto2(message, body)
+            request = Request(
+                message,
+                on_ack=ack,
+                on_reject=reject,
+                app=app,
+                hostname=consumer.hostname,
+                eventer=consumer.event_dispatcher,
+                task=task,
+                connection_errors=consumer.connection_errors,
+                body=body,
+                headers=headers,
+                decoded=decoded,
+                utc=utc,
+            )
+            if (request.expires or request.id in revoked_tasks) and request.revoked():
+                return
+
+            self._buffer.append(request)
+            if self._timer_entry is None:
+                self._timer_entry = consumer.timer.call_repeatedly(
+                    self.flush_interval, self.flush
+                )
+            if len(self._buffer) >= self.flush_every:
+                self.flush()
+
+        return task_message_handler
+
+    def flush(self):
+        """Sends the buffered requests to the pool, flush_every at most on each run."""
+        while self._buffer:
+            requests = [
+                self._buffer.popleft()
+                for _ in range(min(self.flush_every, len(self._buffer)))
+            ]
+            items = [
+                BatchItem(
+                    request.id,
+                    tuple(request.args),
+                    request.kwargs,
+                    request.delivery_info,
+                    request.hostname,
+                )
+                for request in requests
+            ]
+
+            def on_return(succeeded, requests=requests):
+                self.on_batch_return(requests, succeeded)
+
+            def on_worker_lost(*args, requests=requests):
+                self.on_batch_return(requests, succeeded=None)
+
+            self._pool.apply_async(
+                run_batch,
+                args=(self, items),
+                callback=on_return,
+                error_callback=on_worker_lost,
+            )
+
+    def on_batch_return(self, requests: list, succeeded: bool):
+        """
+        succeeded: None when the pool lost the process running the batch (redelivered).
+        """
+        for request in requests:
+            if succeeded is True:
+                request.acknowledge()
+            elif succeeded is None:
+                request.reject(requeue=True)
+            elif self.app.conf.task_acks_on_failure_or_timeout:
+                request.acknowledge()
+            else:
+                request.reject(requeue=False)
@@ -0,0 +1,122 @@
+"""
+App context and database session of the celery tasks.
+
+Each worker process (each prefork child, including the ones --autoscale starts
+and stops) pushes one app context, on its first task, and keeps it until it
+exits, instead of pushing and popping one on every task. Every task still
+starts clean:
+- the database session is removed after each task (its transaction rolled back
+  if the task did not commit, its connection back to the pool), so nothing a
+  task loaded or left pending leaks into the next one;
+- flask.g is a new one for each task.
+A task called synchronously by another one (task(...) or task.apply()) is
+part of the outer task: it shares its g and session, and only the outermost
+task resets them.
+
+A task called inside an app context that is not the one of the worker (e.g. an
+eager task, inside a request) runs in it and shares its session, as before.
+
+On a new child, the connections inherited from the parent are dropped
+(worker_process_init), and on the way out the child closes its own
+(worker_process_shutdown), so the autoscale churn does not leave connections
+open on the database.
+"""
+
+import logging
+import os
+import threading
+
+from celery.signals import worker_process_init, worker_process_shutdown
+from flask import has_app_context
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerAppContext:
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.dispose_engines = None
+        self._local = threading.local()  # one context per thread (the threads pool)
+
+    def init_app(self, app, celery, db, dispose_engines):
+        """
+        Makes celery.Task run in the worker app context.
+        dispose_engines: function(app, close), to reset (after the fork) and close (on
+        exit) the database pools.
+        """
+        self.app = app
+        self.db = db
+        self.dispose_engines = dispose_engines
+        worker_process_init.connect(self.on_process_init, weak=False)
+        worker_process_shutdown.connect(self.on_process_shutdown, weak=False)
+
+        worker_context = self
+        task_class = celery.Task
+
+        class ContextTask(task_class):
+            def __call__(self, *args, **kwargs):
+                return worker_context.run(task_class.__call__, self, *args, **kwargs)
+
+        celery.Task = ContextTask
+
+    @property
+    def context(self):
+        """The app context of this process and thread, if pushed."""
+        if getattr(self._local, 'pid', None) != os.getpid():
+            return None
+        return self._local.context
+
+    def push(self):
+        context = self.app.app_context()
+        context.push()
+        self._local.context = context
+        self._local.pid = os.getpid()
+        return context
+
+    def pop(self):
+        context = self.context
+        self._local.context = None
+        if context is not None:
+            self.db.session.remove()
+            context.pop()
+
+    def run(self, call, *args, **kwargs):
+        context = self.context
+        if context is None:
+            if (
+                has_app_context()
+            ):  # e.g. an eager task inside a request: its context and session
+                return call(*args, **kwargs)
+            context = self.push()
+        if getattr(
+            self._local, 'depth', 0
+        ):  # called by another task: its g and session
+            return self.run_nested(call, *args, **kwargs)
+        context.g = self.app.app_ctx_globals_class()
+        self._local.depth = 1
+        try:
+            return call(*args, **kwargs)
+        finally:
+            self._local.depth = 0
+            self.db.session.remove()
+
+    def run_nested(self, call, *args, **kwargs):
+        self._local.depth += 1
+        try:
+            return call(*args, **kwargs)
+        finally:
+            self._local.depth -= 1
+
+    def on_process_init(self, **kwargs):
+        self._local = (
+            threading.local()
+        )  # the context of the parent, if any, is not ours
+        self.dispose_engines(self.app, close=False)
+
+    def on_process_shutdown(self, **kwargs):
+        try:
+            self.pop()
+            self.dispose_engines(self.app, close=True)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Could not close the app context of the worker process')
@@ -0,0 +1,245 @@
+"""
+Serialization, compression and claim check of the Celery task messages.
+
+- Serializer "msgpack-questrya": msgpack (binary, ~30-50% smaller than JSON
+  and faster to encode and decode), extended with datetime, date, UUID and
+  Decimal so that the tasks get them back as such. Decoding only ever builds
+  these types, unlike pickle, which runs arbitrary code from the broker.
+- Compression: a message body over TASK_COMPRESSION_THRESHOLD bytes is
+  compressed with TASK_COMPRESSION, with the standard kombu "compression"
+  header, so the workers decompress it on their own. The small messages, most
+  of them, skip it (compressing a few hundred bytes saves nothing and costs time).
+- Claim check: a payload over TASK_CLAIM_CHECK_THRESHOLD bytes is written to
+  TASK_CLAIM_CHECK_DIR (a directory shared by the web and the celery workers)
+  and the message only carries its key, so that the broker never holds the
+  big payloads. The files are kept (a redelivered message needs its payload
+  again) and purged once older than TASK_CLAIM_CHECK_TTL.
+"""
+
+import decimal
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import date, datetime
+from functools import partial
+
+import msgpack
+from celery.app.amqp import AMQP
+from kombu import Producer
+from kombu.compression import compress
+from kombu.serialization import register
+
+logger = logging.getLogger(__name__)
+
+SERIALIZER_NAME = 'msgpack-questrya'
+CONTENT_TYPE = 'application/x-questrya-msgpack'
+
+# msgpack extension type codes
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_UUID = 3
+EXT_DECIMAL = 4
+EXT_CLAIM_CHECK = 10
+
+CLAIM_CHECK_KEY = re.compile(r'^[0-9a-f]{32}$')
+
+
+def encode_ext(obj):
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, date):
+        return msgpack.ExtType(EXT_DATE, obj.isoformat().encode())
+    if isinstance(obj, uuid.UUID):
+        return msgpack.ExtType(EXT_UUID, obj.bytes)
+    if isinstance(obj, decimal.Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, str(obj).encode())
+    raise TypeError(
+        f'Object of type {type(obj).__name__} is not serializable on a task message'
+    )
+
+
+class ClaimCheckStore:
+    """
+    Payloads on files, by key, in a directory shared by the producers and the workers.
+    """
+
+    def __init__(self, directory: str = '', ttl: float = 86400.0):
+        self._last_purge = 0.0
+        self.configure(directory=directory, ttl=ttl)
+
+    def configure(self, directory: str, ttl: float):
+        self.directory = directory
+        self.ttl = ttl
+
+    def put(self, payload: bytes) -> str:
+        self.purge_every(self.ttl / 10)
+        key = uuid.uuid4().hex
+        path = self.get_path(key)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(f'{path}.tmp', 'wb') as claim_file:
+            claim_file.write(payload)
+        os.replace(f'{path}.tmp', path)  # a worker never reads a half written payload
+        return key
+
+    def get(self, key: str) -> bytes:
+        with open(self.get_path(key), 'rb') as claim_file:
+            return claim_file.read()
+
+    def get_path(self, key: str) -> str:
+        if not CLAIM_CHECK_KEY.match(
+            key
+        ):  # the key comes from the broker: no path traversal
+            raise ValueError(f'Invalid claim check key: {key!r}')
+        return os.path.join(self.directory, f'{key}.msgpack')
+
+    def purge(self) -> int:
+        """Removes the payloads older than the ttl, returns how many."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return 0
+        expired_before = time.time() - self.ttl
+        removed = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < expired_before:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:  # purged by another process
+                    continue
+        return removed
+
+    def purge_every(self, seconds: float):
+        now = time.monotonic()
+        if now - self._last_purge >= seconds:
+            self._last_purge = now
+            self.purge()
+
+
+class TaskMessageCodec:
+    def __init__(self):
+        self.claim_checks = ClaimCheckStore()
+        self.configure(
+            compression='gzip',
+            compression_threshold=0,
+            claim_check_dir='',
+            claim_check_threshold=0,
+        )
+
+    def init_app(self, app, celery):
+        """
+        Registers the serializer on kombu and the compressing producer on celery (before
+        it is used).
+        """
+        self.configure(
+            compression=app.config['TASK_COMPRESSION'],
+            compression_threshold=app.config['TASK_COMPRESSION_THRESHOLD'],
+            claim_check_dir=app.config['TASK_CLAIM_CHECK_DIR'],
+            claim_check_threshold=app.config['TASK_CLAIM_CHECK_THRESHOLD'],
+            claim_check_ttl=app.config['TASK_CLAIM_CHECK_TTL'],
+        )
+        register(
+            SERIALIZER_NAME,
+            self.dumps,
+            self.loads,
+            content_type=CONTENT_TYPE,
+            content_encoding='binary',
+        )
+        celery.amqp_cls = TaskAMQP
+        celery.amqp.codec = self
+
+    def configure(
+        self,
+        compression: str,
+        compression_threshold: int,
+        claim_check_dir: str,
+        claim_check_threshold: int,
+        claim_check_ttl: float = 86400.0,
+    ):
+        """A threshold of 0 disables the compression / claim check."""
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.claim_check_threshold = claim_check_threshold if claim_check_dir else 0
+        self.claim_checks.configure(directory=claim_check_dir, ttl=claim_check_ttl)
+
+    def pack(self, obj) -> bytes:
+        """
+        The msgpack of obj, never claim checked (e.g. for the outbox, which is already
+        on the database).
+        """
+        return msgpack.packb(obj, default=encode_ext, use_bin_type=True)
+
+    def dumps(self, obj) -> bytes:
+        payload = self.pack(obj)
+        if self.claim_check_threshold and len(payload) > self.claim_check_threshold:
+            key = self.claim_checks.put(payload)
+            return msgpack.packb(
+                msgpack.ExtType(EXT_CLAIM_CHECK, key.encode()), use_bin_type=True
+            )
+        return payload
+
+    def loads(self, data: bytes):
+        return msgpack.unpackb(
+            data, ext_hook=self.decode_ext, raw=False, strict_map_key=False
+        )
+
+    def decode_ext(self, code: int, data: bytes):
+        if code == EXT_DATETIME:
+            return datetime.fromisoformat(data.decode())
+        if code == EXT_DATE:
+            return date.fromisoformat(data.decode())
+        if code == EXT_UUID:
+            return uuid.UUID(bytes=data)
+        if code == EXT_DECIMAL:
+            return decimal.Decimal(data.decode())
+        if code == EXT_CLAIM_CHECK:
+            return self.loads(self.claim_checks.get(data.decode()))
+        return msgpack.ExtType(code, data)
+
+    def compress(self, body: bytes, headers: dict) -> bytes:
+        if self.compression_threshold and len(body) > self.compression_threshold:
+            body, headers['compression'] = compress(body, self.compression)
+        return body
+
+
+class ThresholdCompressionProducer(Producer):
+    """Compresses the message bodies over the threshold of its codec."""
+
+    def __init__(self, *args, codec: TaskMessageCodec = None, **kwargs):
+        self.codec = codec
+        super().__init__(*args, **kwargs)
+
+    def _prepare(
+        self,
+        body,
+        serializer=None,
+        content_type=None,
+        content_encoding=None,
+        compression=None,
+        headers=None,
+    ):
+        body, content_type, content_encoding = super()._prepare(
+            body, serializer, content_type, content_encoding, compression, headers
+        )
+        if (
+            not compression and headers is not None and self.codec is not None
+        ):  # an explicit compression= wins
+            body = self.codec.compress(body, headers)
+        return body, content_type, content_encoding
+
+
+class TaskAMQP(AMQP):
+    """The AMQP of celery, publishing the tasks with ThresholdCompressionProducer."""
+
+    codec = None
+
+    @property
+    def producer_pool(self):
+        if self._producer_pool is None:
+            # kombu keeps a producer pool per connection, made with its default producer
+            producer_pool = super().producer_pool
+            producer_pool.Producer = partial(
+                ThresholdCompressionProducer, codec=self.codec
+            )
+        return self._producer_pool
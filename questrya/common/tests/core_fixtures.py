@@ -1,10 +1,13 @@
 """
 Fixtures must be manually registered on questrya/conftest.py
 """
+
+from contextlib import contextmanager
+
 import pytest
 
+from questrya.extensions import db, query_accounting
 from questrya.factory import create_app
-from questrya.extensions import db
 
 
 @pytest.fixture
@@ -37,7 +40,11 @@ def db_session(app):
 
         from sqlalchemy.orm import scoped_session, sessionmaker
 
-        session = scoped_session(sessionmaker(bind=connection))
+        # create_savepoint: a rollback() called by the code under test
+        # only rolls back to a savepoint, not the outer transaction.
+        session = scoped_session(
+            sessionmaker(bind=connection, join_transaction_mode='create_savepoint')
+        )
         db.session = session
 
         yield session
@@ -45,3 +52,33 @@ def db_session(app):
         transaction.rollback()
         connection.close()
         session.remove()
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Caps the SQL statements executed inside a block, e.g. by a route:
+
+        with assert_max_queries(2):
+            test_client.post('/api/users/user', json=...)
+
+    The savepoints of the db_session fixture are not counted.
+    """
+
+    @contextmanager
+    def assert_max(limit: int):
+        with query_accounting.capture() as queries:
+            yield queries
+        statements = {
+            statement: count
+            for statement, count in queries.shapes.items()
+            if not statement.startswith(
+                ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+            )
+        }
+        executed = sum(statements.values())
+        assert executed <= limit, (
+            f'{executed} SQL statements executed (max {limit}): {statements}'
+        )
+
+    return assert_max
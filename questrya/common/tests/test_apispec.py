@@ -0,0 +1,109 @@
+import json
+
+import pytest
+from flask import Flask
+
+from questrya.common.apispec import (
+    DEFAULT_SPEC_FILE,
+    PrebuiltApiSpec,
+    build_api_spec,
+    dump_api_spec,
+    resolve_spec_path,
+)
+
+
+@pytest.fixture
+def spec_file(tmp_path):
+    path = tmp_path / 'apispec.json'
+    path.write_text(
+        dump_api_spec({'swagger': '2.0', 'paths': {'/api/ping': {}}}), encoding='utf-8'
+    )
+    return path
+
+
+class TestPrebuiltApiSpec:
+    def get_app(self, spec_file) -> Flask:
+        app = Flask('apispec-test')
+        app.config['API_SPEC_FILE'] = str(spec_file)
+        app.config['API_SPEC_MAX_AGE'] = 300
+        PrebuiltApiSpec().init_app(app)
+        return app
+
+    def test_serves_the_spec_with_a_strong_etag_and_cache_control(self, spec_file):
+        response = self.get_app(spec_file).test_client().get('/apispec_1.json')
+
+        assert response.status_code == 200
+        assert response.get_json()['paths'] == {'/api/ping': {}}
+        etag, weak = response.get_etag()
+        assert etag and not weak
+        assert response.cache_control.public
+        assert response.cache_control.max_age == 300
+
+    def test_not_modified_when_the_etag_matches(self, spec_file):
+        client = self.get_app(spec_file).test_client()
+        etag = client.get('/apispec_1.json').get_etag()[0]
+
+        response = client.get('/apispec_1.json', headers={'If-None-Match': f'"{etag}"'})
+
+        assert response.status_code == 304
+        assert response.data == b''
+
+    def test_a_new_spec_gets_a_new_etag(self, spec_file, tmp_path):
+        other_file = tmp_path / 'other.json'
+        other_file.write_text(
+            dump_api_spec({'swagger': '2.0', 'paths': {}}), encoding='utf-8'
+        )
+
+        etag = (
+            self.get_app(spec_file).test_client().get('/apispec_1.json').get_etag()[0]
+        )
+        other_etag = (
+            self.get_app(other_file).test_client().get('/apispec_1.json').get_etag()[0]
+        )
+
+        assert etag != other_etag
+
+    def test_a_broken_spec_fails_the_boot(self, tmp_path):
+        broken_file = tmp_path / 'broken.json'
+        broken_file.write_text('{"swagger": ', encoding='utf-8')
+
+        with pytest.raises(ValueError):
+            self.get_app(broken_file)
+
+    def test_replaces_the_spec_of_flasgger(self, app, spec_file):
+        app.config['API_SPEC_FILE'] = str(spec_file)
+        PrebuiltApiSpec().init_app(app)
+
+        response = app.test_client().get('/apispec_1.json')
+
+        assert response.get_json()['paths'] == {'/api/ping': {}}
+        assert response.get_etag()[0]
+
+    def test_off_without_a_spec_file(self):
+        app = Flask('apispec-test')
+        app.config['API_SPEC_FILE'] = ''
+        app.config['API_SPEC_MAX_AGE'] = 300
+        PrebuiltApiSpec().init_app(app)
+
+        assert app.test_client().get('/apispec_1.json').status_code == 404
+
+
+class TestBuildApiSpec:
+    def test_cli_writes_the_spec(self, app, tmp_path):
+        output = tmp_path / 'apispec.json'
+
+        result = app.test_cli_runner().invoke(
+            args=['apispec', 'build', '--output', str(output)]
+        )
+
+        assert result.exit_code == 0, result.output
+        spec = json.loads(output.read_text(encoding='utf-8'))
+        assert '/api/users/user' in spec['paths']
+        assert spec['info']['title'] == 'questrya'
+
+    def test_the_prebuilt_spec_of_the_repository_is_up_to_date(self, app):
+        prebuilt = resolve_spec_path(DEFAULT_SPEC_FILE).read_text(encoding='utf-8')
+
+        assert prebuilt == dump_api_spec(build_api_spec(app)), (
+            'run "make apispec" to rebuild etc/apispec.json'
+        )
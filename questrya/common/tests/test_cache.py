@@ -0,0 +1,53 @@
+from unittest.mock import patch
+
+from questrya.common.cache import LRUCache, TieredCache
+
+
+class TestLRUCache:
+    def test_get_and_set(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')  # now "b" is the least recently used
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.stats()['evictions'] == 1
+
+    def test_entries_expire(self):
+        cache = LRUCache(maxsize=2, ttl=10)
+        with patch('questrya.common.cache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+        with patch('questrya.common.cache.time.monotonic', return_value=111):
+            assert cache.get('a') is None
+
+        assert cache.stats()['expirations'] == 1
+        assert cache.stats()['size'] == 0
+
+    def test_disabled_when_maxsize_is_zero(self):
+        cache = LRUCache(maxsize=0, ttl=10)
+        cache.set('a', 1)
+
+        assert cache.get('a') is None
+
+
+class TestTieredCache:
+    def test_without_shared_tier(self):
+        cache = TieredCache(namespace='test', maxsize=10, ttl=60)
+        cache.set('a', 1)
+
+        assert cache.get('a') == 1
+        cache.delete('a')
+        assert cache.get('a') is None
+        assert cache.stats()['shared'] is None
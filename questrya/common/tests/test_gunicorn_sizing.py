@@ -0,0 +1,117 @@
+import gunicorn_settings
+
+
+def write_cgroup_files(root, files: dict):
+    for path, content in files.items():
+        cgroup_file = root.joinpath(path)
+        cgroup_file.parent.mkdir(parents=True, exist_ok=True)
+        cgroup_file.write_text(f'{content}\n')
+
+
+class TestGunicornSizing:
+    def test_cgroup_v2_cpu_quota(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        write_cgroup_files(tmp_path, {'cpu.max': '150000 100000'})
+
+        assert gunicorn_settings.get_cpu_quota() == 1.5
+
+    def test_cgroup_v2_without_cpu_quota(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        write_cgroup_files(tmp_path, {'cpu.max': 'max 100000'})
+
+        assert gunicorn_settings.get_cpu_quota() is None
+
+    def test_cgroup_v1_cpu_quota(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        write_cgroup_files(
+            tmp_path,
+            {'cpu/cpu.cfs_quota_us': '200000', 'cpu/cpu.cfs_period_us': '100000'},
+        )
+
+        assert gunicorn_settings.get_cpu_quota() == 2
+
+    def test_cgroup_v1_without_cpu_quota(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        write_cgroup_files(
+            tmp_path, {'cpu/cpu.cfs_quota_us': '-1', 'cpu/cpu.cfs_period_us': '100000'}
+        )
+
+        assert gunicorn_settings.get_cpu_quota() is None
+
+    def test_fractional_quota_rounds_up_to_a_cpu(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        monkeypatch.setattr(
+            gunicorn_settings.os, 'sched_getaffinity', lambda pid: set(range(8))
+        )
+        write_cgroup_files(tmp_path, {'cpu.max': '50000 100000'})
+
+        cpus, source = gunicorn_settings.get_effective_cpus()
+
+        assert cpus == 1
+        assert source == 'cgroup quota (0.5 cpus)'
+
+    def test_quota_above_the_cpu_affinity_is_ignored(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        monkeypatch.setattr(
+            gunicorn_settings.os, 'sched_getaffinity', lambda pid: {0, 1}
+        )
+        write_cgroup_files(tmp_path, {'cpu.max': '800000 100000'})
+
+        assert gunicorn_settings.get_effective_cpus() == (2, 'cpu affinity')
+
+    def test_memory_limit(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        write_cgroup_files(tmp_path, {'memory.max': str(512 * 1024 * 1024)})
+
+        assert gunicorn_settings.get_memory_limit() == (
+            512 * 1024 * 1024,
+            'cgroup limit',
+        )
+
+    def test_memory_without_limit(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        write_cgroup_files(tmp_path, {'memory.max': 'max'})
+
+        assert gunicorn_settings.get_memory_limit()[1] == 'physical memory'
+
+    def test_workers_are_capped_by_the_memory_limit(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        monkeypatch.setattr(gunicorn_settings, 'WORKER_MEMORY_MB', 256)
+        monkeypatch.setattr(
+            gunicorn_settings.os, 'sched_getaffinity', lambda pid: set(range(8))
+        )
+        monkeypatch.delenv('GUNICORN_WORKERS', raising=False)
+        monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+        write_cgroup_files(
+            tmp_path, {'cpu.max': '400000 100000', 'memory.max': str(768 * 1024 * 1024)}
+        )
+
+        sizing = gunicorn_settings.get_sizing()
+
+        assert sizing['cpus'] == 4
+        assert sizing['workers'] == 3
+        assert sizing['workers_source'] == 'memory (256MB per worker)'
+
+    def test_workers_by_cpus(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        monkeypatch.setattr(
+            gunicorn_settings.os, 'sched_getaffinity', lambda pid: set(range(8))
+        )
+        monkeypatch.delenv('GUNICORN_WORKERS', raising=False)
+        monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+        write_cgroup_files(tmp_path, {'cpu.max': '200000 100000', 'memory.max': 'max'})
+
+        sizing = gunicorn_settings.get_sizing()
+
+        assert sizing['workers'] == 3
+        assert sizing['workers_source'] == 'cpus'
+
+    def test_environment_overrides(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(gunicorn_settings, 'CGROUP_ROOT', str(tmp_path))
+        monkeypatch.setenv('GUNICORN_WORKERS', '7')
+        monkeypatch.setenv('GUNICORN_THREADS', '9')
+
+        sizing = gunicorn_settings.get_sizing()
+
+        assert (sizing['workers'], sizing['workers_source']) == (7, 'environment')
+        assert (sizing['threads'], sizing['threads_source']) == (9, 'environment')
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from questrya.common.health import ReadinessChecker
+
+
+def failing_check():
+    raise ConnectionError('connection refused')
+
+
+class TestReadinessChecker:
+    def get_checker(
+        self, checks: dict, timeout: float = 1.0, max_age: float = 60.0
+    ) -> ReadinessChecker:
+        checker = ReadinessChecker()
+        checker.configure(
+            checks=checks, timeout=timeout, refresh_interval=0, max_age=max_age
+        )
+        return checker
+
+    def test_ready_when_every_dependency_answers(self):
+        status = self.get_checker(
+            {'database': lambda: None, 'broker': lambda: None}
+        ).get_status()
+
+        assert status['ready'] is True
+        assert set(status['dependencies']) == {'database', 'broker'}
+        for dependency in status['dependencies'].values():
+            assert dependency['ready'] is True
+            assert dependency['latency_ms'] >= 0
+            assert dependency['error'] is None
+
+    def test_not_ready_when_a_dependency_fails(self):
+        status = self.get_checker(
+            {'database': lambda: None, 'broker': failing_check}
+        ).get_status()
+
+        assert status['ready'] is False
+        assert status['dependencies']['database']['ready'] is True
+        assert status['dependencies']['broker'] == {
+            'ready': False,
+            'latency_ms': status['dependencies']['broker']['latency_ms'],
+            'error': 'ConnectionError: connection refused',
+        }
+
+    def test_hanging_dependency_is_cut_by_the_time_budget(self):
+        release = threading.Event()
+        calls = []
+
+        def hanging_check():
+            calls.append(1)
+            release.wait(5)
+
+        checker = self.get_checker(
+            {'database': hanging_check, 'broker': lambda: None}, timeout=0.1
+        )
+        started = time.monotonic()
+        status = checker.refresh()
+        checker.refresh()  # the check is still hanging, so it is not started again
+
+        assert time.monotonic() - started < 1
+        assert status['ready'] is False
+        assert status['dependencies']['database']['error'] == 'timed out after 0.1s'
+        assert status['dependencies']['broker']['ready'] is True
+        assert len(calls) == 1
+        release.set()
+
+    def test_probes_read_the_cached_result(self):
+        calls = []
+        checker = self.get_checker({'database': lambda: calls.append(1)})
+
+        for _ in range(10):
+            assert checker.get_status()['ready'] is True
+
+        assert len(calls) == 1
+
+    def test_stale_result_is_refreshed(self):
+        calls = []
+        checker = self.get_checker({'database': lambda: calls.append(1)}, max_age=0)
+
+        checker.get_status()
+        checker.get_status()
+
+        assert len(calls) == 2
+
+    def test_background_refresher(self):
+        calls = []
+        checker = ReadinessChecker()
+        checker.configure(
+            checks={'database': lambda: calls.append(1)},
+            timeout=1,
+            refresh_interval=0.01,
+            max_age=60,
+        )
+
+        checker.get_status()
+        time.sleep(0.2)
+        checker.configure(
+            checks={}, timeout=1, refresh_interval=0, max_age=60
+        )  # stops the refresher
+
+        assert len(calls) > 2
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from flask_jwt_extended import (
+    create_access_token,
+    decode_token,
+    get_jwt_identity,
+    jwt_required,
+)
+from flask_jwt_extended import jwt_manager as jwt_manager_module
+from jwt import ExpiredSignatureError
+
+from questrya.common.jwt_cache import VerifiedTokenCache
+from questrya.extensions import jwt, jwt_token_cache
+
+
+@pytest.fixture
+def token_cache(app):
+    jwt_token_cache.configure(maxsize=16, ttl=300.0)
+    yield jwt_token_cache
+    jwt_token_cache.configure(maxsize=0, ttl=300.0)
+
+
+@pytest.fixture
+def full_decode_spy():
+    with patch.object(
+        jwt_manager_module, '_decode_jwt', wraps=jwt_manager_module._decode_jwt
+    ) as spy:
+        yield spy
+
+
+class TestVerifiedTokenCache:
+    def test_seen_token_skips_verification(self, token_cache, full_decode_spy):
+        token = create_access_token(identity='picard')
+
+        first_claims = decode_token(token)
+        second_claims = decode_token(token)
+
+        assert full_decode_spy.call_count == 1
+        assert second_claims == first_claims
+        assert second_claims['sub'] == 'picard'
+
+    def test_cached_claims_cannot_be_changed_by_the_callers(self, token_cache):
+        token = create_access_token(identity='picard')
+        decode_token(token)['sub'] = 'locutus'
+        assert decode_token(token)['sub'] == 'picard'
+
+    def test_disabled_cache_always_verifies(self, app, full_decode_spy):
+        token = create_access_token(identity='picard')
+
+        decode_token(token)
+        decode_token(token)
+
+        assert full_decode_spy.call_count == 2
+
+    def test_expired_token_is_not_served_from_the_cache(self, token_cache):
+        token = create_access_token(
+            identity='picard', expires_delta=timedelta(seconds=1)
+        )
+        decode_token(token)
+
+        with patch(
+            'questrya.common.jwt_cache.time.time',
+            return_value=decode_token(token)['exp'] + 1,
+        ):
+            assert token_cache.get(token) is None
+        with pytest.raises(ExpiredSignatureError):
+            decode_token(
+                create_access_token(
+                    identity='picard', expires_delta=timedelta(seconds=-1)
+                )
+            )
+
+    def test_invalidate(self, token_cache, full_decode_spy):
+        token = create_access_token(identity='picard')
+        decode_token(token)
+
+        token_cache.invalidate(token)
+        decode_token(token)
+
+        assert full_decode_spy.call_count == 2
+
+    def test_blocklist_still_applies_to_cached_tokens(self, app, token_cache):
+        @app.route('/jwt-cache-protected')
+        @jwt_required()
+        def protected():
+            return {'identity': get_jwt_identity()}
+
+        revoked = set()
+        headers = {'Authorization': f'Bearer {create_access_token(identity="picard")}'}
+        test_client = app.test_client()
+
+        with patch.object(
+            jwt,
+            '_token_in_blocklist_callback',
+            lambda header, data: data['jti'] in revoked,
+        ):
+            assert (
+                test_client.get('/jwt-cache-protected', headers=headers).status_code
+                == 200
+            )
+            revoked.add(decode_token(headers['Authorization'].split()[1])['jti'])
+            assert (
+                test_client.get('/jwt-cache-protected', headers=headers).status_code
+                == 401
+            )
+
+    def test_disabled_by_default(self):
+        assert not VerifiedTokenCache().enabled
@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from questrya.extensions import request_metrics
+
+
+def get_sample(name: str, labels: dict) -> float:
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestRequestMetrics:
+    def test_records_latency_status_and_in_flight(self, test_client):
+        labels = {
+            'blueprint': 'monitor',
+            'endpoint': 'monitor.liveness',
+            'method': 'GET',
+        }
+        requests_before = get_sample(
+            'questrya_http_requests_total', {**labels, 'status': '200'}
+        )
+        observations_before = get_sample(
+            'questrya_http_request_duration_seconds_count', labels
+        )
+
+        test_client.get('/api/monitor/liveness')
+
+        assert (
+            get_sample('questrya_http_requests_total', {**labels, 'status': '200'})
+            == requests_before + 1
+        )
+        assert (
+            get_sample('questrya_http_request_duration_seconds_count', labels)
+            == observations_before + 1
+        )
+        assert (
+            get_sample('questrya_http_requests_in_flight', {'blueprint': 'monitor'})
+            == 0
+        )
+
+    def test_in_flight_is_released_when_the_view_fails(self, app, test_client):
+        @app.route('/metrics-failing-view')
+        def failing_view():
+            raise RuntimeError('boom')
+
+        response = test_client.get('/metrics-failing-view')
+
+        assert response.status_code == 500
+        assert get_sample('questrya_http_requests_in_flight', {'blueprint': ''}) == 0
+        assert (
+            get_sample(
+                'questrya_http_requests_total',
+                {
+                    'blueprint': '',
+                    'endpoint': 'failing_view',
+                    'method': 'GET',
+                    'status': '500',
+                },
+            )
+            >= 1
+        )
+
+    def test_aggregates_the_workers_on_multiprocess_mode(self, tmp_path):
+        worker_script = textwrap.dedent(
+            """
+            from questrya.factory import create_app
+
+            app = create_app()
+            for _ in range(3):
+                app.test_client().get('/api/monitor/liveness')
+            """
+        )
+        env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': str(tmp_path)}
+        for _ in range(2):  # two "workers", each with its own pid and files
+            subprocess.run([sys.executable, '-c', worker_script], env=env, check=True)
+
+        aggregate_script = (
+            'from questrya.extensions import request_metrics; '
+            'print(request_metrics.generate()[0].decode())'
+        )
+        aggregated = subprocess.run(
+            [sys.executable, '-c', aggregate_script],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+        assert len(list(tmp_path.glob('*.db'))) >= 2
+        liveness = 'blueprint="monitor",endpoint="monitor.liveness"'
+        assert (
+            f'questrya_http_requests_total{{{liveness},method="GET",status="200"}} 6.0'
+            in aggregated
+        )
+
+    def test_generate_content_type(self):
+        _, content_type = request_metrics.generate()
+        assert content_type.startswith('text/plain')
+
+    def test_worker_rss_and_recycles(self):
+        recycles_before = get_sample(
+            'questrya_worker_recycles_total', {'reason': 'memory'}
+        )
+
+        request_metrics.observe_worker_rss(123 * 1024 * 1024)
+        request_metrics.count_worker_recycle('memory')
+
+        assert get_sample('questrya_worker_rss_bytes', {}) == 123 * 1024 * 1024
+        assert (
+            get_sample('questrya_worker_recycles_total', {'reason': 'memory'})
+            == recycles_before + 1
+        )
@@ -0,0 +1,79 @@
+import pytest
+
+from questrya.common.exceptions import ServiceUnavailableException
+from questrya.common.password_hashing import PasswordHasher
+from questrya.extensions import bcrypt
+
+
+class TestPasswordHasher:
+    def test_hash_and_check_inline(self):
+        hasher = PasswordHasher(workers=0, queue_size=0, rounds=4)
+
+        pw_hash = hasher.hash(password='12345678')
+
+        assert pw_hash.startswith('$2b$04$')
+        assert hasher.check(pw_hash=pw_hash, password='12345678') is True
+        assert hasher.check(pw_hash=pw_hash, password='23456789') is False
+
+    def test_hash_and_check_on_process_pool(self):
+        hasher = PasswordHasher(workers=1, queue_size=1, rounds=4)
+        try:
+            pw_hash = hasher.hash(password='12345678')
+            assert hasher.check(pw_hash=pw_hash, password='12345678') is True
+        finally:
+            hasher.shutdown()
+
+        stats = hasher.stats()
+        assert stats['completed'] == 2
+        assert stats['in_flight'] == 0
+        assert stats['queue_depth'] == 0
+        assert stats['max_latency_ms'] > 0
+
+    def test_is_compatible_with_flask_bcrypt_hashes(self, app):
+        hasher = PasswordHasher(workers=0, queue_size=0, rounds=4)
+        pw_hash = bcrypt.generate_password_hash(password='12345678', rounds=4).decode(
+            'utf-8'
+        )
+
+        assert hasher.check(pw_hash=pw_hash, password='12345678') is True
+        assert (
+            bcrypt.check_password_hash(hasher.hash(password='12345678'), '12345678')
+            is True
+        )
+
+    def test_must_fail_fast_when_queue_is_full(self):
+        hasher = PasswordHasher(workers=0, queue_size=0, rounds=4)
+        assert hasher._slots.acquire(blocking=False)  # the only slot is now busy
+
+        with pytest.raises(ServiceUnavailableException) as exception_instance:
+            hasher.hash(password='12345678')
+
+        assert (
+            exception_instance.value.args[0]
+            == 'Password hashing queue is full, try again later.'
+        )
+        assert hasher.stats()['rejected'] == 1
+
+    def test_timed_out_jobs_hold_their_slot_until_done(self):
+        hasher = PasswordHasher(workers=1, queue_size=0, rounds=14, timeout=0.01)
+        try:
+            with pytest.raises(ServiceUnavailableException) as exception_instance:
+                hasher.hash(password='12345678')
+            assert (
+                exception_instance.value.args[0]
+                == 'Password hashing timed out, try again later.'
+            )
+            with pytest.raises(
+                ServiceUnavailableException, match='queue is full'
+            ):  # the job is still running
+                hasher.hash(password='12345678')
+            stats = hasher.stats()
+        finally:
+            hasher.shutdown()
+
+        assert (
+            stats['timed_out'],
+            stats['completed'],
+            stats['rejected'],
+            stats['in_flight'],
+        ) == (1, 0, 1, 1)
@@ -0,0 +1,117 @@
+import signal
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from questrya.common.profiling import (
+    PROFILE_FILE_HEADER,
+    PROFILE_TOKEN_HEADER,
+    StackSampler,
+    profile_for_signal,
+)
+from questrya.extensions import worker_profiler
+
+
+def busy_function(seconds: float):
+    finish_at = time.monotonic() + seconds
+    while time.monotonic() < finish_at:
+        pass
+
+
+@pytest.fixture
+def profiler(app, tmp_path):
+    worker_profiler.configure(
+        output_dir=str(tmp_path),
+        interval=0.001,
+        max_seconds=5,
+        request_token='secret-token',
+    )
+    yield worker_profiler
+    worker_profiler.configure(
+        output_dir='/dev/shm', interval=0.01, max_seconds=60, request_token=''
+    )
+
+
+def wait_for_profile(tmp_path, timeout: float = 5.0) -> list:
+    finish_at = time.monotonic() + timeout
+    while time.monotonic() < finish_at:
+        profiles = list(tmp_path.glob('*-worker-*.collapsed'))
+        if profiles:
+            return profiles
+        time.sleep(0.05)
+    return []
+
+
+class TestStackSampler:
+    def test_samples_the_other_threads(self, tmp_path):
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        busy_function(0.2)
+        sampler.stop()
+
+        path = sampler.write(str(tmp_path / 'profile.collapsed'))
+
+        lines = Path(path).read_text(encoding='utf-8').splitlines()
+        assert sampler.sample_count > 10
+        assert any('busy_function (test_profiling.py' in line for line in lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            assert int(count) > 0
+            assert 'stack-sampler' not in stack and '_run (profiling.py' not in stack
+
+    def test_samples_only_one_thread(self):
+        other_thread = threading.Thread(target=busy_function, args=(0.2,))
+        other_thread.start()
+        sampler = StackSampler(interval=0.001, thread_id=threading.get_ident())
+        sampler.start()
+        time.sleep(0.2)
+        sampler.stop()
+        other_thread.join()
+
+        assert sampler.samples
+        assert not any('busy_function' in stack for stack in sampler.samples)
+
+
+class TestWorkerProfiler:
+    def test_profile_worker(self, profiler, tmp_path):
+        result = profiler.profile_worker(seconds=0.2)
+        with pytest.raises(ValueError, match='already running'):
+            profiler.profile_worker(seconds=0.2)
+        busy_function(0.2)
+
+        assert wait_for_profile(tmp_path) == [tmp_path / result['path'].split('/')[-1]]
+
+    def test_profile_duration_is_capped(self, profiler):
+        with pytest.raises(ValueError, match='between 0 and 5'):
+            profiler.profile_worker(seconds=6)
+
+    def test_signal_starts_a_profile(self, profiler, tmp_path):
+        previous_handler = signal.signal(
+            signal.SIGUSR2, profile_for_signal(profiler, seconds=0.1)
+        )
+        try:
+            signal.raise_signal(signal.SIGUSR2)
+            busy_function(0.2)
+        finally:
+            signal.signal(signal.SIGUSR2, previous_handler)
+
+        assert wait_for_profile(tmp_path)
+
+    def test_profile_a_request_with_the_token(self, profiler, test_client, tmp_path):
+        response = test_client.get(
+            '/api/monitor/liveness', headers={PROFILE_TOKEN_HEADER: 'secret-token'}
+        )
+
+        assert response.status_code == 200
+        assert response.headers[PROFILE_FILE_HEADER].startswith(str(tmp_path))
+        assert 'monitor-liveness' in response.headers[PROFILE_FILE_HEADER]
+
+    @pytest.mark.parametrize('token', ['wrong', 'wröng-tökén'])
+    def test_wrong_token_does_not_profile(self, profiler, test_client, token):
+        response = test_client.get(
+            '/api/monitor/liveness', headers={PROFILE_TOKEN_HEADER: token}
+        )
+        assert response.status_code == 200
+        assert PROFILE_FILE_HEADER not in response.headers
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import click
+from flask.cli import ScriptInfo
+
+from questrya.extensions import init_migrate, init_swagger
+
+
+class TestStartup:
+    def test_production_import_skips_the_docs_and_migrations_stack(self):
+        script = (
+            'import sys, questrya; '
+            'print(sorted(name for name in ("flasgger", "flask_migrate", "alembic") '
+            'if name in sys.modules))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            env=dict(os.environ, API_DOCS_ENABLED='false'),
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.stdout.strip().splitlines()[-1] == '[]'
+
+    def test_migrate_is_not_set_up_outside_the_flask_cli(self, app):
+        assert init_migrate(app) is None
+        assert 'migrate' not in app.extensions
+
+    def test_migrate_is_set_up_by_the_flask_cli(self, app):
+        with click.Context(click.Command('db'), obj=ScriptInfo()):
+            assert init_migrate(app) is not None
+
+        assert 'migrate' in app.extensions
+
+    def test_swagger_is_off_when_the_api_docs_are_disabled(self, app, monkeypatch):
+        monkeypatch.setattr('questrya.extensions.settings.API_DOCS_ENABLED', False)
+
+        assert init_swagger(app) is None
@@ -0,0 +1,231 @@
+import json
+import os
+import signal
+import time
+
+import pytest
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+
+from questrya.common.task_batches import BatchItem, BatchTask
+
+
+class FakeRequest:
+    def __init__(self):
+        self.outcome = None
+
+    def acknowledge(self):
+        self.outcome = 'ack'
+
+    def reject(self, requeue=False):
+        self.outcome = 'requeue' if requeue else 'reject'
+
+
+@pytest.fixture
+def celery():
+    celery = Celery('batch-tests', broker='memory://')
+    celery.conf.update(
+        task_default_queue=f'batch-tests-{time.monotonic_ns()}',
+        worker_hijack_root_logger=False,
+    )
+    return celery
+
+
+def get_batch_task(
+    celery, flush_every: int, flush_interval: float, batches: list, fail: bool = False
+):
+    @celery.task(
+        base=BatchTask,
+        flush_every=flush_every,
+        flush_interval=flush_interval,
+        shared=False,
+    )
+    def record_pings(items):
+        batches.append(items)
+        if fail:
+            raise ValueError('bulk insert failed')
+
+    return record_pings
+
+
+def get_recording_task(celery, flush_every: int, records, kill_first: bool = False):
+    """
+    A batch task for the prefork pool: it records its batches (and process) on a file.
+    """
+
+    @celery.task(
+        base=BatchTask, flush_every=flush_every, flush_interval=60, shared=False
+    )
+    def record_pings(items):
+        if kill_first and not os.path.exists(f'{records}.killed'):
+            open(f'{records}.killed', 'w').close()
+            os.kill(os.getpid(), signal.SIGKILL)  # e.g. the OOM killer
+        with open(records, 'a') as records_file:
+            records_file.write(
+                json.dumps(
+                    {'pid': os.getpid(), 'args': [item.args[0] for item in items]}
+                )
+                + '\n'
+            )
+
+    return record_pings
+
+
+def read_records(records) -> list:
+    if not os.path.exists(records):
+        return []
+    with open(records) as records_file:
+        return [json.loads(line) for line in records_file]
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TestBatchTask:
+    def test_flushes_every_n_items(self, celery):
+        batches = []
+        record_pings = get_batch_task(
+            celery, flush_every=3, flush_interval=60, batches=batches
+        )
+        for index in range(6):
+            record_pings.delay(index, played_seconds=10)
+
+        with start_worker(celery, pool='solo', perform_ping_check=False):
+            wait_for(lambda: len(batches) == 2)
+
+        assert [[item.args for item in batch] for batch in batches] == [
+            [(0,), (1,), (2,)],
+            [(3,), (4,), (5,)],
+        ]
+        assert batches[0][0].kwargs == {'played_seconds': 10}
+
+    def test_flushes_every_interval(self, celery):
+        batches = []
+        record_pings = get_batch_task(
+            celery, flush_every=100, flush_interval=0.1, batches=batches
+        )
+        for index in range(5):
+            record_pings.delay(index)
+
+        with start_worker(celery, pool='solo', perform_ping_check=False):
+            wait_for(lambda: sum(len(batch) for batch in batches) == 5)
+
+        assert sorted(item.args[0] for batch in batches for item in batch) == [
+            0,
+            1,
+            2,
+            3,
+            4,
+        ]
+        assert len(batches) < 5
+
+    def test_flushes_every_n_items_after_an_interval_flush(self, celery):
+        batches = []
+        record_pings = get_batch_task(
+            celery, flush_every=3, flush_interval=0.2, batches=batches
+        )
+
+        with start_worker(celery, pool='solo', perform_ping_check=False):
+            for index in range(2):
+                record_pings.delay(index)
+            wait_for(lambda: len(batches) == 1)  # flushed by the interval
+            for index in range(2, 5):
+                record_pings.delay(index)
+            wait_for(lambda: len(batches) == 2)
+
+        assert [[item.args[0] for item in batch] for batch in batches] == [
+            [0, 1],
+            [2, 3, 4],
+        ]
+
+    def test_runs_the_batches_on_the_prefork_processes(self, celery, tmp_path):
+        records = tmp_path / 'records'
+        record_pings = get_recording_task(celery, flush_every=3, records=records)
+        for index in range(6):
+            record_pings.delay(index)
+
+        with start_worker(
+            celery, pool='prefork', concurrency=2, perform_ping_check=False
+        ):
+            wait_for(lambda: len(read_records(records)) == 2)
+
+        batches = read_records(records)
+        assert sorted(index for batch in batches for index in batch['args']) == [
+            0,
+            1,
+            2,
+            3,
+            4,
+            5,
+        ]
+        assert [len(batch['args']) for batch in batches] == [3, 3]
+        assert os.getpid() not in {batch['pid'] for batch in batches}
+
+    def test_batches_of_a_killed_process_are_redelivered(self, celery, tmp_path):
+        celery.conf.worker_lost_wait = 0.5
+        records = tmp_path / 'records'
+        record_pings = get_recording_task(
+            celery, flush_every=2, records=records, kill_first=True
+        )
+        for index in range(2):
+            record_pings.delay(index)
+
+        with start_worker(
+            celery, pool='prefork', concurrency=1, perform_ping_check=False
+        ):
+            wait_for(lambda: read_records(records), timeout=10)
+
+        (batch,) = read_records(records)
+        assert sorted(batch['args']) == [0, 1]
+
+    def test_acks_only_after_the_handler_returns(self, celery):
+        record_pings = get_batch_task(
+            celery, flush_every=2, flush_interval=60, batches=[]
+        )
+        requests = [FakeRequest(), FakeRequest()]
+
+        record_pings.on_batch_return(requests, succeeded=True)
+
+        assert [request.outcome for request in requests] == ['ack', 'ack']
+
+    def test_batches_lost_with_their_process_are_redelivered(self, celery):
+        record_pings = get_batch_task(
+            celery, flush_every=2, flush_interval=60, batches=[]
+        )
+        request = FakeRequest()
+
+        record_pings.on_batch_return([request], succeeded=None)
+
+        assert request.outcome == 'requeue'
+
+    @pytest.mark.parametrize(
+        'acks_on_failure, outcome', [(True, 'ack'), (False, 'reject')]
+    )
+    def test_failed_batches(self, celery, acks_on_failure, outcome):
+        celery.conf.task_acks_on_failure_or_timeout = acks_on_failure
+        batches = []
+        record_pings = get_batch_task(
+            celery, flush_every=1, flush_interval=60, batches=batches, fail=True
+        )
+        request = FakeRequest()
+
+        record_pings.on_batch_return([request], succeeded=False)
+
+        assert request.outcome == outcome
+
+    def test_eager_call_runs_a_batch_of_one(self, celery):
+        celery.conf.task_always_eager = True
+        batches = []
+        record_pings = get_batch_task(
+            celery, flush_every=100, flush_interval=60, batches=batches
+        )
+
+        record_pings.delay(7, played_seconds=30)
+
+        assert len(batches) == 1
+        (item,) = batches[0]
+        assert isinstance(item, BatchItem)
+        assert (item.args, item.kwargs) == ((7,), {'played_seconds': 30})
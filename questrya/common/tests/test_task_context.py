@@ -0,0 +1,111 @@
+import threading
+
+from celery import Celery
+from flask import g
+
+from questrya.common.task_context import WorkerAppContext
+from questrya.extensions import db
+from questrya.sql_db.models import UserSQLModel
+
+
+def get_celery(app, disposed: list) -> tuple:
+    celery = Celery('tests')
+    worker_context = WorkerAppContext()
+    worker_context.init_app(
+        app, celery, db=db, dispose_engines=lambda app, close: disposed.append(close)
+    )
+
+    @celery.task
+    def inspect_context():
+        seen = {'g': dict(g.__dict__), 'session': db.session()}
+        g.task_state = 'left behind'
+        return seen
+
+    return celery, worker_context, inspect_context
+
+
+def run_in_worker_thread(call):
+    """Runs call() on a thread without an app context, as on a celery worker process."""
+    results = []
+    thread = threading.Thread(target=lambda: results.append(call()))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+class TestWorkerAppContext:
+    def test_one_context_per_process_with_a_clean_task_state(self, app):
+        _, worker_context, inspect_context = get_celery(app, disposed=[])
+
+        def run_two_tasks():
+            first = inspect_context.apply().get()
+            context = worker_context.context
+            second = inspect_context.apply().get()
+            return first, second, context, worker_context.context
+
+        first, second, first_context, second_context = run_in_worker_thread(
+            run_two_tasks
+        )
+
+        assert first_context is not None
+        assert first_context is second_context
+        assert second['g'] == {}
+        assert first['session'] is not second['session']
+
+    def test_tasks_inside_another_context_share_it(self, app):
+        _, worker_context, inspect_context = get_celery(app, disposed=[])
+        g.request_state = 'kept'
+
+        seen = inspect_context.apply().get()
+
+        assert seen['g'] == {'request_state': 'kept'}
+        assert seen['session'] is db.session()
+        assert worker_context.context is None
+
+    def test_nested_task_keeps_the_state_of_the_outer_one(self, app):
+        celery, _, inspect_context = get_celery(app, disposed=[])
+        pending = UserSQLModel(
+            username='riker', email='riker@enterprise.org', password_hash='hash'
+        )
+
+        @celery.task
+        def outer():
+            session = db.session()
+            session.add(pending)
+            g.marker = 'outer'
+            inner_seen = inspect_context.apply().get()
+            return (
+                inner_seen,
+                db.session() is session,
+                pending in session,
+                g.get('marker'),
+            )
+
+        inner_seen, same_session, still_pending, outer_marker = run_in_worker_thread(
+            lambda: outer.apply().get()
+        )
+
+        assert inner_seen['g'] == {'marker': 'outer'}
+        assert same_session
+        assert still_pending
+        assert outer_marker == 'outer'
+
+    def test_new_process_drops_the_inherited_connections(self, app):
+        disposed = []
+        _, worker_context, _ = get_celery(app, disposed=disposed)
+
+        worker_context.on_process_init()
+
+        assert disposed == [False]
+
+    def test_exiting_process_closes_its_context_and_connections(self, app):
+        disposed = []
+        _, worker_context, inspect_context = get_celery(app, disposed=disposed)
+
+        def run_and_exit():
+            inspect_context.apply().get()
+            worker_context.on_process_shutdown()
+            return worker_context.context
+
+        assert run_in_worker_thread(run_and_exit) is None
+        assert disposed == [True]
@@ -0,0 +1,166 @@
+import os
+import time
+import uuid
+from datetime import UTC, date, datetime
+from decimal import Decimal
+
+import pytest
+from celery import Celery
+from flask import Flask
+from kombu import Connection, Exchange, Queue
+from kombu.serialization import dumps, loads
+
+from questrya.common.task_messages import (
+    CONTENT_TYPE,
+    SERIALIZER_NAME,
+    ClaimCheckStore,
+    TaskMessageCodec,
+    ThresholdCompressionProducer,
+)
+
+
+def get_codec(
+    compression_threshold=0, claim_check_dir='', claim_check_threshold=0
+) -> TaskMessageCodec:
+    codec = TaskMessageCodec()
+    codec.configure(
+        compression='gzip',
+        compression_threshold=compression_threshold,
+        claim_check_dir=claim_check_dir,
+        claim_check_threshold=claim_check_threshold,
+    )
+    return codec
+
+
+class TestTaskMessageCodec:
+    def test_round_trip_with_extended_types(self):
+        codec = get_codec()
+        payload = [
+            [1, 'two', 3.0, None, True],
+            {
+                'created_at': datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC),
+                'birthday': date(2000, 1, 31),
+                'user_uuid': uuid.UUID('4f52b136-d464-4fdd-be3b-5a972d3edc91'),
+                'amount': Decimal('10.25'),
+                'raw': b'\x00\x01',
+            },
+        ]
+
+        assert codec.loads(codec.dumps(payload)) == payload
+
+    def test_rejects_the_types_it_cannot_rebuild(self):
+        with pytest.raises(TypeError):
+            get_codec().dumps({'user': object()})
+
+    def test_registered_on_kombu_by_the_app(self, app):
+        content_type, content_encoding, body = dumps(
+            {'a': 1}, serializer=SERIALIZER_NAME
+        )
+
+        assert content_type == CONTENT_TYPE
+        assert loads(body, content_type, content_encoding, accept={CONTENT_TYPE}) == {
+            'a': 1
+        }
+
+    def test_celery_never_accepts_pickle(self, app):
+        celery = app.extensions['celery']
+
+        assert celery.conf.task_serializer == SERIALIZER_NAME
+        assert 'pickle' not in celery.conf.accept_content
+        assert 'application/x-python-serialize' not in celery.conf.accept_content
+
+    def test_claim_check_for_large_payloads(self, tmp_path):
+        codec = get_codec(claim_check_dir=str(tmp_path), claim_check_threshold=1024)
+        payload = {
+            'rows': [{'id': index, 'name': f'user {index}'} for index in range(500)]
+        }
+
+        message = codec.dumps(payload)
+
+        assert len(message) < 100
+        assert len(os.listdir(tmp_path)) == 1
+        assert codec.loads(message) == payload
+        assert (
+            codec.loads(message) == payload
+        )  # a redelivered message still finds its payload
+
+    def test_small_payloads_are_not_claim_checked(self, tmp_path):
+        codec = get_codec(claim_check_dir=str(tmp_path), claim_check_threshold=1024)
+
+        assert codec.loads(codec.dumps({'id': 1})) == {'id': 1}
+        assert not os.listdir(tmp_path)
+
+
+class TestClaimCheckStore:
+    def test_rejects_keys_that_are_not_its_own(self, tmp_path):
+        store = ClaimCheckStore(directory=str(tmp_path))
+
+        with pytest.raises(ValueError):
+            store.get('../../etc/passwd')
+
+    def test_purges_the_expired_payloads(self, tmp_path):
+        store = ClaimCheckStore(directory=str(tmp_path), ttl=60)
+        expired_key = store.put(b'old')
+        current_key = store.put(b'new')
+        expired_at = time.time() - 120
+        os.utime(store.get_path(expired_key), (expired_at, expired_at))
+
+        assert store.purge() == 1
+        assert store.get(current_key) == b'new'
+        assert not os.path.exists(store.get_path(expired_key))
+
+
+class TestThresholdCompressionProducer:
+    def publish_and_receive(self, codec: TaskMessageCodec, payload):
+        exchange = Exchange('tasks', type='direct')
+        queue = Queue('tasks', exchange, routing_key='tasks')
+        with Connection('memory://') as connection:
+            producer = ThresholdCompressionProducer(
+                connection.channel(), exchange=exchange, serializer='json', codec=codec
+            )
+            producer.publish(payload, routing_key='tasks', declare=[queue])
+            message = queue(connection.channel()).get(no_ack=True)
+            return message
+
+    def test_compresses_the_bodies_over_the_threshold(self):
+        payload = {'rows': ['the same row of a report'] * 200}
+
+        message = self.publish_and_receive(
+            get_codec(compression_threshold=1024), payload
+        )
+
+        assert message.headers['compression'] == 'application/x-gzip'
+        assert message.decode() == payload
+
+    def test_small_bodies_are_not_compressed(self):
+        message = self.publish_and_receive(
+            get_codec(compression_threshold=1024), {'id': 1}
+        )
+
+        assert 'compression' not in message.headers
+        assert message.decode() == {'id': 1}
+
+    def test_celery_publishes_with_it(self):
+        app = Flask(__name__)
+        app.config.update(
+            TASK_COMPRESSION='gzip',
+            TASK_COMPRESSION_THRESHOLD=1024,
+            TASK_CLAIM_CHECK_DIR='',
+            TASK_CLAIM_CHECK_THRESHOLD=0,
+            TASK_CLAIM_CHECK_TTL=60,
+        )
+        celery = Celery(app.import_name, broker='memory://')
+        TaskMessageCodec().init_app(app, celery)
+        celery.conf.update(
+            task_serializer=SERIALIZER_NAME, accept_content=[SERIALIZER_NAME]
+        )
+
+        celery.send_task(
+            'questrya.tasks.report', args=[list(range(2000))], queue='reports'
+        )
+
+        with celery.connection_for_read() as connection:
+            message = Queue('reports')(connection.channel()).get(no_ack=True)
+        assert message.content_type == CONTENT_TYPE
+        assert message.headers['compression'] == 'application/x-gzip'
+        assert message.decode()[0] == [list(range(2000))]
@@ -0,0 +1,102 @@
+import logging
+
+import pytest
+
+from questrya.common import timing
+from questrya.common.timing import RequestTimings, timed, timed_block
+from questrya.extensions import layer_timing
+
+
+@timed('service')
+def service_call(nested: bool = False):
+    if nested:
+        return service_call()
+    return repository_call()
+
+
+@timed('repository')
+def repository_call():
+    return 'result'
+
+
+@pytest.fixture
+def request_timings():
+    timings = RequestTimings()
+    token = timing._request_timings.set(timings)
+    yield timings
+    timing._request_timings.reset(token)
+
+
+@pytest.fixture
+def sample_every_request(app):
+    layer_timing.sample_rate = 1.0
+    yield
+    layer_timing.sample_rate = 0.0
+
+
+class TestTimed:
+    def test_does_nothing_out_of_a_sampled_request(self):
+        assert service_call() == 'result'
+        assert timing._request_timings.get() is None
+
+    def test_times_each_layer(self, request_timings):
+        service_call()
+        with timed_block('validation'):
+            pass
+
+        assert set(request_timings.totals) == {'service', 'repository', 'validation'}
+        assert (
+            request_timings.totals['service'][0]
+            >= request_timings.totals['repository'][0]
+        )
+
+    def test_nested_calls_of_the_same_layer_are_counted_once(self, request_timings):
+        service_call(nested=True)
+
+        assert request_timings.totals['service'][1] == 1
+        assert request_timings.totals['repository'][1] == 1
+
+    def test_server_timing_format(self):
+        timings = RequestTimings()
+        timings.add('sql', 0.0015)
+        timings.add('sql', 0.0005)
+
+        assert timings.as_server_timing() == 'sql;dur=2.000;desc="2 calls"'
+
+
+class TestLayerTiming:
+    def test_no_header_when_disabled(self, test_client):
+        response = test_client.get('/api/monitor/liveness')
+        assert 'Server-Timing' not in response.headers
+
+    def test_server_timing_header_and_log_line(
+        self, test_client, db_session, sample_every_request, caplog
+    ):
+        with caplog.at_level(logging.INFO, logger='questrya.timing'):
+            response = test_client.post(
+                '/api/users/user',
+                json={
+                    'username': 'picard',
+                    'email': 'picard@enterprise.org',
+                    'password': '12345678',
+                },
+            )
+
+        assert response.status_code == 201
+        layers = {
+            metric.split(';')[0]
+            for metric in response.headers['Server-Timing'].split(', ')
+        }
+        assert {
+            'route',
+            'validation',
+            'service',
+            'bcrypt',
+            'repository',
+            'sql',
+        } <= layers
+
+        record = caplog.records[-1]
+        assert record.endpoint == 'users.create_user'
+        assert record.status == 201
+        assert record.timings['sql']['calls'] >= 1
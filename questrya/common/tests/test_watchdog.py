@@ -0,0 +1,66 @@
+import threading
+from unittest.mock import Mock, patch
+
+from questrya.common.watchdog import MemoryWatchdog, get_rss_bytes
+
+MB = 1024 * 1024
+
+
+class TestMemoryWatchdog:
+    def test_reads_the_rss_of_this_process(self):
+        assert get_rss_bytes() > 10 * MB
+
+    @patch('questrya.common.watchdog.get_rss_bytes', return_value=100 * MB)
+    def test_check_under_the_limit(self, mock_get_rss_bytes):
+        metrics = Mock()
+        watchdog = MemoryWatchdog(max_rss_mb=200, metrics=metrics)
+
+        assert watchdog.check() is None
+        metrics.observe_worker_rss.assert_called_once_with(100 * MB)
+
+    @patch('questrya.common.watchdog.get_rss_bytes', return_value=300 * MB)
+    def test_check_over_the_limit(self, mock_get_rss_bytes):
+        assert MemoryWatchdog(max_rss_mb=200).check() == 300 * MB
+
+    def test_calls_on_exceeded_once_when_the_rss_grows_over_the_limit(self):
+        exceeded = threading.Event()
+        on_exceeded = Mock(side_effect=lambda rss: exceeded.set())
+        watchdog = MemoryWatchdog(max_rss_mb=200, interval=0.01)
+
+        with patch(
+            'questrya.common.watchdog.get_rss_bytes',
+            side_effect=[100 * MB, 150 * MB] + [300 * MB] * 100,
+        ):
+            watchdog.start(on_exceeded=on_exceeded)
+            assert exceeded.wait(timeout=5)
+            watchdog._thread.join(timeout=5)  # pylint: disable=protected-access
+
+        on_exceeded.assert_called_once_with(300 * MB)
+
+    @patch('questrya.common.watchdog.get_rss_bytes', return_value=300 * MB)
+    def test_is_off_when_a_new_worker_is_already_over_the_limit(
+        self, mock_get_rss_bytes
+    ):
+        on_exceeded = Mock()
+        watchdog = MemoryWatchdog(max_rss_mb=200, interval=0.01)
+
+        watchdog.start(on_exceeded=on_exceeded)
+
+        assert watchdog._thread is None  # pylint: disable=protected-access
+        on_exceeded.assert_not_called()
+
+    def test_disabled_with_a_zero_limit(self):
+        watchdog = MemoryWatchdog(max_rss_mb=0, interval=0.01)
+
+        watchdog.start(on_exceeded=Mock())
+
+        assert not watchdog.enabled
+        assert watchdog._thread is None  # pylint: disable=protected-access
+
+    def test_stop(self):
+        watchdog = MemoryWatchdog(max_rss_mb=100000, interval=0.01)
+        watchdog.start(on_exceeded=Mock())
+
+        watchdog.stop()
+
+        assert watchdog._thread is None  # pylint: disable=protected-access
@@ -0,0 +1,169 @@
+"""
+Opt-in, sampled timing of the layers a request goes through.
+
+On a sampled request, the time spent on each layer (route, service, repository,
+sql, bcrypt, validation) is summed up and sent on the Server-Timing response
+header and on a structured log line ("questrya.timing" logger).
+
+Each layer is timed inclusively (the service time includes its repository
+and sql calls), and only at its outermost call: a repository method calling
+another repository method is counted once.
+
+On a request that is not sampled, and with SERVER_TIMING_SAMPLE_RATE=0, a
+timed function only pays one ContextVar lookup, so it can stay on in production.
+"""
+
+import logging
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('questrya.timing')
+
+_request_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('active', 'started_at', 'totals')
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.totals = {}  # layer -> [seconds, calls]
+        self.active = set()  # layers currently being timed (to skip their nested calls)
+
+    def add(self, layer: str, seconds: float):
+        total = self.totals.get(layer)
+        if total is None:
+            self.totals[layer] = [seconds, 1]
+        else:
+            total[0] += seconds
+            total[1] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            layer: {'ms': round(seconds * 1000, 3), 'calls': calls}
+            for layer, (seconds, calls) in self.totals.items()
+        }
+
+    def as_server_timing(self) -> str:
+        return ', '.join(
+            f'{layer};dur={seconds * 1000:.3f};'
+            f'desc="{calls} call{"s" if calls > 1 else ""}"'
+            for layer, (seconds, calls) in self.totals.items()
+        )
+
+
+def timed(layer: str):
+    """
+    Decorator: adds the calls of the decorated function to `layer` on the sampled
+    requests.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _request_timings.get()
+            if timings is None or layer in timings.active:
+                return func(*args, **kwargs)
+
+            timings.active.add(layer)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.add(layer, time.perf_counter() - started)
+                timings.active.discard(layer)
+
+        return wrapper
+
+    return decorator
+
+
+class timed_block:  # pylint: disable=invalid-name
+    """
+    Context manager version of `timed`, for code that is not a function of its own.
+    """
+
+    __slots__ = ('layer', 'started', 'timings')
+
+    def __init__(self, layer: str):
+        self.layer = layer
+
+    def __enter__(self):
+        timings = _request_timings.get()
+        self.timings = (
+            timings
+            if timings is not None and self.layer not in timings.active
+            else None
+        )
+        if self.timings is not None:
+            self.timings.active.add(self.layer)
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.layer, time.perf_counter() - self.started)
+            self.timings.active.discard(self.layer)
+        return False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_timings.get() is not None:
+        conn.info.setdefault('timing_started_at', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _request_timings.get()
+    started_at = conn.info.get('timing_started_at')
+    if timings is not None and started_at:
+        timings.add('sql', time.perf_counter() - started_at.pop())
+
+
+class LayerTiming:
+    def __init__(self, sample_rate: float = 0.0):
+        self.sample_rate = sample_rate
+
+    def init_app(self, app):
+        self.sample_rate = app.config['SERVER_TIMING_SAMPLE_RATE']
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        # On the Engine class, so that the replicas engines are timed too.
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def before_request(self):
+        if self.sample_rate > 0 and (
+            self.sample_rate >= 1 or random.random() < self.sample_rate
+        ):
+            _request_timings.set(RequestTimings())
+
+    def after_request(self, response):
+        timings = _request_timings.get()
+        if timings is None:
+            return response
+
+        timings.add('route', time.perf_counter() - timings.started_at)
+        server_timing = timings.as_server_timing()
+        response.headers['Server-Timing'] = server_timing
+        logger.info(
+            f'{request.method} {request.path} {response.status_code} {server_timing}',
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'timings': timings.as_dict(),
+            },
+        )
+        return response
+
+    def teardown_request(self, exception=None):
+        _request_timings.set(None)
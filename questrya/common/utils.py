@@ -1,31 +1,42 @@
 import os
 import re
-from functools import lru_cache
+from functools import cache
 from pathlib import Path
 
-from sqlalchemy.orm import Query
 from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import ClauseElement
 
 
-def get_query_raw_sql(query: Query) -> str:
+def get_query_raw_sql(query: Query | ClauseElement, parameters=None) -> str:
     """
-    Convert a SQLAlchemy query to a readable SQL string with parameters.
+    Convert a SQLAlchemy query (or Core statement) to a readable SQL string with
+    parameters.
+
+    parameters: the values executed with the statement, when they are not bound
+                on it (e.g. connection.execute(statement, parameters)).
 
     Useful for debugging.
     """
-    try:
-        # Try with PostgreSQL dialect which handles UUIDs better
-        raw_query = str(
-            query.statement.compile(
-                dialect=postgresql.dialect(),
-                compile_kwargs={'literal_binds': True},
+    statement = getattr(query, 'statement', query)
+    raw_query = None
+    if not parameters:
+        try:
+            # Try with PostgreSQL dialect which handles UUIDs better
+            raw_query = str(
+                statement.compile(
+                    dialect=postgresql.dialect(),
+                    compile_kwargs={'literal_binds': True},
+                )
             )
-        )
-    except Exception:
-        # Fallback to parameters approach if literal binds fail
-        compiled = query.statement.compile()
-        params = compiled.params
-        raw_query = f'{str(compiled)} [params: {params}]'
+        except Exception:
+            pass
+
+    if raw_query is None:
+        # Fallback to the parameters if the literal binds fail (or they were given)
+        compiled = statement.compile(dialect=postgresql.dialect())
+        params = parameters or compiled.params
+        raw_query = f'{compiled!s} [params: {params}]'
 
     raw_query = re.sub(r'\s+', ' ', raw_query).strip()
     return raw_query
@@ -45,7 +56,7 @@ def get_version_file_path() -> str:
     return file_path
 
 
-@lru_cache(maxsize=None)
+@cache
 def get_app_version():
     file_path = get_version_file_path()
     with open(file_path, 'r', encoding='utf-8') as version_file:
@@ -1,25 +1,58 @@
 import re
+import sys
 
 
 class InvalidEmailError(ValueError):
     """Raised when an invalid email is provided."""
 
-    pass
-
 
 class Email:
-    """Value Object for Email with validation and immutability."""
+    """
+    Value Object for Email with validation and immutability.
+
+    It is slotted (no per-instance __dict__) and hashable, so it can be used
+    as a dict key or a set member. intern=True interns the normalized address,
+    which saves memory on bulk jobs where the same addresses repeat.
+    """
+
+    __slots__ = ('_address',)
 
     EMAIL_REGEX = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
 
-    def __init__(self, address: str):
-        if not self._is_valid_email(address):
+    def __init__(self, address: str, intern: bool = False):
+        if not _match_email(address):
             raise InvalidEmailError(f'Invalid email address: {address}')
-        self._address = address.lower()  # Normalize to lowercase
+        address = address.lower()  # Normalize to lowercase
+        _set_address(self, sys.intern(address) if intern else address)
+
+    @classmethod
+    def from_trusted(cls, address: str, intern: bool = False) -> 'Email':
+        """
+        Builds an Email from an address that is already validated and normalized
+        (e.g. loaded from the database), skipping the validation.
+        """
+        email = cls.__new__(cls)
+        _set_address(email, sys.intern(address) if intern else address)
+        return email
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self):
+        # pickle/copy must not go through __setattr__
+        return (Email.from_trusted, (self._address,))
 
     def __eq__(self, other):
+        if not isinstance(other, Email):
+            return NotImplemented
         return self._address == other._address
 
+    def __hash__(self):
+        return hash(self._address)
+
     def __str__(self):
         return self._address
 
@@ -34,4 +67,10 @@ class Email:
     @staticmethod
     def _is_valid_email(email: str) -> bool:
         """Checks if the email matches a valid pattern."""
-        return bool(re.match(Email.EMAIL_REGEX, email))
+        return _match_email(email) is not None
+
+
+# Bound once, so the hot path (bulk loads) skips the re module cache lookup
+# and the __setattr__ guard that makes Email immutable.
+_match_email = re.compile(Email.EMAIL_REGEX).match
+_set_address = Email._address.__set__
@@ -1,11 +1,15 @@
+import copy
+import pickle
+import sys
+
 import pytest
-from uuid import uuid4
 
 from questrya.common.value_objects.email import Email, InvalidEmailError
 
 
 class TestEmail:
-    @pytest.mark.parametrize('email',
+    @pytest.mark.parametrize(
+        'email',
         [
             'abc',
             'abc@def',
@@ -17,7 +21,8 @@ class TestEmail:
         with pytest.raises(InvalidEmailError) as _:
             _ = Email(address=email)
 
-    @pytest.mark.parametrize('email',
+    @pytest.mark.parametrize(
+        'email',
         [
             'JEANLUC@google.com',
             'JEANLUC@GOOGLE.COM',
@@ -29,7 +34,8 @@ class TestEmail:
         email_instance = Email(address=email)
         assert email_instance.address == email.lower()
 
-    @pytest.mark.parametrize('email',
+    @pytest.mark.parametrize(
+        'email',
         [
             'JEANLUC@google.com',
             'JEANLUC@GOOGLE.COM',
@@ -41,7 +47,8 @@ class TestEmail:
         email_instance = Email(address=email)
         assert email_instance.address != email
 
-    @pytest.mark.parametrize('email',
+    @pytest.mark.parametrize(
+        'email',
         [
             'JEANLUC@google.com',
             'JEANLUC@GOOGLE.COM',
@@ -53,7 +60,8 @@ class TestEmail:
         email_instance = Email(address=email)
         assert str(email_instance) == email.lower()
 
-    @pytest.mark.parametrize('email',
+    @pytest.mark.parametrize(
+        'email',
         [
             'JEANLUC@google.com',
             'JEANLUC@GOOGLE.COM',
@@ -64,3 +72,42 @@ class TestEmail:
     def test_email_repr(self, email):
         email_instance = Email(address=email)
         assert repr(email_instance) == f"Email('{email.lower()}')"
+
+    def test_email_from_trusted_skips_validation(self):
+        email_instance = Email.from_trusted('jean_luc@google.com')
+        assert email_instance.address == 'jean_luc@google.com'
+        assert email_instance == Email('JEAN_LUC@google.com')
+
+    def test_email_is_hashable(self):
+        emails = {Email('JEAN_LUC@google.com'), Email('jean_luc@google.com')}
+        assert emails == {Email.from_trusted('jean_luc@google.com')}
+        assert {Email('jean_luc@google.com'): 'picard'}[
+            Email('JEAN_LUC@google.com')
+        ] == 'picard'
+
+    def test_email_is_immutable(self):
+        email_instance = Email('jean_luc@google.com')
+        with pytest.raises(AttributeError):
+            email_instance._address = 'locutus@borg.org'
+        with pytest.raises(AttributeError):
+            email_instance.domain = 'borg.org'
+        with pytest.raises(AttributeError):
+            del email_instance._address
+        assert email_instance.address == 'jean_luc@google.com'
+
+    def test_email_is_not_equal_to_other_types(self):
+        assert Email('jean_luc@google.com') != 'jean_luc@google.com'
+
+    def test_email_survives_pickle_and_copy(self):
+        email_instance = Email('jean_luc@google.com')
+        assert pickle.loads(pickle.dumps(email_instance)) == email_instance
+        assert copy.deepcopy(email_instance) == email_instance
+
+    def test_email_interning(self):
+        local_part = 'jean_luc'
+        address = f'{local_part}@google.com'  # built at runtime, so not interned yet
+        assert (
+            Email(address.upper(), intern=True).address
+            is Email(address, intern=True).address
+        )
+        assert Email.from_trusted(address, intern=True).address is sys.intern(address)
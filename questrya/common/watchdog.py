@@ -0,0 +1,104 @@
+"""
+Memory watchdog of the gunicorn workers.
+
+A daemon thread reads the RSS of the worker every `interval` seconds and
+publishes it (questrya_worker_rss_bytes). When it goes over `max_rss_mb`, the
+worker is retired gracefully: it stops accepting requests, finishes the ones
+it has and exits, and the master starts a new one (see
+gunicorn_settings.post_worker_init). A slow leak then recycles the workers one
+at a time, instead of growing all of them until the container is OOM-killed
+and every worker dies at once.
+
+Together with the request count recycling (GUNICORN_MAX_REQUESTS, with a
+jitter), every retirement is logged and counted per reason
+(questrya_worker_recycles), so that a leak shows up on the metrics.
+"""
+
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def get_rss_bytes() -> int:
+    """The resident memory of this process, or None where there is no /proc."""
+    try:
+        with open('/proc/self/statm', encoding='utf-8') as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+
+class MemoryWatchdog:
+    def __init__(self, max_rss_mb: float = 0, interval: float = 10.0, metrics=None):
+        self._stop = threading.Event()
+        self._thread = None
+        self.metrics = metrics
+        self.configure(max_rss_mb=max_rss_mb, interval=interval)
+
+    def init_app(self, app, metrics=None):
+        """metrics: a RequestMetrics, to publish the RSS of the worker."""
+        self.configure(
+            max_rss_mb=app.config['WORKER_MAX_RSS_MB'],
+            interval=app.config['WORKER_MEMORY_CHECK_SECONDS'],
+        )
+        self.metrics = metrics
+
+    def configure(self, max_rss_mb: float, interval: float):
+        self.max_rss_mb = max_rss_mb
+        self.interval = interval
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rss_mb > 0 and self.interval > 0
+
+    def check(self) -> int:
+        """The RSS when it is over the limit, None otherwise."""
+        rss = get_rss_bytes()
+        if rss is None:
+            return None
+        if self.metrics is not None:
+            self.metrics.observe_worker_rss(rss)
+        return rss if rss > self.max_rss_mb * 1024 * 1024 else None
+
+    def start(self, on_exceeded):
+        """
+        Checks this process on the background. on_exceeded(rss) is called once,
+        from the watchdog thread, the first time the RSS is over the limit.
+        """
+        if not self.enabled or self._thread is not None:
+            return
+        rss = self.check()
+        if rss is not None:
+            # Every new worker would be retired right after booting, in a loop.
+            logger.error(
+                'The memory watchdog is off: '
+                f'a worker starts with {rss / (1024 * 1024):.1f}MB, '
+                f'over WORKER_MAX_RSS_MB ({self.max_rss_mb}MB)'
+            )
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(on_exceeded,), name='memory-watchdog', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self, on_exceeded):
+        while not self._stop.wait(self.interval):
+            try:
+                rss = self.check()
+            except Exception:
+                logger.exception('Memory watchdog check failed')
+                continue
+            if rss is not None:
+                on_exceeded(rss)
+                return
@@ -2,23 +2,74 @@
 This module is used to create extensions, according to the recommendation
 from the official flask docs for app factories:
 https://flask.palletsprojects.com/en/stable/patterns/appfactories/#factories-extensions
+
+flasgger and flask_migrate (with alembic) are not needed to serve a request and
+are slow to import, so they are imported only by the init functions that use them.
 """
 
+import click
 from celery import Celery
-from flasgger import Swagger
+from flask.cli import ScriptInfo
 from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
-from questrya import settings
+from sqlalchemy import text
 
+from questrya import settings
+from questrya.common.apispec import PrebuiltApiSpec
+from questrya.common.cache import TieredCache
+from questrya.common.health import ReadinessChecker
+from questrya.common.jwt_cache import CachingJWTManager, VerifiedTokenCache
+from questrya.common.metrics import RequestMetrics
+from questrya.common.password_hashing import PasswordHasher
+from questrya.common.profiling import WorkerProfiler
+from questrya.common.task_context import WorkerAppContext
+from questrya.common.task_messages import TaskMessageCodec
+from questrya.common.timing import LayerTiming
+from questrya.common.watchdog import MemoryWatchdog
+from questrya.sql_db.accounting import QueryAccounting
+from questrya.sql_db.pool import get_engine_options
+from questrya.sql_db.routing import ReplicaRouter
 
 bcrypt = Bcrypt()
-jwt = JWTManager()
+jwt_token_cache = VerifiedTokenCache()
+jwt = CachingJWTManager(token_cache=jwt_token_cache)
+password_hasher = PasswordHasher()
+user_cache = TieredCache(namespace='users')
+idempotency_cache = TieredCache(namespace='idempotency')
+request_metrics = RequestMetrics()
+layer_timing = LayerTiming()
+worker_profiler = WorkerProfiler()
+memory_watchdog = MemoryWatchdog()
+api_spec = PrebuiltApiSpec()
+task_messages = TaskMessageCodec()
+worker_app_context = WorkerAppContext()
 
 
 def init_swagger(app):
-    return Swagger(app, template=settings.SWAGGER_TEMPLATE)
+    """
+    The API docs (/apidocs) are off on production (API_DOCS_ENABLED), and flasgger is
+    not even imported.
+    """
+    if not settings.API_DOCS_ENABLED:
+        return None
+
+    from flasgger import Swagger
+
+    swagger = Swagger(app, template=settings.SWAGGER_TEMPLATE)
+    app.extensions['swagger'] = (
+        swagger  # to build the prebuilt spec (see questrya/common/apispec.py)
+    )
+    return swagger
+
+
+def init_api_spec(app):
+    """
+    Must run after init_swagger: with API_SPEC_FILE, the prebuilt spec replaces the one
+    of flasgger.
+    """
+    app.config['API_SPEC_FILE'] = settings.API_SPEC_FILE
+    app.config['API_SPEC_MAX_AGE'] = settings.API_SPEC_MAX_AGE
+    api_spec.init_app(app)
 
 
 def init_bcrypt(app):
@@ -26,8 +77,61 @@ def init_bcrypt(app):
     bcrypt.init_app(app)
 
 
+def init_password_hasher(app):
+    app.config['PASSWORD_HASHER_WORKERS'] = settings.PASSWORD_HASHER_WORKERS
+    app.config['PASSWORD_HASHER_QUEUE_SIZE'] = settings.PASSWORD_HASHER_QUEUE_SIZE
+    app.config['PASSWORD_HASHER_ROUNDS'] = settings.PASSWORD_HASHER_ROUNDS
+    app.config['PASSWORD_HASHER_TIMEOUT'] = settings.PASSWORD_HASHER_TIMEOUT
+    password_hasher.init_app(app)
+
+
+def init_user_cache(app):
+    user_cache.configure(
+        maxsize=settings.USER_CACHE_MAXSIZE,
+        ttl=settings.USER_CACHE_TTL,
+        shared_url=settings.USER_CACHE_SHARED_URL,
+    )
+
+
+def init_idempotency_cache(app):
+    idempotency_cache.configure(
+        maxsize=settings.IDEMPOTENCY_CACHE_MAXSIZE, ttl=settings.IDEMPOTENCY_CACHE_TTL
+    )
+
+
+def init_request_metrics(app):
+    request_metrics.init_app(app)
+
+
+def init_layer_timing(app):
+    app.config['SERVER_TIMING_SAMPLE_RATE'] = settings.SERVER_TIMING_SAMPLE_RATE
+    layer_timing.init_app(app)
+
+
+def init_worker_profiler(app):
+    app.config['PROFILER_OUTPUT_DIR'] = settings.PROFILER_OUTPUT_DIR
+    app.config['PROFILER_INTERVAL_MS'] = settings.PROFILER_INTERVAL_MS
+    app.config['PROFILER_MAX_SECONDS'] = settings.PROFILER_MAX_SECONDS
+    app.config['PROFILER_REQUEST_TOKEN'] = settings.PROFILER_REQUEST_TOKEN
+    worker_profiler.init_app(app)
+
+
+def init_memory_watchdog(app):
+    """
+    The watchdog only runs on the gunicorn workers, started by
+    gunicorn_settings.post_worker_init.
+    """
+    app.config['WORKER_MAX_RSS_MB'] = settings.WORKER_MAX_RSS_MB
+    app.config['WORKER_MEMORY_CHECK_SECONDS'] = settings.WORKER_MEMORY_CHECK_SECONDS
+    memory_watchdog.init_app(app, metrics=request_metrics)
+
+
 def init_jwt(app):
     app.config['JWT_SECRET_KEY'] = settings.JWT_SECRET_KEY
+    jwt_token_cache.configure(
+        maxsize=settings.JWT_VERIFIED_TOKEN_CACHE_MAXSIZE,
+        ttl=settings.JWT_VERIFIED_TOKEN_CACHE_TTL,
+    )
     jwt.init_app(app)
 
 
@@ -42,13 +146,24 @@ def init_celery(app):
     # Create the Celery instance with the Flask app's import name
     celery = Celery(app.import_name)
 
+    app.config['TASK_COMPRESSION'] = settings.TASK_COMPRESSION
+    app.config['TASK_COMPRESSION_THRESHOLD'] = settings.TASK_COMPRESSION_THRESHOLD
+    app.config['TASK_CLAIM_CHECK_DIR'] = settings.TASK_CLAIM_CHECK_DIR
+    app.config['TASK_CLAIM_CHECK_THRESHOLD'] = settings.TASK_CLAIM_CHECK_THRESHOLD
+    app.config['TASK_CLAIM_CHECK_TTL'] = settings.TASK_CLAIM_CHECK_TTL
+    task_messages.init_app(app, celery)
+
     # Set the broker and other Celery configuration values
     celery.conf.broker_url = broker
     configuration = {
         'task_default_queue': settings.DEFAULT_QUEUE_NAME,
         'task_create_missing_queues': True,
         'task_routes': settings.TASKS_QUEUES,
-        'accept_content': ['pickle', 'json'],
+        'task_serializer': settings.TASK_SERIALIZER,
+        'result_serializer': settings.TASK_SERIALIZER,
+        'accept_content': settings.TASK_ACCEPT_CONTENT,
+        'result_accept_content': settings.TASK_ACCEPT_CONTENT,
+        'worker_prefetch_multiplier': settings.WORKER_PREFETCH_MULTIPLIER,
     }
 
     if settings.IS_DEV_APP:
@@ -62,15 +177,11 @@ def init_celery(app):
     flask_config.pop('broker_url', None)
     celery.conf.update(flask_config)
 
-    # Wrap tasks to run within the Flask app context
-    TaskBase = celery.Task
-
-    class ContextTask(TaskBase):
-        def __call__(self, *args, **kwargs):
-            with app.app_context():
-                return TaskBase.__call__(self, *args, **kwargs)
+    # The worker serves its metrics on WORKER_METRICS_PORT
+    request_metrics.init_celery(celery, port=settings.WORKER_METRICS_PORT)
 
-    celery.Task = ContextTask
+    # Each task runs within the app context of the worker process, on a clean db.session
+    worker_app_context.init_app(app, celery, db=db, dispose_engines=dispose_engines)
 
     # Optionally store the celery instance on the app for later use
     app.extensions = getattr(app, 'extensions', {})
@@ -80,16 +191,110 @@ def init_celery(app):
 
 
 db = SQLAlchemy()
-migrate = Migrate()
+migrate = None  # see init_migrate
+replica_router = ReplicaRouter()
+readiness_checker = ReadinessChecker()
+query_accounting = QueryAccounting()
 
 
 # pylint: disable=unused-import
-def init_db(app):
+def init_db(app, replica_uris: list | None = None):
+    """
+    replica_uris: read replicas for the read-only repository queries
+                  (defaults to the DATABASE_REPLICA_URIS setting).
+    """
+    if replica_uris is None:
+        replica_uris = settings.DATABASE_REPLICA_URIS
+
     app.config['SQLALCHEMY_DATABASE_URI'] = settings.SQLALCHEMY_DATABASE_URI
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options()
+    app.config['DATABASE_REPLICA_STICKY_SECONDS'] = (
+        settings.DATABASE_REPLICA_STICKY_SECONDS
+    )
+    app.config['DATABASE_REPLICA_RETRY_SECONDS'] = (
+        settings.DATABASE_REPLICA_RETRY_SECONDS
+    )
+    app.config['SQL_SLOW_QUERY_MS'] = settings.SQL_SLOW_QUERY_MS
+    app.config['SQL_N_PLUS_ONE_THRESHOLD'] = settings.SQL_N_PLUS_ONE_THRESHOLD
+    app.config['SQL_LOG_PARAMETERS'] = settings.SQL_LOG_PARAMETERS
     db.init_app(app)
+    query_accounting.init_app(app, metrics=request_metrics)
+    replica_router.init_app(
+        app, db, replica_uris=replica_uris, engine_options=get_engine_options()
+    )
 
     # ORM models must be imported here so that the migrations app detect them
     from questrya.sql_db.models import UserSQLModel  # noqa
 
+    init_migrate(app)
+
+
+def init_migrate(app):
+    """
+    Flask-Migrate is only used by the "flask db" commands, so it is set up only when
+    the app is loaded by the flask CLI (inside its click context): never on the
+    gunicorn and celery workers, nor on the tests.
+    """
+    global migrate  # pylint: disable=global-statement
+
+    context = click.get_current_context(silent=True)
+    if context is None or context.find_object(ScriptInfo) is None:
+        return None
+
+    from flask_migrate import Migrate
+
+    if migrate is None:
+        migrate = Migrate()
     migrate.init_app(app, db)
+    return migrate
+
+
+def reset_after_fork(app):
+    """
+    Runs on each gunicorn worker, right after the fork, when the app is preloaded on
+    the master.
+
+    The pooled database connections the master opened (if any) must not be shared
+    by the workers, so each engine gets a new, empty pool. close=False: the inherited
+    sockets are only dropped, closing them would also end them on the master.
+    The password hasher pool and the readiness refresher are already per pid.
+    """
+    dispose_engines(app, close=False)
+
+
+def dispose_engines(app, close: bool = True):
+    """
+    New, empty pools on every database engine (see reset_after_fork for close=False).
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+    replica_router.dispose(close=close)
+
+
+def init_readiness(app):
+    """
+    Must run after init_db and init_celery: it checks their database engine and broker.
+    """
+    app.config['READINESS_TIMEOUT'] = settings.READINESS_TIMEOUT
+    app.config['READINESS_REFRESH_INTERVAL'] = settings.READINESS_REFRESH_INTERVAL
+    app.config['READINESS_MAX_AGE'] = settings.READINESS_MAX_AGE
+    celery = app.extensions['celery']
+
+    def check_database():
+        with app.app_context(), db.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+
+    def check_broker():
+        with celery.connection_for_write(
+            connect_timeout=settings.READINESS_TIMEOUT
+        ) as connection:
+            connection.connect()
+
+    checks = {'database': check_database}
+    if (
+        not celery.conf.task_always_eager
+    ):  # the dev app runs the tasks inline, without a broker
+        checks['broker'] = check_broker
+    readiness_checker.init_app(app, checks=checks)
@@ -1,12 +1,22 @@
 import os
 
 from flask import Flask
+
 from questrya.extensions import (
+    init_api_spec,
+    init_bcrypt,
     init_celery,
     init_db,
-    init_swagger,
-    init_bcrypt,
+    init_idempotency_cache,
     init_jwt,
+    init_layer_timing,
+    init_memory_watchdog,
+    init_password_hasher,
+    init_readiness,
+    init_request_metrics,
+    init_swagger,
+    init_user_cache,
+    init_worker_profiler,
 )
 
 PKG_NAME = os.path.dirname(os.path.realpath(__file__)).split('/')[-1]
@@ -16,17 +26,39 @@ PKG_NAME = os.path.dirname(os.path.realpath(__file__)).split('/')[-1]
 def create_app():
     app = Flask(PKG_NAME)
 
+    init_request_metrics(app)
+
+    init_layer_timing(app)
+
+    init_worker_profiler(app)
+
+    init_memory_watchdog(app)
+
     init_swagger(app)
 
+    init_api_spec(app)
+
     init_db(app)
 
     init_celery(app)
 
+    init_readiness(app)
+
     init_bcrypt(app)
 
+    init_password_hasher(app)
+
+    init_user_cache(app)
+
+    init_idempotency_cache(app)
+
     init_jwt(app)
 
     from questrya.api import register_blueprints
 
     register_blueprints(app)
+
+    from questrya.outbox.commands import outbox_cli
+
+    app.cli.add_command(outbox_cli)
     return app
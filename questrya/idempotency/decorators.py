@@ -0,0 +1,170 @@
+"""
+LAYER: routes
+ROLE: idempotency of the API endpoints and of the celery tasks
+CAN communicate with: Services, Schemas
+MUST NOT communicate with: Domain, Repositories, ORM models
+
+Decorators to run a mutating endpoint once per "Idempotency-Key" header, and a task
+once per dedup key (see questrya/idempotency/service.py).
+"""
+
+import logging
+from functools import wraps
+
+import msgpack
+from celery import current_task
+from flask import Response, make_response, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
+
+from questrya import settings
+from questrya.common.schemas import GenericClientResponseError
+from questrya.idempotency.service import (
+    CLAIMED,
+    IN_PROGRESS,
+    MISMATCH,
+    IdempotencyService,
+    get_digest,
+)
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+TASK_COMPLETED = 0  # the status_code of a completed task
+ANONYMOUS = 'anonymous'
+
+idempotency_service = IdempotencyService()
+
+
+def get_caller() -> str:
+    """
+    The JWT identity of the caller (the same across its refreshed tokens), or ANONYMOUS
+    without a valid token.
+    """
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return ANONYMOUS
+    identity = get_jwt_identity()
+    return str(identity) if identity is not None else ANONYMOUS
+
+
+def idempotent(fn):
+    """
+    With an "Idempotency-Key" header, the endpoint runs once per key (and caller): a
+    retry gets the stored response (with "Idempotent-Replayed: true") instead of running
+    it again. The 5xx responses are not stored, their retries run again. Without the
+    header, it always runs.
+    """
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return fn(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            error = (
+                f'The {IDEMPOTENCY_KEY_HEADER} header is over '
+                f'{MAX_KEY_LENGTH} characters'
+            )
+            return GenericClientResponseError(error=error).model_dump(), 400
+
+        # the same key sent by two callers (two JWT identities) is two keys
+        scope = f'{request.endpoint}:{get_caller()}'
+        fingerprint = get_digest(request.method, request.path, request.get_data())
+        outcome, record = idempotency_service.begin(
+            kind='request', scope=scope, key=key, fingerprint=fingerprint
+        )
+        if outcome == MISMATCH:
+            error = f'The {IDEMPOTENCY_KEY_HEADER} was already used by another request'
+            return GenericClientResponseError(error=error).model_dump(), 422
+        if outcome == IN_PROGRESS:
+            error = (
+                f'A request with the same {IDEMPOTENCY_KEY_HEADER} is still running, '
+                'retry later'
+            )
+            return GenericClientResponseError(error=error).model_dump(), 409
+        if outcome != CLAIMED:
+            body, mimetype = msgpack.unpackb(record['response'])
+            response = Response(body, status=record['status_code'], mimetype=mimetype)
+            response.headers[REPLAYED_HEADER] = 'true'
+            return response
+
+        try:
+            response = make_response(fn(*args, **kwargs))
+        except Exception:
+            idempotency_service.release(scope=scope, key=key)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            idempotency_service.release(scope=scope, key=key)
+        else:
+            idempotency_service.complete(
+                scope=scope,
+                key=key,
+                fingerprint=fingerprint,
+                status_code=response.status_code,
+                response=msgpack.packb([response.get_data(), response.mimetype]),
+            )
+        return response
+
+    return wrapper
+
+
+def deduplicated(key=None):
+    """
+    The task runs once per dedup key, for IDEMPOTENCY_TTL: a redelivered message (e.g.
+    after a worker crash) or a task published twice (e.g. by the outbox relay) is
+    skipped. Put it under the task decorator:
+
+        @shared_task()
+        @deduplicated(key=lambda report_uuid: report_uuid)
+        def build_report(report_uuid): ...
+
+    key: a function of the task arguments. By default, the task id (kept by the
+    redeliveries and by the outbox relay, not by a second delay() of the same task).
+    A duplicate of a task still running is retried after IDEMPOTENCY_LEASE_SECONDS.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            task = current_task
+            if task is None or task.request.called_directly:
+                return fn(*args, **kwargs)
+
+            dedup_key = str(key(*args, **kwargs) if key else task.request.id)
+            outcome, _ = idempotency_service.begin(
+                kind='task', scope=task.name, key=dedup_key
+            )
+            if outcome == IN_PROGRESS:
+                # until the first run completes (or its lease expires), however long it
+                # takes
+                task.retry(
+                    countdown=settings.IDEMPOTENCY_LEASE_SECONDS, max_retries=None
+                )
+            if outcome != CLAIMED:
+                logger.info(
+                    f'Skipped {task.name}[{task.request.id}]: already run '
+                    f'(dedup key {dedup_key})'
+                )
+                return None
+
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                idempotency_service.release(scope=task.name, key=dedup_key)
+                raise
+            idempotency_service.complete(
+                scope=task.name,
+                key=dedup_key,
+                fingerprint=b'',
+                status_code=TASK_COMPLETED,
+            )
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,167 @@
+"""
+LAYER: repository
+ROLE: orchestrate persistance of the idempotency keys with SQLAlchemy
+CAN communicate with: ORM models
+MUST NOT communicate with: Services, Routes
+"""
+
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from questrya.common.timing import timed
+from questrya.extensions import db
+from questrya.sql_db.models import IdempotencyKeySQLModel
+
+IDEMPOTENCY_TABLE = IdempotencyKeySQLModel.__table__
+
+
+def build_claim_statement():
+    """Built only once (at import time), as the upserts of the UserRepository."""
+    statement = insert(IDEMPOTENCY_TABLE)
+    return statement.on_conflict_do_update(
+        index_elements=[IDEMPOTENCY_TABLE.c.key],
+        set_={
+            'fingerprint': statement.excluded.fingerprint,
+            'status_code': None,
+            'response': None,
+            'expires_at': statement.excluded.expires_at,
+        },
+        # an expired key (completed long ago, or the lease of a crashed run) is claimed
+        # again
+        where=IDEMPOTENCY_TABLE.c.expires_at < bindparam('now'),
+    ).returning(IDEMPOTENCY_TABLE.c.key)
+
+
+IDEMPOTENCY_CLAIM_STATEMENT = build_claim_statement()
+IDEMPOTENCY_GET_STATEMENT = select(
+    IDEMPOTENCY_TABLE.c.fingerprint,
+    IDEMPOTENCY_TABLE.c.status_code,
+    IDEMPOTENCY_TABLE.c.response,
+).where(
+    IDEMPOTENCY_TABLE.c.key == bindparam('key'),
+    IDEMPOTENCY_TABLE.c.expires_at >= bindparam('now'),
+)
+# the running key only: a run that outlived its lease and was claimed again does not
+# overwrite the new one
+IDEMPOTENCY_COMPLETE_STATEMENT = (
+    update(IDEMPOTENCY_TABLE)
+    .where(
+        IDEMPOTENCY_TABLE.c.key == bindparam('claimed_key'),
+        IDEMPOTENCY_TABLE.c.fingerprint == bindparam('claimed_fingerprint'),
+        IDEMPOTENCY_TABLE.c.status_code.is_(None),
+    )
+    .values(
+        status_code=bindparam('completed_status_code'),
+        response=bindparam('completed_response'),
+        expires_at=bindparam('completed_expires_at'),
+    )
+)
+IDEMPOTENCY_RELEASE_STATEMENT = delete(IDEMPOTENCY_TABLE).where(
+    IDEMPOTENCY_TABLE.c.key == bindparam('key'),
+    IDEMPOTENCY_TABLE.c.status_code.is_(None),
+)
+
+
+def get_utc_now() -> datetime:
+    """Naive UTC, as the expires_at column."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+@contextmanager
+def get_own_session():
+    """
+    A session (and transaction) of its own, committed on exit: not db.session, whose
+    pending changes (e.g. the outbox rows of a handler that failed) must not be
+    committed with a key.
+    """
+    with (
+        Session(
+            bind=db.session.get_bind(), join_transaction_mode='create_savepoint'
+        ) as session,
+        session.begin(),
+    ):
+        yield session
+
+
+class IdempotencyRepository:
+    """
+    The keys are digests (see IdempotencyService), and every method commits, on a
+    session of its own (get_own_session): a key must be seen by the retries running at
+    the same time as soon as it is claimed, before the work is done.
+    """
+
+    @staticmethod
+    @timed('repository')
+    def claim(key: bytes, fingerprint: bytes, lease_seconds: float) -> bool:
+        """
+        Inserts the key as running (no status_code) for lease_seconds. False when it is
+        taken.
+        """
+        now = get_utc_now()
+        with get_own_session() as session:
+            db_row = session.execute(
+                IDEMPOTENCY_CLAIM_STATEMENT,
+                {
+                    'key': key,
+                    'fingerprint': fingerprint,
+                    'expires_at': now + timedelta(seconds=lease_seconds),
+                    'now': now,
+                },
+            ).first()
+        return db_row is not None
+
+    @staticmethod
+    @timed('repository')
+    def get(key: bytes) -> dict | None:
+        """
+        {'fingerprint', 'status_code', 'response'} of the key, or None (e.g. expired).
+        """
+        with get_own_session() as session:
+            db_row = session.execute(
+                IDEMPOTENCY_GET_STATEMENT, {'key': key, 'now': get_utc_now()}
+            ).first()
+        return db_row._asdict() if db_row else None
+
+    @staticmethod
+    @timed('repository')
+    def complete(
+        key: bytes, fingerprint: bytes, status_code: int, response: bytes, ttl: float
+    ):
+        with get_own_session() as session:
+            session.execute(
+                IDEMPOTENCY_COMPLETE_STATEMENT,
+                {
+                    'claimed_key': key,
+                    'claimed_fingerprint': fingerprint,
+                    'completed_status_code': status_code,
+                    'completed_response': response,
+                    'completed_expires_at': get_utc_now() + timedelta(seconds=ttl),
+                },
+            )
+
+    @staticmethod
+    @timed('repository')
+    def release(key: bytes):
+        """Deletes a running key (the run failed), so that a retry runs again."""
+        with get_own_session() as session:
+            session.execute(IDEMPOTENCY_RELEASE_STATEMENT, {'key': key})
+
+    @staticmethod
+    @timed('repository')
+    def purge_expired(limit: int = 1000) -> int:
+        expired_keys = (
+            select(IDEMPOTENCY_TABLE.c.key)
+            .where(IDEMPOTENCY_TABLE.c.expires_at < get_utc_now())
+            .limit(limit)
+        )
+        with get_own_session() as session:
+            result = session.execute(
+                delete(IDEMPOTENCY_TABLE).where(
+                    IDEMPOTENCY_TABLE.c.key.in_(expired_keys)
+                )
+            )
+        return result.rowcount
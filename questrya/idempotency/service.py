@@ -0,0 +1,131 @@
+"""
+LAYER: services
+ROLE: orchestrates business operations by coordinating domain logic with repositories
+CAN communicate with: Repositories, Domain
+MUST NOT communicate with: ORM models, Routes
+
+Idempotency keys: a retried request (same "Idempotency-Key" header) or a redelivered
+task (same dedup key) gets the outcome of the first run, instead of running again.
+
+The first run claims the key (committed at once, so the retries running at the same
+time see it), runs, and stores its outcome for IDEMPOTENCY_TTL. A retry that finds it:
+- completed, with the same request: replays the stored response (REPLAYED);
+- still running: is told to retry later (IN_PROGRESS). A run that crashed holds the key
+  for IDEMPOTENCY_LEASE_SECONDS at most;
+- completed or running, with another request (same key, another body): is refused
+  (MISMATCH).
+A run that fails releases its key, so that a retry runs again. Each of these duplicates
+is counted on questrya_idempotent_duplicates.
+
+The completed keys are cached on each worker (idempotency_cache), so a burst of retries
+does not query the database, and the table only holds 16 byte digests of the keys and
+requests.
+"""
+
+import hashlib
+import time
+
+from questrya import settings
+from questrya.common.timing import timed
+from questrya.extensions import idempotency_cache, request_metrics
+from questrya.idempotency.repository import IdempotencyRepository
+
+CLAIMED = 'claimed'
+REPLAYED = 'replayed'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+PURGE_INTERVAL = 60.0  # seconds between the purges of the expired keys, on each process
+
+
+def get_digest(*parts) -> bytes:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b'\0')
+    return digest.digest()[:16]
+
+
+class IdempotencyService:
+    _last_purge = 0.0
+
+    def __init__(self):
+        self.idempotency_repository = IdempotencyRepository()
+
+    @timed('service')
+    def begin(self, kind: str, scope: str, key: str, fingerprint: bytes = b'') -> tuple:
+        """
+        kind: 'request' or 'task' (for the metrics). scope: e.g. the route or the task
+        name. fingerprint: a digest of the request, to tell a retry from another request
+        with the same key.
+
+        Returns (outcome, record): with CLAIMED (and no record), run it and then
+        complete() or release() it. Otherwise the record of the first run:
+        {'fingerprint', 'status_code', 'response'}.
+        """
+        digest = get_digest(scope, key)
+        record = idempotency_cache.get(digest)
+        if record is None:
+            if self.idempotency_repository.claim(
+                key=digest,
+                fingerprint=fingerprint,
+                lease_seconds=settings.IDEMPOTENCY_LEASE_SECONDS,
+            ):
+                return CLAIMED, None
+            record = self.idempotency_repository.get(key=digest)
+            if (
+                record is None
+            ):  # expired right after the claim failed: a run is about to claim it again
+                record = {
+                    'fingerprint': fingerprint,
+                    'status_code': None,
+                    'response': None,
+                }
+            elif record['status_code'] is not None:
+                idempotency_cache.set(digest, record)
+
+        if record['fingerprint'] != fingerprint:
+            outcome = MISMATCH
+        elif record['status_code'] is None:
+            outcome = IN_PROGRESS
+        else:
+            outcome = REPLAYED
+        request_metrics.count_idempotent_duplicate(kind=kind, outcome=outcome)
+        return outcome, record
+
+    @timed('service')
+    def complete(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: bytes,
+        status_code: int,
+        response: bytes = b'',
+    ):
+        digest = get_digest(scope, key)
+        self.idempotency_repository.complete(
+            key=digest,
+            fingerprint=fingerprint,
+            status_code=status_code,
+            response=response,
+            ttl=settings.IDEMPOTENCY_TTL,
+        )
+        idempotency_cache.set(
+            digest,
+            {
+                'fingerprint': fingerprint,
+                'status_code': status_code,
+                'response': response,
+            },
+        )
+        self.purge_every(PURGE_INTERVAL)
+
+    @timed('service')
+    def release(self, scope: str, key: str):
+        self.idempotency_repository.release(key=get_digest(scope, key))
+
+    def purge_every(self, seconds: float):
+        now = time.monotonic()
+        if now - IdempotencyService._last_purge >= seconds:
+            IdempotencyService._last_purge = now
+            self.idempotency_repository.purge_expired()
@@ -0,0 +1,424 @@
+import json
+from unittest.mock import MagicMock, patch
+from urllib.request import urlopen
+from uuid import UUID, uuid4
+
+import pytest
+from celery import Celery
+from celery.exceptions import Retry
+from celery.signals import worker_init, worker_process_shutdown
+from flask_jwt_extended import create_access_token
+from prometheus_client import REGISTRY, start_http_server
+
+from questrya import settings
+from questrya.extensions import db, idempotency_cache, request_metrics
+from questrya.idempotency.decorators import REPLAYED_HEADER, deduplicated, idempotent
+from questrya.idempotency.repository import IdempotencyRepository
+from questrya.idempotency.service import CLAIMED, IdempotencyService, get_digest
+from questrya.outbox.repository import OutboxRepository
+from questrya.outbox.service import OutboxService
+from questrya.users.domain import User
+
+USER_DATA = {
+    'username': 'testuser',
+    'email': 'test@example.com',
+    'password': 'password123',
+}
+
+
+def get_duplicates(kind: str, outcome: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            'questrya_idempotent_duplicates_total', {'kind': kind, 'outcome': outcome}
+        )
+        or 0.0
+    )
+
+
+def post_user(
+    test_client, key: str, data: dict | None = None, headers: dict | None = None
+):
+    return test_client.post(
+        '/api/users/user',
+        data=json.dumps(data or USER_DATA),
+        content_type='application/json',
+        headers={'Idempotency-Key': key, **(headers or {})},
+    )
+
+
+@pytest.fixture
+def idempotency(db_session):
+    idempotency_cache.clear()
+    yield IdempotencyService()
+    idempotency_cache.clear()
+
+
+@pytest.fixture
+def mock_user_service():
+    with patch('questrya.users.routes.user_service') as mock_user_service:
+        mock_user = MagicMock(spec=User)
+        mock_user.uuid = UUID('12345678-1234-5678-1234-567812345678')
+        mock_user_service.register_user.return_value = mock_user
+        yield mock_user_service
+
+
+class TestIdempotentRoute:
+    def test_retry_gets_the_stored_response_without_running_again(
+        self, test_client, idempotency, mock_user_service
+    ):
+        # GIVEN
+        key = str(uuid4())
+        replayed_before = get_duplicates('request', 'replayed')
+        first = post_user(test_client, key)
+
+        # WHEN
+        retry = post_user(test_client, key)
+
+        # THEN
+        assert mock_user_service.register_user.call_count == 1
+        assert retry.status_code == first.status_code == 201
+        assert retry.get_json() == first.get_json()
+        assert retry.headers[REPLAYED_HEADER] == 'true'
+        assert REPLAYED_HEADER not in first.headers
+        assert get_duplicates('request', 'replayed') == replayed_before + 1
+
+    def test_retry_from_the_database_when_not_cached(
+        self, test_client, idempotency, mock_user_service
+    ):
+        # GIVEN: e.g. the retry reaches another worker
+        key = str(uuid4())
+        first = post_user(test_client, key)
+        idempotency_cache.clear()
+
+        # WHEN
+        retry = post_user(test_client, key)
+
+        # THEN
+        assert mock_user_service.register_user.call_count == 1
+        assert retry.get_json() == first.get_json()
+
+    def test_same_key_with_another_request_is_refused(
+        self, test_client, idempotency, mock_user_service
+    ):
+        # GIVEN
+        key = str(uuid4())
+        post_user(test_client, key)
+
+        # WHEN
+        response = post_user(
+            test_client, key, data={**USER_DATA, 'username': 'otheruser'}
+        )
+
+        # THEN
+        assert response.status_code == 422
+        assert mock_user_service.register_user.call_count == 1
+
+    def test_retry_while_the_first_request_runs(
+        self, test_client, idempotency, mock_user_service
+    ):
+        # GIVEN
+        key = str(uuid4())
+        in_progress_before = get_duplicates('request', 'in_progress')
+        retries = []
+
+        def register_user_while_retried(*args):
+            retries.append(post_user(test_client, key))
+            return MagicMock(uuid=uuid4())
+
+        mock_user_service.register_user.side_effect = register_user_while_retried
+
+        # WHEN
+        first = post_user(test_client, key)
+
+        # THEN
+        assert first.status_code == 201
+        assert retries[0].status_code == 409
+        assert mock_user_service.register_user.call_count == 1
+        assert get_duplicates('request', 'in_progress') == in_progress_before + 1
+
+    def test_server_errors_are_not_stored(
+        self, test_client, idempotency, mock_user_service
+    ):
+        # GIVEN
+        key = str(uuid4())
+        mock_user_service.register_user.side_effect = [
+            Exception('database is down'),
+            MagicMock(uuid=uuid4()),
+        ]
+        first = post_user(test_client, key)
+
+        # WHEN
+        retry = post_user(test_client, key)
+
+        # THEN
+        assert first.status_code == 500
+        assert retry.status_code == 201
+        assert mock_user_service.register_user.call_count == 2
+
+    def test_retry_with_a_refreshed_token_of_the_same_caller(
+        self, test_client, idempotency, mock_user_service
+    ):
+        # GIVEN
+        key = str(uuid4())
+        post_user(
+            test_client,
+            key,
+            headers={
+                'Authorization': f'Bearer {create_access_token(identity="picard")}'
+            },
+        )
+
+        # WHEN
+        retry = post_user(
+            test_client,
+            key,
+            headers={
+                'Authorization': f'Bearer {create_access_token(identity="picard")}'
+            },
+        )
+        another_caller = post_user(
+            test_client,
+            key,
+            headers={
+                'Authorization': f'Bearer {create_access_token(identity="riker")}'
+            },
+        )
+
+        # THEN
+        assert retry.headers[REPLAYED_HEADER] == 'true'
+        assert REPLAYED_HEADER not in another_caller.headers
+        assert mock_user_service.register_user.call_count == 2
+
+    @pytest.mark.parametrize('failure', ['exception', 'client_error'])
+    def test_the_pending_changes_of_the_handler_are_not_committed(
+        self, app, test_client, idempotency, failure
+    ):
+        # GIVEN: a handler that enqueues a task, and then fails before committing
+        @app.route(f'/idempotency-enqueue-then-{failure}', methods=['POST'])
+        @idempotent
+        def enqueue_then_fail():
+            OutboxService().enqueue('questrya.tasks.compute', args=(2, '2025-01-01'))
+            if failure == 'exception':
+                raise RuntimeError('the rest of the work failed')
+            return {'error': 'invalid'}, 400
+
+        # WHEN
+        try:
+            test_client.post(
+                f'/idempotency-enqueue-then-{failure}',
+                headers={'Idempotency-Key': str(uuid4())},
+            )
+        except RuntimeError:
+            pass
+        db.session.remove()  # as at the end of the request
+
+        # THEN
+        assert OutboxRepository.count() == 0
+
+    def test_runs_every_time_without_the_header(
+        self, test_client, idempotency, mock_user_service
+    ):
+        # WHEN
+        for _ in range(2):
+            test_client.post(
+                '/api/users/user',
+                data=json.dumps(USER_DATA),
+                content_type='application/json',
+            )
+
+        # THEN
+        assert mock_user_service.register_user.call_count == 2
+
+
+class TestDeduplicatedTask:
+    @pytest.fixture
+    def celery(self):
+        return Celery('idempotency-tests')
+
+    def test_redelivered_task_does_not_run_again(self, celery, idempotency):
+        # GIVEN
+        runs = []
+
+        @celery.task(shared=False)
+        @deduplicated()
+        def build_report(report_id):
+            runs.append(report_id)
+
+        task_id = str(uuid4())
+        replayed_before = get_duplicates('task', 'replayed')
+
+        # WHEN
+        build_report.apply(args=(1,), task_id=task_id)
+        build_report.apply(args=(1,), task_id=task_id)
+        build_report.apply(args=(2,), task_id=str(uuid4()))
+
+        # THEN
+        assert runs == [1, 2]
+        assert get_duplicates('task', 'replayed') == replayed_before + 1
+
+    def test_dedup_key_from_the_arguments(self, celery, idempotency):
+        # GIVEN
+        runs = []
+
+        @celery.task(shared=False)
+        @deduplicated(key=lambda report_id: report_id)
+        def build_report(report_id):
+            runs.append(report_id)
+
+        # WHEN
+        for report_id in (1, 1, 2):
+            build_report.apply(args=(report_id,))
+
+        # THEN
+        assert runs == [1, 2]
+
+    def test_failed_task_runs_again(self, celery, idempotency):
+        # GIVEN
+        runs = []
+
+        @celery.task(shared=False)
+        @deduplicated()
+        def build_report(report_id):
+            runs.append(report_id)
+            if len(runs) == 1:
+                raise ValueError('report storage is down')
+
+        task_id = str(uuid4())
+
+        # WHEN
+        failed = build_report.apply(args=(1,), task_id=task_id)
+        build_report.apply(args=(1,), task_id=task_id)
+
+        # THEN
+        assert failed.failed()
+        assert runs == [1, 1]
+
+    def test_duplicate_of_a_running_task_is_retried(self, celery, idempotency):
+        # GIVEN
+        @celery.task(shared=False)
+        @deduplicated()
+        def build_report(report_id):
+            pass
+
+        task_id = str(uuid4())
+        assert idempotency.begin(kind='task', scope=build_report.name, key=task_id) == (
+            CLAIMED,
+            None,
+        )
+
+        # WHEN
+        with patch.object(build_report, 'retry', side_effect=Retry()) as retry:
+            result = build_report.apply(args=(1,), task_id=task_id)
+
+        # THEN
+        retry.assert_called_once_with(
+            countdown=settings.IDEMPOTENCY_LEASE_SECONDS, max_retries=None
+        )
+        assert result.state == 'RETRY'
+
+    def test_redelivered_tasks_are_exported_by_the_worker(self, celery, idempotency):
+        # GIVEN: the worker of this celery app serving its metrics (on a free port)
+        served = []
+
+        def start_on_a_free_port(port, addr, registry):
+            served.append(start_http_server(0, addr='127.0.0.1', registry=registry))
+
+        request_metrics.init_celery(celery, port=9540)
+        with patch(
+            'questrya.common.metrics.start_http_server',
+            side_effect=start_on_a_free_port,
+        ):
+            worker_init.send(sender=MagicMock(app=Celery('another-app')))
+            worker_init.send(sender=MagicMock(app=celery))
+        worker_init.disconnect(request_metrics.on_worker_init)
+        worker_process_shutdown.disconnect(request_metrics.on_worker_process_shutdown)
+        ((server, _),) = served
+
+        @celery.task(shared=False)
+        @deduplicated()
+        def build_report(report_id):
+            pass
+
+        task_id = str(uuid4())
+
+        try:
+            # WHEN
+            build_report.apply(args=(1,), task_id=task_id)
+            build_report.apply(args=(1,), task_id=task_id)
+            exported = (
+                urlopen(f'http://127.0.0.1:{server.server_port}/metrics')
+                .read()
+                .decode()
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # THEN
+        replayed = get_duplicates('task', 'replayed')
+        sample = 'questrya_idempotent_duplicates_total{kind="task",outcome="replayed"}'
+        assert f'{sample} {replayed}' in exported
+
+    def test_failed_task_does_not_commit_its_pending_changes(self, celery, idempotency):
+        # GIVEN
+        @celery.task(shared=False)
+        @deduplicated()
+        def build_report(report_id):
+            OutboxService().enqueue(
+                'questrya.tasks.compute', args=(report_id, '2025-01-01')
+            )
+            raise ValueError('report storage is down')
+
+        # WHEN
+        build_report.apply(args=(1,))
+        db.session.remove()  # as at the end of the task
+
+        # THEN
+        assert OutboxRepository.count() == 0
+
+
+class TestIdempotencyRepository:
+    def test_expired_keys_are_claimed_again(self, idempotency):
+        # GIVEN
+        key = get_digest('tests', uuid4())
+        assert IdempotencyRepository.claim(
+            key=key, fingerprint=b'first', lease_seconds=-1
+        )
+
+        # WHEN
+        claimed = IdempotencyRepository.claim(
+            key=key, fingerprint=b'second', lease_seconds=60
+        )
+
+        # THEN
+        assert claimed
+        assert IdempotencyRepository.get(key=key)['fingerprint'] == b'second'
+
+    def test_running_keys_are_not_claimed_again(self, idempotency):
+        # GIVEN
+        key = get_digest('tests', uuid4())
+        IdempotencyRepository.claim(key=key, fingerprint=b'first', lease_seconds=60)
+
+        # WHEN
+        claimed = IdempotencyRepository.claim(
+            key=key, fingerprint=b'first', lease_seconds=60
+        )
+
+        # THEN
+        assert not claimed
+        assert IdempotencyRepository.get(key=key)['status_code'] is None
+
+    def test_purges_the_expired_keys(self, idempotency):
+        # GIVEN
+        expired_key = get_digest('tests', uuid4())
+        running_key = get_digest('tests', uuid4())
+        IdempotencyRepository.claim(key=expired_key, fingerprint=b'', lease_seconds=-1)
+        IdempotencyRepository.claim(key=running_key, fingerprint=b'', lease_seconds=60)
+
+        # WHEN
+        purged = IdempotencyRepository.purge_expired()
+
+        # THEN
+        assert purged >= 1
+        assert IdempotencyRepository.get(key=expired_key) is None
+        assert IdempotencyRepository.get(key=running_key) is not None
@@ -7,22 +7,33 @@ MUST NOT communicate with: Domain, Repositories, ORM models
 This must have all the API endpoints
 """
 
+import logging
 from datetime import datetime
 
 import flask
-from flask import Blueprint
+from flask import Blueprint, request
 
+from questrya.auth.decorators import admin_required
 from questrya.common.schemas import (
     GenericClientResponseError,
     GenericServerResponseError,
 )
 from questrya.monitor.schemas import (
+    CacheStatsResponseSuccess,
+    DatabasePoolStatsResponseSuccess,
     LivenessResponseSuccess,
+    PasswordHasherStatsResponseSuccess,
+    ProfileRequest,
+    ProfileResponseSuccess,
     ReadinessResponseSuccess,
 )
+from questrya.monitor.service import MonitorService
 from questrya.settings import VERSION
 
+logger = logging.getLogger(__name__)
+
 monitor_bp = Blueprint('monitor', __name__)
+monitor_service = MonitorService()
 
 
 @monitor_bp.route('/readiness', methods=['GET'])
@@ -37,27 +48,40 @@ def readiness():
     One use of this signal is to control which Pods are used as
     backends for Services.
     When a Pod is not ready, it is removed from Service load balancers.
-    This will run ONLY ONCE.
+
+    The container is ready when its dependencies (database and, outside of
+    the dev app, the celery broker) answer. They are checked on the background,
+    under a time budget, so the probe itself never touches them (see
+    questrya/common/health.py).
     ---
     tags:
       - Monitor
     responses:
       200:
-        description: show the app as ready, with its app version and type.
+        description: show the app as ready, with its app version and type,
+                     and the latency of each dependency.
+      503:
+        description: a dependency is not ready (see its error).
     """
     try:
         flask_version = flask.__version__
         app_type = f'flask-framework {flask_version}'
+        status = monitor_service.get_readiness()
 
         return (
             ReadinessResponseSuccess(
-                ready='OK', app_version=VERSION, app_type=f'{app_type}'
+                ready='OK' if status['ready'] else 'FAIL',
+                app_version=VERSION,
+                app_type=f'{app_type}',
+                checked_at=status['checked_at'],
+                dependencies=status['dependencies'],
             ).model_dump(),
-            200,
+            200 if status['ready'] else 503,
         )
     except ValueError as e:
         return GenericClientResponseError(error=str(e)).model_dump(), 400
     except Exception as e:
+        logger.exception('Monitor request failed')
         return GenericServerResponseError(error=str(e)).model_dump(), 500
 
 
@@ -90,4 +114,148 @@ def liveness():
     except ValueError as e:
         return GenericClientResponseError(error=str(e)).model_dump(), 400
     except Exception as e:
+        logger.exception('Monitor request failed')
+        return GenericServerResponseError(error=str(e)).model_dump(), 500
+
+
+@monitor_bp.route('/password-hasher', methods=['GET'])
+def password_hasher_stats():
+    """
+    Statistics of the password hashing (bcrypt) process pool of this worker.
+
+    Use the queue depth, rejections and latency to size
+    PASSWORD_HASHER_WORKERS and PASSWORD_HASHER_QUEUE_SIZE
+    independently from the gunicorn threads.
+    ---
+    tags:
+      - Monitor
+    responses:
+      200:
+        description: pool size, queue depth, rejected requests and hashing latency.
+      500:
+        description: server error
+    """
+    try:
+        stats = monitor_service.get_password_hasher_stats()
+        return PasswordHasherStatsResponseSuccess(**stats).model_dump(), 200
+    except Exception as e:
+        logger.exception('Monitor request failed')
+        return GenericServerResponseError(error=str(e)).model_dump(), 500
+
+
+@monitor_bp.route('/cache', methods=['GET'])
+def cache_stats():
+    """
+    Statistics of the users read-through cache of this worker.
+
+    Hits, misses, evictions and expirations of the per-process LRU,
+    and hits, misses and errors of the shared tier (when configured).
+    ---
+    tags:
+      - Monitor
+    responses:
+      200:
+        description: cache counters, per tier.
+      500:
+        description: server error
+    """
+    try:
+        stats = monitor_service.get_user_cache_stats()
+        return CacheStatsResponseSuccess(**stats).model_dump(), 200
+    except Exception as e:
+        logger.exception('Monitor request failed')
+        return GenericServerResponseError(error=str(e)).model_dump(), 500
+
+
+@monitor_bp.route('/pool', methods=['GET'])
+def database_pool_stats():
+    """
+    Statistics of the database connection pool of this worker.
+
+    Each gunicorn worker has its own pool, so this reports the worker
+    (pid) that answered: connections checked in/out, overflow, and how
+    long the checkouts waited for a connection (and how many timed out).
+    ---
+    tags:
+      - Monitor
+    responses:
+      200:
+        description: connection pool statistics of this worker.
+      500:
+        description: server error
+    """
+    try:
+        stats = monitor_service.get_database_pool_stats()
+        return DatabasePoolStatsResponseSuccess(**stats).model_dump(), 200
+    except Exception as e:
+        logger.exception('Monitor request failed')
+        return GenericServerResponseError(error=str(e)).model_dump(), 500
+
+
+@monitor_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus metrics of the HTTP requests, aggregated from all the workers.
+
+    Latency histograms and status code counters per blueprint and route,
+    and the requests in flight per blueprint. With PROMETHEUS_MULTIPROC_DIR
+    unset, only the worker (pid) that answered is reported.
+    ---
+    tags:
+      - Monitor
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: metrics in the Prometheus text exposition format.
+      500:
+        description: server error
+    """
+    try:
+        payload, content_type = monitor_service.get_metrics()
+        return payload, 200, {'Content-Type': content_type}
+    except Exception as e:
+        logger.exception('Monitor request failed')
+        return GenericServerResponseError(error=str(e)).model_dump(), 500
+
+
+@monitor_bp.route('/profile', methods=['POST'])
+@admin_required
+def profile_worker():
+    """
+    Profiles the worker (pid) that answers, for some seconds.
+
+    A sampling profiler records the stacks of all the threads of the worker
+    on the background, then writes them in the collapsed stacks format
+    (for flamegraph.pl or speedscope) to PROFILER_OUTPUT_DIR. Only one
+    profile runs at a time on each worker.
+    ---
+    tags:
+      - Monitor
+    parameters:
+      - name: seconds
+        type: number
+        required: false
+        description: how long to profile (default 10, up to PROFILER_MAX_SECONDS)
+    responses:
+      202:
+        description: the profile started, with the pid and the file it will
+                     be written to.
+      400:
+        description: invalid duration, or a profile is already running on this worker
+      403:
+        description: the user is not an admin
+      500:
+        description: server error
+    """
+    try:
+        validated_data = ProfileRequest.model_validate(
+            request.get_json(silent=True) or {}
+        )
+        result = monitor_service.profile_worker(seconds=validated_data.seconds)
+        return ProfileResponseSuccess(**result).model_dump(), 202
+    except ValueError as e:
+        return GenericClientResponseError(error=str(e)).model_dump(), 400
+    except Exception as e:
+        logger.exception('Monitor request failed')
         return GenericServerResponseError(error=str(e)).model_dump(), 500
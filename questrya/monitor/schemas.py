@@ -7,16 +7,60 @@ MUST NOT communicate with: ORM models, Repositories, Domain, Services, Routes
 This must contain serialization/validations rules used by the APIs
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ReadinessResponseSuccess(BaseModel):
     ready: str
     app_version: str
     app_type: str
+    checked_at: str | None = None
+    dependencies: dict = {}
 
 
 class LivenessResponseSuccess(BaseModel):
     live: str
     version: str
     timestamp: str
+
+
+class PasswordHasherStatsResponseSuccess(BaseModel):
+    workers: int
+    queue_size: int
+    in_flight: int
+    queue_depth: int
+    rejected: int
+    timed_out: int
+    completed: int
+    avg_latency_ms: float
+    max_latency_ms: float
+
+
+class CacheStatsResponseSuccess(BaseModel):
+    namespace: str
+    local: dict
+    shared: dict | None
+
+
+class ProfileRequest(BaseModel):
+    seconds: float = Field(default=10.0, gt=0)
+
+
+class ProfileResponseSuccess(BaseModel):
+    pid: int
+    seconds: float
+    interval_ms: float
+    path: str
+
+
+class DatabasePoolStatsResponseSuccess(BaseModel):
+    pid: int
+    pool_size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    avg_wait_ms: float
+    max_wait_ms: float
@@ -0,0 +1,37 @@
+"""
+LAYER: services
+ROLE: orchestrates business operations by coordinating domain logic with repositories
+CAN communicate with: Repositories, Domain
+MUST NOT communicate with: ORM models, Routes
+
+This must have the application use cases
+"""
+
+from questrya.extensions import (
+    db,
+    password_hasher,
+    readiness_checker,
+    request_metrics,
+    user_cache,
+    worker_profiler,
+)
+
+
+class MonitorService:
+    def get_readiness(self) -> dict:
+        return readiness_checker.get_status()
+
+    def get_password_hasher_stats(self) -> dict:
+        return password_hasher.stats()
+
+    def get_user_cache_stats(self) -> dict:
+        return user_cache.stats()
+
+    def get_database_pool_stats(self) -> dict:
+        return db.engine.pool.stats()
+
+    def get_metrics(self) -> tuple:
+        return request_metrics.generate()
+
+    def profile_worker(self, seconds: float) -> dict:
+        return worker_profiler.profile_worker(seconds=seconds)
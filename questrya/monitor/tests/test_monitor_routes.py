@@ -0,0 +1,142 @@
+from unittest.mock import patch
+
+from flask_jwt_extended import create_access_token
+
+
+class TestPasswordHasherStatsRoute:
+    def test_get_password_hasher_stats(self, test_client):
+        response = test_client.get('/api/monitor/password-hasher')
+
+        assert response.status_code == 200
+        for key in (
+            'workers',
+            'queue_size',
+            'in_flight',
+            'queue_depth',
+            'rejected',
+            'avg_latency_ms',
+        ):
+            assert key in response.json
+
+
+class TestCacheStatsRoute:
+    def test_get_cache_stats(self, test_client):
+        response = test_client.get('/api/monitor/cache')
+
+        assert response.status_code == 200
+        assert response.json['namespace'] == 'users'
+        for key in ('size', 'maxsize', 'hits', 'misses', 'evictions', 'expirations'):
+            assert key in response.json['local']
+
+
+class TestDatabasePoolStatsRoute:
+    def test_get_database_pool_stats(self, test_client, db_session):
+        response = test_client.get('/api/monitor/pool')
+
+        assert response.status_code == 200
+        for key in (
+            'pid',
+            'pool_size',
+            'checked_out',
+            'overflow',
+            'checkouts',
+            'timeouts',
+            'avg_wait_ms',
+        ):
+            assert key in response.json
+
+
+class TestMetricsRoute:
+    def test_get_metrics(self, test_client):
+        test_client.get('/api/monitor/liveness')
+        test_client.get('/api/does-not-exist')
+
+        response = test_client.get('/api/monitor/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain')
+        body = response.get_data(as_text=True)
+        liveness = 'blueprint="monitor",endpoint="monitor.liveness"'
+        assert f'questrya_http_request_duration_seconds_bucket{{{liveness}' in body
+        assert (
+            f'questrya_http_requests_total{{{liveness},method="GET",status="200"}}'
+            in body
+        )
+        assert 'endpoint="unmatched",method="GET",status="404"' in body
+        # the /metrics request itself
+        assert 'questrya_http_requests_in_flight{blueprint="monitor"} 1.0' in body
+
+
+class TestReadinessRoute:
+    def test_ready_with_dependencies_latency(self, test_client):
+        response = test_client.get('/api/monitor/readiness')
+
+        assert response.status_code == 200
+        assert response.json['ready'] == 'OK'
+        assert response.json['dependencies']['database']['ready'] is True
+        assert response.json['dependencies']['database']['latency_ms'] >= 0
+
+    @patch('questrya.monitor.routes.monitor_service.get_readiness')
+    def test_not_ready_when_a_dependency_fails(self, mock_get_readiness, test_client):
+        mock_get_readiness.return_value = {
+            'ready': False,
+            'checked_at': '2025-01-01T00:00:00',
+            'dependencies': {
+                'database': {
+                    'ready': False,
+                    'latency_ms': 1000.0,
+                    'error': 'timed out after 1.0s',
+                }
+            },
+        }
+
+        response = test_client.get('/api/monitor/readiness')
+
+        assert response.status_code == 503
+        assert response.json['ready'] == 'FAIL'
+        assert (
+            response.json['dependencies']['database']['error'] == 'timed out after 1.0s'
+        )
+
+
+class TestProfileRoute:
+    ADMIN_UUID = '12345678-1234-5678-1234-567812345678'
+
+    def get_headers(self, identity: str) -> dict:
+        return {'Authorization': f'Bearer {create_access_token(identity=identity)}'}
+
+    @patch('questrya.auth.decorators.settings.ADMIN_USER_UUIDS', [ADMIN_UUID])
+    @patch('questrya.monitor.routes.monitor_service.profile_worker')
+    def test_profile_worker(self, mock_profile_worker, test_client):
+        mock_profile_worker.return_value = {
+            'pid': 1,
+            'seconds': 5.0,
+            'interval_ms': 10.0,
+            'path': '/dev/shm/profile',
+        }
+
+        response = test_client.post(
+            '/api/monitor/profile',
+            json={'seconds': 5},
+            headers=self.get_headers(self.ADMIN_UUID),
+        )
+
+        assert response.status_code == 202
+        assert response.json['path'] == '/dev/shm/profile'
+        mock_profile_worker.assert_called_once_with(seconds=5.0)
+
+    @patch('questrya.auth.decorators.settings.ADMIN_USER_UUIDS', [ADMIN_UUID])
+    def test_invalid_duration(self, test_client):
+        response = test_client.post(
+            '/api/monitor/profile',
+            json={'seconds': 0},
+            headers=self.get_headers(self.ADMIN_UUID),
+        )
+        assert response.status_code == 400
+
+    @patch('questrya.auth.decorators.settings.ADMIN_USER_UUIDS', [ADMIN_UUID])
+    def test_admin_only(self, test_client):
+        response = test_client.post(
+            '/api/monitor/profile', headers=self.get_headers('not-an-admin')
+        )
+        assert response.status_code == 403
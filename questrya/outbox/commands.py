@@ -0,0 +1,55 @@
+"""
+LAYER: commands
+ROLE: CLI commands ("flask outbox ...")
+CAN communicate with: Services
+MUST NOT communicate with: Domain, Repositories, ORM models
+"""
+
+import signal
+import threading
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from questrya import settings
+from questrya.outbox.service import OutboxService
+
+outbox_cli = AppGroup('outbox', help='Transactional outbox of the celery tasks.')
+
+
+@outbox_cli.command('relay')
+@click.option(
+    '--batch-size',
+    default=settings.OUTBOX_RELAY_BATCH_SIZE,
+    show_default=True,
+    help='Tasks per transaction.',
+)
+@click.option(
+    '--poll-interval',
+    default=settings.OUTBOX_RELAY_POLL_INTERVAL,
+    show_default=True,
+    help='Seconds between polls.',
+)
+@click.option('--once', is_flag=True, help='Relay one batch and exit.')
+def relay_command(batch_size: int, poll_interval: float, once: bool):
+    """Publish the pending tasks of the outbox to the broker."""
+    celery = current_app.extensions['celery']
+    # a task is deleted from the outbox only once the broker has confirmed it
+    celery.conf.broker_transport_options = {
+        **celery.conf.broker_transport_options,
+        'confirm_publish': True,
+    }
+    service = OutboxService(celery=celery)
+    if once:
+        relayed = service.relay_batch(batch_size=batch_size)
+        click.echo(f'Relayed {relayed} tasks from the outbox')
+        return
+
+    stop = threading.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *args: stop.set())
+    click.echo(
+        f'Relaying the outbox (batches of {batch_size}, polling every {poll_interval}s)'
+    )
+    service.relay(batch_size=batch_size, poll_interval=poll_interval, stop=stop)
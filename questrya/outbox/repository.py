@@ -0,0 +1,92 @@
+"""
+LAYER: repository
+ROLE: orchestrate persistance of the outbox messages with SQLAlchemy
+CAN communicate with: ORM models
+MUST NOT communicate with: Services, Routes
+
+The outbox holds the tasks to publish to the broker, written on the same transaction
+as the change that triggers them (see questrya/outbox/service.py).
+"""
+
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, insert, select
+
+from questrya.common.timing import timed
+from questrya.extensions import db, task_messages
+from questrya.sql_db.models import OutboxMessageSQLModel
+
+OUTBOX_TABLE = OutboxMessageSQLModel.__table__
+OUTBOX_INSERT_STATEMENT = insert(OUTBOX_TABLE)
+
+
+class OutboxRepository:
+    @staticmethod
+    @timed('repository')
+    def add(task_name: str, args: tuple = (), kwargs: dict | None = None) -> UUID:
+        """
+        Executes the INSERT on db.session, WITHOUT committing: the next commit (e.g.
+        the one of UserRepository.save) commits the message together with the change,
+        and a rollback discards both.
+
+        Returns the task id the task will be published with.
+        """
+        task_id = uuid4()
+        db.session.execute(
+            OUTBOX_INSERT_STATEMENT,
+            {
+                'task_id': task_id,
+                'task_name': task_name,
+                'payload': task_messages.pack([list(args), kwargs or {}]),
+            },
+        )
+        return task_id
+
+    @staticmethod
+    @timed('repository')
+    def claim_pending(limit: int) -> list[dict]:
+        """
+        Locks (FOR UPDATE SKIP LOCKED) and returns up to limit of the oldest messages,
+        as {'id', 'task_id', 'task_name', 'args', 'kwargs'}. The ones locked by another
+        relay are skipped, so several relays never publish the same message at the same
+        time. The lock is held until the transaction ends: delete() them once
+        published, or release() them.
+        """
+        db_rows = db.session.execute(
+            select(OUTBOX_TABLE)
+            .order_by(OUTBOX_TABLE.c.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        messages = []
+        for db_row in db_rows:
+            args, kwargs = task_messages.loads(db_row.payload)
+            messages.append(
+                {
+                    'id': db_row.id,
+                    'task_id': db_row.task_id,
+                    'task_name': db_row.task_name,
+                    'args': args,
+                    'kwargs': kwargs,
+                }
+            )
+        return messages
+
+    @staticmethod
+    @timed('repository')
+    def delete(ids: list[int]):
+        """Deletes the published messages and commits, which releases their locks."""
+        db.session.execute(delete(OUTBOX_TABLE).where(OUTBOX_TABLE.c.id.in_(ids)))
+        db.session.commit()
+
+    @staticmethod
+    def release():
+        """Releases the claimed messages (rollback), to be claimed again."""
+        db.session.rollback()
+
+    @staticmethod
+    @timed('repository')
+    def count() -> int:
+        return db.session.execute(
+            select(db.func.count()).select_from(OUTBOX_TABLE)
+        ).scalar_one()
@@ -0,0 +1,87 @@
+"""
+LAYER: services
+ROLE: orchestrates business operations by coordinating domain logic with repositories
+CAN communicate with: Repositories, Domain
+MUST NOT communicate with: ORM models, Routes
+
+Transactional outbox: instead of publishing a task to the broker on the request (which
+blocks it on the broker, and loses the task when the publish fails after the commit),
+enqueue() writes it on the outbox table, on the same transaction as the change:
+
+    task_id = OutboxService().enqueue('questrya.tasks.compute', args=(1, now))
+    user = UserRepository.save(user=user)  # commits the user and the task together
+
+The relay ("flask outbox relay", see questrya/outbox/commands.py) publishes the
+pending tasks in batches, routed by settings.TASKS_QUEUES as any other task, and
+deletes them once published. A task is published at least once: when the relay dies
+between the publish and the commit, the task is published again (with the same task
+id) by the next relay.
+"""
+
+import logging
+import threading
+from uuid import UUID
+
+from questrya.common.timing import timed
+from questrya.outbox.repository import OutboxRepository
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxService:
+    def __init__(self, celery=None):
+        """celery: the app to publish with, only needed by the relay."""
+        self.outbox_repository = OutboxRepository()
+        self.celery = celery
+
+    @timed('service')
+    def enqueue(
+        self, task_name: str, args: tuple = (), kwargs: dict | None = None
+    ) -> UUID:
+        """Adds the task to the current transaction, returns its task id."""
+        return self.outbox_repository.add(task_name=task_name, args=args, kwargs=kwargs)
+
+    def relay_batch(self, batch_size: int) -> int:
+        """
+        Publishes up to batch_size pending tasks, on one broker connection, and returns
+        how many.
+        """
+        messages = self.outbox_repository.claim_pending(limit=batch_size)
+        if not messages:
+            self.outbox_repository.release()
+            return 0
+
+        try:
+            with self.celery.producer_or_acquire() as producer:
+                for message in messages:
+                    self.celery.send_task(
+                        message['task_name'],
+                        args=message['args'],
+                        kwargs=message['kwargs'],
+                        task_id=str(message['task_id']),
+                        producer=producer,
+                    )
+        except Exception:
+            # All of them are published again, some maybe twice.
+            self.outbox_repository.release()
+            raise
+        self.outbox_repository.delete(ids=[message['id'] for message in messages])
+        return len(messages)
+
+    def relay(self, batch_size: int, poll_interval: float, stop: threading.Event):
+        """
+        Relays until stop is set: at once while there is a backlog, every poll_interval
+        otherwise.
+        """
+        while not stop.is_set():
+            try:
+                relayed = self.relay_batch(batch_size=batch_size)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception(
+                    'Could not relay the outbox, retrying in %.1fs', poll_interval
+                )
+                relayed = 0
+            if relayed:
+                logger.info('Relayed %d tasks from the outbox', relayed)
+            if relayed < batch_size:
+                stop.wait(poll_interval)
@@ -0,0 +1,160 @@
+import threading
+from unittest import mock
+from uuid import UUID
+
+import pytest
+from celery import Celery
+from kombu import Queue
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from questrya import settings
+from questrya.common.exceptions import DuplicateRecordException
+from questrya.extensions import db
+from questrya.outbox.repository import OutboxRepository
+from questrya.outbox.service import OutboxService
+from questrya.users.domain import User
+from questrya.users.repository import UserRepository
+
+
+@pytest.fixture
+def memory_celery():
+    celery = Celery('outbox-tests', broker='memory://')
+    celery.conf.update(task_routes=settings.TASKS_QUEUES, task_serializer='json')
+    return celery
+
+
+def get_published(celery, queue_name: str) -> list:
+    messages = []
+    with celery.connection_for_read() as connection:
+        queue = Queue(queue_name)(connection.channel())
+        while (message := queue.get(no_ack=True)) is not None:
+            messages.append(message)
+    return messages
+
+
+class TestOutboxService:
+    def test_enqueued_task_is_committed_with_the_change(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN
+        service = OutboxService()
+
+        # WHEN
+        task_id = service.enqueue('questrya.tasks.compute', args=(2, '2025-01-01'))
+        UserRepository.save(user=User(**domain_user_data_picard))
+        db.session.rollback()  # nothing left uncommitted: both were committed by save()
+
+        # THEN
+        assert isinstance(task_id, UUID)
+        assert OutboxRepository.count() == 1
+
+    def test_enqueued_task_is_discarded_with_the_change(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN
+        UserRepository.create(user=User(**domain_user_data_picard))
+        service = OutboxService()
+
+        # WHEN
+        service.enqueue('questrya.tasks.compute', args=(2, '2025-01-01'))
+        with pytest.raises(DuplicateRecordException):
+            UserRepository.create(user=User(**domain_user_data_picard))
+
+        # THEN
+        assert OutboxRepository.count() == 0
+
+    def test_relay_publishes_to_the_task_queues(self, db_session, memory_celery):
+        # GIVEN
+        service = OutboxService(celery=memory_celery)
+        compute_id = service.enqueue('questrya.tasks.compute', args=(2, '2025-01-01'))
+        random_string_id = service.enqueue('questrya.tasks.generate_random_string')
+        db.session.commit()
+
+        # WHEN
+        relayed = service.relay_batch(batch_size=10)
+
+        # THEN
+        assert relayed == 2
+        assert OutboxRepository.count() == 0
+        (compute,) = get_published(memory_celery, 'compute')
+        assert compute.headers['id'] == str(compute_id)
+        assert compute.decode()[0] == [2, '2025-01-01']
+        (random_string,) = get_published(memory_celery, 'generate_random_string')
+        assert random_string.headers['id'] == str(random_string_id)
+
+    def test_relay_publishes_in_batches(self, db_session, memory_celery):
+        # GIVEN
+        service = OutboxService(celery=memory_celery)
+        for number in range(5):
+            service.enqueue('questrya.tasks.compute', args=(number, '2025-01-01'))
+        db.session.commit()
+
+        # WHEN
+        relayed = [service.relay_batch(batch_size=2) for _ in range(4)]
+
+        # THEN
+        assert relayed == [2, 2, 1, 0]
+        published = get_published(memory_celery, 'compute')
+        assert [message.decode()[0][0] for message in published] == [0, 1, 2, 3, 4]
+
+    def test_relay_keeps_the_tasks_it_could_not_publish(
+        self, db_session, memory_celery
+    ):
+        # GIVEN
+        service = OutboxService(celery=memory_celery)
+        service.enqueue('questrya.tasks.compute', args=(2, '2025-01-01'))
+        db.session.commit()
+
+        # WHEN
+        with (
+            mock.patch.object(
+                memory_celery,
+                'send_task',
+                side_effect=ConnectionError('broker is down'),
+            ),
+            pytest.raises(ConnectionError),
+        ):
+            service.relay_batch(batch_size=10)
+
+        # THEN
+        assert OutboxRepository.count() == 1
+
+
+class TestOutboxRepository:
+    def test_concurrent_relays_claim_different_tasks(self, app, monkeypatch):
+        # GIVEN: sessions of their own (one per thread), outside of the rolled back
+        # test transaction
+        db.create_all()
+        monkeypatch.setattr(db, 'session', scoped_session(sessionmaker(bind=db.engine)))
+        task_ids = {
+            OutboxRepository.add('questrya.tasks.compute', args=(number, 'now'))
+            for number in range(4)
+        }
+        db.session.commit()
+
+        try:
+            # WHEN
+            claimed_first = OutboxRepository.claim_pending(limit=2)
+            claimed_second = []
+
+            def claim_on_another_relay():
+                claimed_second.extend(OutboxRepository.claim_pending(limit=4))
+                OutboxRepository.release()
+                db.session.remove()
+
+            thread = threading.Thread(target=claim_on_another_relay)
+            thread.start()
+            thread.join()
+
+            # THEN
+            assert len(claimed_first) == 2
+            assert len(claimed_second) == 2
+            assert {
+                message['task_id'] for message in claimed_first + claimed_second
+            } == task_ids
+        finally:
+            OutboxRepository.release()
+            OutboxRepository.delete(
+                ids=[message['id'] for message in claimed_first + claimed_second]
+            )
+            db.session.remove()
@@ -1,7 +1,7 @@
 import logging
 import logging.config
 
-from decouple import config
+from decouple import Csv, config
 
 from questrya.common.utils import get_app_version
 
@@ -12,9 +12,7 @@ LOG_LEVEL = config('LOG_LEVEL', default='INFO', cast=str)
 LOG_VARS = config('LOG_VARS', cast=str).replace("'", '').replace('"', '')
 JSON_LOGS = config('JSON_LOGS', default=False, cast=bool)
 if JSON_LOGS:
-    log_format = ' '.join(
-        ['%({0:s})'.format(variable) for variable in LOG_VARS.split()]
-    )
+    log_format = ' '.join([f'%({variable:s})' for variable in LOG_VARS.split()])
 else:
     log_format = ''
     for index, variable in enumerate(LOG_VARS.split()):
@@ -57,6 +55,17 @@ logging.config.dictConfig(LOGGING)
 
 VERSION = get_app_version()
 
+# The Swagger UI and spec (/apidocs, flasgger). Off by default on production, where it
+# also saves the import of flasgger on every process start.
+API_DOCS_ENABLED = config('API_DOCS_ENABLED', default=IS_DEV_APP, cast=bool)
+
+# Prebuilt OpenAPI spec ("flask apispec build", see questrya/common/apispec.py), served
+# from memory on /apispec_1.json with a strong ETag and "Cache-Control: public,
+# max-age=API_SPEC_MAX_AGE", instead of flasgger parsing the route docstrings. Empty:
+# flasgger builds it (with API_DOCS_ENABLED).
+API_SPEC_FILE = config('API_SPEC_FILE', default='', cast=str)
+API_SPEC_MAX_AGE = config('API_SPEC_MAX_AGE', default=300, cast=int)
+
 SWAGGER_TEMPLATE = {
     'swagger': '2.0',
     'uiversion': 2,
@@ -86,6 +95,29 @@ DATABASE_URI = (
 )
 SQLALCHEMY_DATABASE_URI = DATABASE_URI
 
+# Connection pool of each process (gunicorn worker, celery worker...)
+DATABASE_POOL_SIZE = config('DATABASE_POOL_SIZE', default=5, cast=int)
+DATABASE_MAX_OVERFLOW = config('DATABASE_MAX_OVERFLOW', default=10, cast=int)
+DATABASE_POOL_TIMEOUT = config('DATABASE_POOL_TIMEOUT', default=30, cast=float)
+DATABASE_POOL_RECYCLE = config('DATABASE_POOL_RECYCLE', default=1800, cast=int)
+DATABASE_POOL_PRE_PING = config('DATABASE_POOL_PRE_PING', default=True, cast=bool)
+# How many connections the app may open on the database (keep it below postgres
+# "max_connections"). gunicorn warns on startup when workers x (pool size + overflow)
+# exceeds it.
+DATABASE_MAX_CONNECTIONS = config('DATABASE_MAX_CONNECTIONS', default=100, cast=int)
+
+# Comma-separated URIs of read replicas, used by the read-only repository queries
+DATABASE_REPLICA_URIS = config('DATABASE_REPLICA_URIS', default='', cast=Csv())
+# After a write, the client reads from the primary for this long (read-your-writes, kept
+# on a cookie)
+DATABASE_REPLICA_STICKY_SECONDS = config(
+    'DATABASE_REPLICA_STICKY_SECONDS', default=5.0, cast=float
+)
+# A replica that fails is skipped for this long
+DATABASE_REPLICA_RETRY_SECONDS = config(
+    'DATABASE_REPLICA_RETRY_SECONDS', default=30.0, cast=float
+)
+
 QUEUE_HOST = config('QUEUE_HOST', cast=str)
 QUEUE_PORT = config('QUEUE_PORT', cast=int, default=5672)
 QUEUE_USER = config('QUEUE_USER', cast=str)
@@ -96,4 +128,134 @@ TASKS_QUEUES = {
     'questrya.tasks.generate_random_string': {'queue': 'generate_random_string'},
 }
 
+# Task messages (see questrya/common/task_messages.py). The serializer is
+# msgpack-questrya (msgpack with datetime, date, UUID and Decimal) or json, the workers
+# only accept TASK_ACCEPT_CONTENT (never pickle). A body over TASK_COMPRESSION_THRESHOLD
+# bytes is compressed (gzip, bzip2, lzma, or brotli/zstd if installed). A payload over
+# TASK_CLAIM_CHECK_THRESHOLD bytes is written to TASK_CLAIM_CHECK_DIR, which the web and
+# celery workers must share, and the message only carries its key. 0 (or no dir)
+# disables them.
+TASK_SERIALIZER = config('TASK_SERIALIZER', default='msgpack-questrya', cast=str)
+TASK_ACCEPT_CONTENT = config(
+    'TASK_ACCEPT_CONTENT', default='msgpack-questrya,json', cast=Csv()
+)
+TASK_COMPRESSION = config('TASK_COMPRESSION', default='gzip', cast=str)
+TASK_COMPRESSION_THRESHOLD = config(
+    'TASK_COMPRESSION_THRESHOLD', default=2048, cast=int
+)
+TASK_CLAIM_CHECK_DIR = config('TASK_CLAIM_CHECK_DIR', default='', cast=str)
+TASK_CLAIM_CHECK_THRESHOLD = config(
+    'TASK_CLAIM_CHECK_THRESHOLD', default=262144, cast=int
+)
+TASK_CLAIM_CHECK_TTL = config('TASK_CLAIM_CHECK_TTL', default=86400.0, cast=float)
+
+# How many messages each celery worker process holds unacked (celery's
+# worker_prefetch_multiplier). The batch tasks (questrya/common/task_batches.py) keep
+# their messages unacked until their batch runs: with concurrency x
+# WORKER_PREFETCH_MULTIPLIER under their flush_every, they only flush on their
+# flush_interval.
+WORKER_PREFETCH_MULTIPLIER = config('WORKER_PREFETCH_MULTIPLIER', default=4, cast=int)
+
+# Transactional outbox (see questrya/outbox): "flask outbox relay" publishes up to
+# OUTBOX_RELAY_BATCH_SIZE pending tasks per transaction, and polls the table every
+# OUTBOX_RELAY_POLL_INTERVAL seconds while there are none.
+OUTBOX_RELAY_BATCH_SIZE = config('OUTBOX_RELAY_BATCH_SIZE', default=100, cast=int)
+OUTBOX_RELAY_POLL_INTERVAL = config(
+    'OUTBOX_RELAY_POLL_INTERVAL', default=1.0, cast=float
+)
+
+# The readiness probe reads the result of the dependency checks (database, broker),
+# refreshed on the background every READINESS_REFRESH_INTERVAL seconds, each round under
+# READINESS_TIMEOUT seconds overall. A result older than READINESS_MAX_AGE is refreshed
+# by the probe itself.
+READINESS_TIMEOUT = config('READINESS_TIMEOUT', default=1.0, cast=float)
+READINESS_REFRESH_INTERVAL = config(
+    'READINESS_REFRESH_INTERVAL', default=5.0, cast=float
+)
+READINESS_MAX_AGE = config('READINESS_MAX_AGE', default=15.0, cast=float)
+
+# SQL statements accounting (see questrya/sql_db/accounting.py): statements slower than
+# SQL_SLOW_QUERY_MS are logged, and so is a statement that runs more than
+# SQL_N_PLUS_ONE_THRESHOLD times on the same request (a possible N+1). 0 disables each
+# of them.
+SQL_SLOW_QUERY_MS = config('SQL_SLOW_QUERY_MS', default=500.0, cast=float)
+SQL_N_PLUS_ONE_THRESHOLD = config('SQL_N_PLUS_ONE_THRESHOLD', default=10, cast=int)
+# Whether those logs have the values of the parameters (e.g. emails and password
+# hashes), for debugging. Off, they have the names of the parameters only.
+SQL_LOG_PARAMETERS = config('SQL_LOG_PARAMETERS', default=False, cast=bool)
+
+# Fraction (0.0 to 1.0) of the requests that get the time spent on each layer (route,
+# service, repository, sql, bcrypt, validation) on the Server-Timing header and on a
+# "questrya.timing" log line (see questrya/common/timing.py). 0 disables it.
+SERVER_TIMING_SAMPLE_RATE = config('SERVER_TIMING_SAMPLE_RATE', default=0.0, cast=float)
+
+# Sampling profiler (see questrya/common/profiling.py). The collapsed stacks files go to
+# PROFILER_OUTPUT_DIR. A request with the "X-Profile-Token: <PROFILER_REQUEST_TOKEN>"
+# header is profiled on its own (an empty token disables it). SIGUSR2 on a worker
+# profiles it for PROFILER_SIGNAL_SECONDS.
+PROFILER_OUTPUT_DIR = config('PROFILER_OUTPUT_DIR', default='/dev/shm', cast=str)
+PROFILER_INTERVAL_MS = config('PROFILER_INTERVAL_MS', default=10.0, cast=float)
+PROFILER_MAX_SECONDS = config('PROFILER_MAX_SECONDS', default=60.0, cast=float)
+PROFILER_SIGNAL_SECONDS = config('PROFILER_SIGNAL_SECONDS', default=30.0, cast=float)
+PROFILER_REQUEST_TOKEN = config('PROFILER_REQUEST_TOKEN', default='', cast=str)
+
+# Memory watchdog of the gunicorn workers (see questrya/common/watchdog.py): every
+# WORKER_MEMORY_CHECK_SECONDS, a worker whose RSS is over WORKER_MAX_RSS_MB is retired
+# gracefully (it finishes its requests) and replaced. 0 disables it.
+WORKER_MAX_RSS_MB = config('WORKER_MAX_RSS_MB', default=256.0, cast=float)
+WORKER_MEMORY_CHECK_SECONDS = config(
+    'WORKER_MEMORY_CHECK_SECONDS', default=10.0, cast=float
+)
+
+# Directory (e.g. under /dev/shm) where each gunicorn worker writes its Prometheus
+# metrics, aggregated by /api/monitor/metrics (see questrya/common/metrics.py). Empty:
+# per process only.
+PROMETHEUS_MULTIPROC_DIR = config('PROMETHEUS_MULTIPROC_DIR', default='', cast=str)
+# Port where the celery worker serves its Prometheus metrics (it has no
+# /api/monitor/metrics). Its prefork children are aggregated through a
+# PROMETHEUS_MULTIPROC_DIR of its own. 0 disables it.
+WORKER_METRICS_PORT = config('WORKER_METRICS_PORT', default=0, cast=int)
+
 JWT_SECRET_KEY = config('JWT_SECRET_KEY', cast=str)
+# Comma-separated uuids of the users allowed on the admin endpoints
+ADMIN_USER_UUIDS = config('ADMIN_USER_UUIDS', default='', cast=Csv())
+# Opt-in cache of already verified JWTs, so a token seen before skips the signature
+# check until it expires (see questrya/common/jwt_cache.py). 0 disables it.
+JWT_VERIFIED_TOKEN_CACHE_MAXSIZE = config(
+    'JWT_VERIFIED_TOKEN_CACHE_MAXSIZE', default=0, cast=int
+)
+JWT_VERIFIED_TOKEN_CACHE_TTL = config(
+    'JWT_VERIFIED_TOKEN_CACHE_TTL', default=300.0, cast=float
+)
+
+# bcrypt runs on a dedicated process pool, sized independently
+# from the gunicorn threads (see questrya/common/password_hashing.py).
+# With 0 workers, hashing runs inline on the request thread.
+PASSWORD_HASHER_WORKERS = config('PASSWORD_HASHER_WORKERS', default=2, cast=int)
+# How many hashing requests may wait for a free worker before new ones get a 503.
+PASSWORD_HASHER_QUEUE_SIZE = config('PASSWORD_HASHER_QUEUE_SIZE', default=32, cast=int)
+PASSWORD_HASHER_ROUNDS = config('PASSWORD_HASHER_ROUNDS', default=12, cast=int)
+PASSWORD_HASHER_TIMEOUT = config('PASSWORD_HASHER_TIMEOUT', default=10.0, cast=float)
+
+# Read-through cache in front of the UserRepository lookups (see
+# questrya/common/cache.py). Each worker invalidates its own copy on save(), but the
+# other workers only see a change (e.g. a new email) once their entry expires, so keep
+# the TTL short. The credentials check of the login does not use it. A shared tier
+# (redis URL, needs the optional "redis" package) is invalidated for every worker.
+# USER_CACHE_MAXSIZE=0 disables the cache.
+USER_CACHE_MAXSIZE = config('USER_CACHE_MAXSIZE', default=10000, cast=int)
+USER_CACHE_TTL = config('USER_CACHE_TTL', default=10.0, cast=float)
+USER_CACHE_SHARED_URL = config('USER_CACHE_SHARED_URL', default='', cast=str)
+
+# Idempotency keys (see questrya/idempotency): the outcome of a request with an
+# "Idempotency-Key" header, or of a deduplicated task, is kept for IDEMPOTENCY_TTL
+# seconds, and replayed to the retries. A request / task still running holds its key for
+# IDEMPOTENCY_LEASE_SECONDS at most (after a crash, a retry runs again after it). The
+# completed ones are cached on each worker (IDEMPOTENCY_CACHE_MAXSIZE entries for
+# IDEMPOTENCY_CACHE_TTL seconds, 0 disables it).
+IDEMPOTENCY_TTL = config('IDEMPOTENCY_TTL', default=86400.0, cast=float)
+IDEMPOTENCY_LEASE_SECONDS = config(
+    'IDEMPOTENCY_LEASE_SECONDS', default=60.0, cast=float
+)
+IDEMPOTENCY_CACHE_MAXSIZE = config('IDEMPOTENCY_CACHE_MAXSIZE', default=10000, cast=int)
+IDEMPOTENCY_CACHE_TTL = config('IDEMPOTENCY_CACHE_TTL', default=300.0, cast=float)
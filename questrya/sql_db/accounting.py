@@ -0,0 +1,212 @@
+"""
+Per-request accounting of the SQL statements, from SQLAlchemy engine events.
+
+For every request, it counts the statements and the time spent on them, logs
+the statements slower than SQL_SLOW_QUERY_MS and flags N+1 patterns: the same
+statement shape (the SQL with placeholders) executed more than
+SQL_N_PLUS_ONE_THRESHOLD times in the same request.
+
+The logged statements are their shape and the names of their parameters, not
+the values (e.g. the password hashes and emails of the users upserts): with
+SQL_LOG_PARAMETERS (for debugging) they are rendered with get_query_raw_sql,
+with MAX_LOGGED_PARAMETER_SETS of an executemany at most. Either way a logged
+statement is cut at MAX_LOGGED_STATEMENT_LENGTH characters.
+
+The totals of each request feed the Prometheus metrics (see
+questrya/common/metrics.py), and capture() counts the statements of a block
+of code, e.g. to cap the queries of a route on a test (assert_max_queries).
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from questrya.common.utils import get_query_raw_sql
+
+logger = logging.getLogger(__name__)
+
+_request_queries = ContextVar('request_queries', default=None)
+_captures = []  # the QueryLogs of the active capture() blocks
+
+MAX_LOGGED_PARAMETER_SETS = 3
+MAX_LOGGED_STATEMENT_LENGTH = 2000
+BATCH_PARAMETER_SUFFIX = re.compile(r'__\d+$')
+
+
+class QueryLog:
+    """The statements of a request (or of a capture() block)."""
+
+    __slots__ = ('count', 'n_plus_one', 'seconds', 'shapes', 'slow')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()  # statement (with placeholders) -> executions
+        self.slow = 0
+        self.n_plus_one = []  # statements that crossed the N+1 threshold
+
+    def add(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement] += 1
+
+
+class QueryAccounting:
+    def __init__(
+        self,
+        slow_query_ms: float = 500.0,
+        n_plus_one_threshold: int = 10,
+        log_parameters: bool = False,
+    ):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.log_parameters = log_parameters
+        self.metrics = None
+
+    def init_app(self, app, metrics=None):
+        """metrics: a RequestMetrics, to publish the totals of each request."""
+        self.slow_query_ms = app.config['SQL_SLOW_QUERY_MS']
+        self.n_plus_one_threshold = app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        self.log_parameters = app.config['SQL_LOG_PARAMETERS']
+        self.metrics = metrics
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        # On the Engine class, so that the replicas engines are accounted too.
+        if not event.contains(
+            Engine, 'after_cursor_execute', self.after_cursor_execute
+        ):
+            event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+
+    def before_request(self):
+        _request_queries.set(QueryLog())
+
+    def after_request(self, response):
+        queries = _request_queries.get()
+        if queries is not None and self.metrics is not None:
+            self.metrics.observe_queries(
+                statements=queries.count,
+                seconds=queries.seconds,
+                slow=queries.slow,
+                n_plus_one=len(queries.n_plus_one),
+            )
+        return response
+
+    def teardown_request(self, exception=None):
+        _request_queries.set(None)
+
+    @contextmanager
+    def capture(self):
+        """Counts the statements executed inside the block, on any request or thread."""
+        queries = QueryLog()
+        _captures.append(queries)
+        try:
+            yield queries
+        finally:
+            _captures.remove(queries)
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        if context is not None:
+            context.accounting_started_at = time.perf_counter()
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        started_at = getattr(context, 'accounting_started_at', None)
+        if started_at is None:
+            return
+        seconds = time.perf_counter() - started_at
+
+        for capture in _captures:
+            capture.add(statement, seconds)
+
+        queries = _request_queries.get()
+        if queries is None:
+            return
+        queries.add(statement, seconds)
+
+        if seconds * 1000 >= self.slow_query_ms > 0:
+            queries.slow += 1
+            logger.warning(
+                f'Slow query ({seconds * 1000:.1f}ms) '
+                f'on {request.method} {request.path}: '
+                f'{self.render(context, statement, parameters, executemany)}',
+                extra={'path': request.path, 'duration_ms': round(seconds * 1000, 3)},
+            )
+
+        if (
+            self.n_plus_one_threshold
+            and queries.shapes[statement] == self.n_plus_one_threshold + 1
+        ):
+            queries.n_plus_one.append(statement)
+            logger.warning(
+                f'Possible N+1 on {request.method} {request.path}: '
+                f'the same statement ran more than {self.n_plus_one_threshold} times: '
+                f'{self.render(context, statement, parameters, executemany)}',
+                extra={'path': request.path, 'statement': statement},
+            )
+
+    def render(self, context, statement: str, parameters, executemany: bool) -> str:
+        if self.log_parameters:
+            return truncate(
+                self.render_with_parameters(context, statement, parameters, executemany)
+            )
+        description = describe_parameters(parameters, executemany)
+        return (
+            f'{truncate(" ".join(statement.split()))} '
+            f'[params redacted: {truncate(description)}]'
+        )
+
+    @staticmethod
+    def render_with_parameters(
+        context, statement: str, parameters, executemany: bool
+    ) -> str:
+        more = ''
+        if (
+            executemany
+            and isinstance(parameters, (list, tuple))
+            and len(parameters) > MAX_LOGGED_PARAMETER_SETS
+        ):
+            more = (
+                f' (and {len(parameters) - MAX_LOGGED_PARAMETER_SETS} '
+                'more parameter sets)'
+            )
+            parameters = parameters[:MAX_LOGGED_PARAMETER_SETS]
+        invoked_statement = getattr(context, 'invoked_statement', None)
+        if invoked_statement is None:  # textual SQL
+            return f'{statement} [params: {parameters}]{more}'
+        return f'{get_query_raw_sql(invoked_statement, parameters=parameters)}{more}'
+
+
+def truncate(text: str) -> str:
+    if len(text) > MAX_LOGGED_STATEMENT_LENGTH:
+        return f'{text[:MAX_LOGGED_STATEMENT_LENGTH]}... ({len(text)} characters)'
+    return text
+
+
+def describe_parameters(parameters, executemany: bool) -> str:
+    """The names (or the count) of the parameters, without their values."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameters[0] if parameters else ()
+        return (
+            f'{len(parameters)} sets of {describe_parameters(first, executemany=False)}'
+        )
+    if isinstance(parameters, dict):
+        # the rows of a batched insert are numbered: uuid__0, uuid__1, ...
+        names = list(
+            dict.fromkeys(BATCH_PARAMETER_SUFFIX.sub('', name) for name in parameters)
+        )
+        if len(names) < len(parameters):
+            return f'{len(parameters) // len(names)} rows of {", ".join(names)}'
+        return ', '.join(names) or 'none'
+    return f'{len(parameters or ())} values'
@@ -7,11 +7,13 @@ MUST NOT communicate with: Domain, Repositories, Services, Routes
 This must contain ONLY ORM (thin) models
 """
 
-from questrya.extensions import db
-from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 from uuid import uuid4
 
+from sqlalchemy.dialects.postgresql import UUID
+
+from questrya.extensions import db
+
 
 class UserSQLModel(db.Model):
     __tablename__ = 'users'
@@ -28,3 +30,35 @@ class UserSQLModel(db.Model):
     #       The alternative would be to use back_populates to make this explicit on both models
     #       (so I would need to declare the relationship on both models)
     # dependant_instances = db.relationship("DependantModel", backref="user", lazy=True)
+
+
+class OutboxMessageSQLModel(db.Model):
+    """
+    Tasks to publish to the broker, written in the same transaction as the change that
+    triggers them.
+    """
+
+    __tablename__ = 'outbox_messages'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    task_id = db.Column(UUID(as_uuid=True), default=uuid4, nullable=False)
+    task_name = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)  # msgpack of (args, kwargs)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class IdempotencyKeySQLModel(db.Model):
+    """
+    The outcome of a request / task per idempotency key, kept until expires_at.
+    A row without status_code is still running (and expires_at is its lease).
+    """
+
+    __tablename__ = 'idempotency_keys'
+
+    key = db.Column(
+        db.LargeBinary(16), primary_key=True
+    )  # digest of the scope and the key
+    fingerprint = db.Column(db.LargeBinary(16), nullable=False)  # digest of the request
+    status_code = db.Column(db.SmallInteger, nullable=True)
+    response = db.Column(db.LargeBinary, nullable=True)  # msgpack of (body, mimetype)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
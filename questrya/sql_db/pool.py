@@ -0,0 +1,97 @@
+"""
+SQLAlchemy connection pool configuration and statistics.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from questrya import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that also measures how long each checkout waits for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait_seconds += elapsed
+                self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                'pid': os.getpid(),
+                'pool_size': self.size(),
+                'max_overflow': self._max_overflow,
+                'checked_in': self.checkedin(),
+                'checked_out': self.checkedout(),
+                'overflow': self.overflow(),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': (self.total_wait_seconds / self.checkouts * 1000)
+                if self.checkouts
+                else 0.0,
+                'max_wait_ms': self.max_wait_seconds * 1000,
+            }
+
+
+def get_engine_options() -> dict:
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': settings.DATABASE_POOL_SIZE,
+        'max_overflow': settings.DATABASE_MAX_OVERFLOW,
+        'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+    }
+
+
+def check_connection_budget(workers: int, threads: int) -> list:
+    """
+    Returns warnings when the pools of all the workers can open more connections
+    than the DATABASE_MAX_CONNECTIONS budget, or when a worker has more threads
+    than connections (so its threads will queue for one).
+    """
+    warnings = []
+    connections_per_worker = (
+        settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW
+    )
+    total_connections = workers * connections_per_worker
+    if total_connections > settings.DATABASE_MAX_CONNECTIONS:
+        warnings.append(
+            f'{workers} workers x {connections_per_worker} connections per worker '
+            f'(DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW) = {total_connections}, '
+            'above the DATABASE_MAX_CONNECTIONS budget of '
+            f'{settings.DATABASE_MAX_CONNECTIONS}.'
+        )
+    if threads > connections_per_worker:
+        warnings.append(
+            f'Each worker has {threads} threads but at most {connections_per_worker} '
+            'database connections, so threads may wait up to '
+            f'DATABASE_POOL_TIMEOUT={settings.DATABASE_POOL_TIMEOUT}s for one.'
+        )
+    return warnings
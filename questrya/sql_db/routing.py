@@ -0,0 +1,143 @@
+"""
+Routes the read-only repository queries to the read replicas.
+
+- Each replica gets its own engine (and pool), and they are used round-robin.
+  They are not Flask-SQLAlchemy binds on purpose: the models, db.create_all()
+  and the migrations only know about the primary.
+- After a write (mark_write), the rest of the request (or task) and the next requests
+  of the same client, for DATABASE_REPLICA_STICKY_SECONDS, read from the primary, so a
+  client reads its own writes despite the replication lag. Across requests (and gunicorn
+  workers) this is kept on the client, in the STICKY_COOKIE cookie (when the request
+  wrote: until when to read from the primary). A client that does not keep cookies reads
+  its own writes only inside the request that made them.
+- read(primary=True) always reads from the primary: for the reads that feed a write
+  (e.g. read, update, then save the whole row), that must not be based on a stale row.
+- A replica that fails is skipped for a while, and the read falls back to the primary.
+"""
+
+import itertools
+import logging
+import math
+import threading
+import time
+
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'questrya_primary_until'
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.engines = {}
+        self.configure(engines={}, sticky_seconds=0, retry_seconds=0)
+
+    def init_app(self, app, db, replica_uris: list, engine_options: dict):
+        self.db = db
+        self.configure(
+            engines={
+                f'replica_{index}': create_engine(uri, **engine_options)
+                for index, uri in enumerate(replica_uris)
+            },
+            sticky_seconds=app.config['DATABASE_REPLICA_STICKY_SECONDS'],
+            retry_seconds=app.config['DATABASE_REPLICA_RETRY_SECONDS'],
+        )
+        app.after_request(self.set_sticky_cookie)
+
+    def configure(self, engines: dict, sticky_seconds: float, retry_seconds: float):
+        self.dispose()
+        self.engines = engines
+        self.bind_keys = list(engines)
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._round_robin = itertools.cycle(self.bind_keys)
+        self._lock = threading.Lock()
+        self._unavailable_until = {}
+
+    def dispose(self, close: bool = True):
+        """
+        close=False drops the pooled connections without closing them (see
+        reset_after_fork).
+        """
+        for engine in self.engines.values():
+            engine.dispose(close=close)
+
+    def mark_write(self):
+        """
+        The caller (this request or task, then the client through STICKY_COOKIE) reads
+        from the primary for a while.
+        """
+        if has_app_context():
+            g.primary_until = time.time() + self.sticky_seconds
+
+    def get_primary_until(self) -> float:
+        """Until when (a timestamp) the caller reads from the primary."""
+        if not has_app_context():
+            return 0.0
+        primary_until = g.get('primary_until')
+        if primary_until is not None:
+            return primary_until
+        if has_request_context():
+            try:
+                return float(request.cookies.get(STICKY_COOKIE, 0))
+            except ValueError:
+                return 0.0
+        return 0.0
+
+    def set_sticky_cookie(self, response):
+        """
+        after_request: the client that wrote reads from the primary on its next requests
+        too.
+        """
+        primary_until = g.get('primary_until')
+        if primary_until is not None and self.bind_keys:
+            response.set_cookie(
+                STICKY_COOKIE,
+                f'{primary_until:.3f}',
+                max_age=math.ceil(self.sticky_seconds),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def get_replica_bind_key(self) -> str:
+        """The next available replica, or None when the read must go to the primary."""
+        if not self.bind_keys or time.time() < self.get_primary_until():
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.bind_keys)):
+                bind_key = next(self._round_robin)
+                if self._unavailable_until.get(bind_key, 0) <= now:
+                    return bind_key
+        return None
+
+    def read(self, query, primary: bool = False) -> tuple:
+        """
+        Runs query(session) on a replica, or on the primary (the request db.session)
+        when primary=True, or there is no replica available, or it fails.
+
+        Returns (the result of query(), the bind key of the replica or None for the
+        primary): what was read from a replica may be stale, so it must not be cached.
+
+        The session is closed after the query, so query() must return plain values
+        (not ORM objects that still need to lazy load something).
+        """
+        bind_key = None if primary else self.get_replica_bind_key()
+        if bind_key:
+            try:
+                with Session(bind=self.engines[bind_key]) as session:
+                    return query(session), bind_key
+            except DBAPIError as e:
+                logger.warning(
+                    f'Read replica "{bind_key}" failed, reading from the primary: {e}'
+                )
+                with self._lock:
+                    self._unavailable_until[bind_key] = (
+                        time.monotonic() + self.retry_seconds
+                    )
+        return query(self.db.session), None
@@ -0,0 +1,183 @@
+import logging
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import literal, select
+
+from questrya.extensions import db, query_accounting
+from questrya.sql_db.accounting import MAX_LOGGED_STATEMENT_LENGTH
+from questrya.users.domain import User
+from questrya.users.repository import UserRepository
+
+
+@pytest.fixture
+def repeated_queries_route(app):
+    @app.route('/accounting-repeated-queries/<int:times>')
+    def repeated_queries(times):
+        for index in range(times):
+            db.session.execute(select(literal(index)))
+        return {'executed': times}
+
+    return '/accounting-repeated-queries'
+
+
+def get_sample(name: str) -> float:
+    labels = {'blueprint': '', 'endpoint': 'repeated_queries', 'method': 'GET'}
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestQueryAccounting:
+    def test_statements_feed_the_metrics(
+        self, test_client, db_session, repeated_queries_route
+    ):
+        requests_before = get_sample('questrya_db_statements_per_request_count')
+        statements_before = get_sample('questrya_db_statements_per_request_sum')
+
+        test_client.get(f'{repeated_queries_route}/3')
+
+        assert (
+            get_sample('questrya_db_statements_per_request_count')
+            == requests_before + 1
+        )
+        # plus the savepoint of the db_session fixture
+        assert (
+            get_sample('questrya_db_statements_per_request_sum')
+            == statements_before + 3 + 1
+        )
+        assert get_sample('questrya_db_time_per_request_seconds_sum') > 0
+
+    def test_n_plus_one_is_flagged_once(
+        self, test_client, db_session, repeated_queries_route, caplog
+    ):
+        n_plus_one_before = get_sample('questrya_db_n_plus_one_total')
+
+        with caplog.at_level(logging.WARNING, logger='questrya.sql_db.accounting'):
+            test_client.get(
+                f'{repeated_queries_route}/{query_accounting.n_plus_one_threshold + 5}'
+            )
+
+        warnings = [
+            record.getMessage()
+            for record in caplog.records
+            if 'Possible N+1' in record.getMessage()
+        ]
+        assert len(warnings) == 1
+        assert 'SELECT %(param_1)s AS anon_1 [params redacted: param_1]' in warnings[0]
+        assert get_sample('questrya_db_n_plus_one_total') == n_plus_one_before + 1
+
+    def test_under_the_threshold_is_not_flagged(
+        self, test_client, db_session, repeated_queries_route, caplog
+    ):
+        with caplog.at_level(logging.WARNING, logger='questrya.sql_db.accounting'):
+            test_client.get(
+                f'{repeated_queries_route}/{query_accounting.n_plus_one_threshold}'
+            )
+
+        assert not [
+            record for record in caplog.records if 'Possible N+1' in record.getMessage()
+        ]
+
+    def test_slow_queries_are_logged_rendered(
+        self, test_client, db_session, repeated_queries_route, caplog, monkeypatch
+    ):
+        monkeypatch.setattr(query_accounting, 'slow_query_ms', 0.000001)
+
+        with caplog.at_level(logging.WARNING, logger='questrya.sql_db.accounting'):
+            test_client.get(f'{repeated_queries_route}/1')
+
+        slow = [
+            record.getMessage()
+            for record in caplog.records
+            if record.getMessage().startswith('Slow query')
+        ]
+        slow = [
+            message for message in slow if 'SAVEPOINT' not in message
+        ]  # of the db_session fixture
+        assert len(slow) == 1
+        assert '[params redacted: param_1]' in slow[0]
+
+    def test_parameters_are_logged_when_enabled(
+        self, test_client, db_session, repeated_queries_route, caplog, monkeypatch
+    ):
+        monkeypatch.setattr(query_accounting, 'slow_query_ms', 0.000001)
+        monkeypatch.setattr(query_accounting, 'log_parameters', True)
+
+        with caplog.at_level(logging.WARNING, logger='questrya.sql_db.accounting'):
+            test_client.get(f'{repeated_queries_route}/1')
+
+        slow = [
+            record.getMessage()
+            for record in caplog.records
+            if record.getMessage().startswith('Slow query')
+        ]
+        assert "[params: {'param_1': 0}]" in next(
+            message for message in slow if 'SAVEPOINT' not in message
+        )
+
+    def test_users_upserts_are_logged_without_their_values(
+        self, app, db_session, caplog, monkeypatch
+    ):
+        monkeypatch.setattr(query_accounting, 'slow_query_ms', 0.000001)
+        users = [
+            User(
+                username=f'crew-{number}',
+                email=f'crew-{number}@enterprise.org',
+                password_hash='secret-hash',
+            )
+            for number in range(50)
+        ]
+
+        with (
+            caplog.at_level(logging.WARNING, logger='questrya.sql_db.accounting'),
+            app.test_request_context('/api/users/bulk', method='POST'),
+        ):
+            query_accounting.before_request()
+            UserRepository.save_many(users)
+
+        logged = [
+            record.getMessage()
+            for record in caplog.records
+            if 'INSERT INTO users' in record.getMessage()
+        ]
+        assert logged
+        assert not [
+            message
+            for message in logged
+            if 'secret-hash' in message or '@enterprise.org' in message
+        ]
+        assert all(len(message) < 2 * MAX_LOGGED_STATEMENT_LENGTH for message in logged)
+        assert '[params redacted: 50 rows of ' in logged[0]
+
+    def test_capture(self, db_session):
+        with query_accounting.capture() as queries:
+            db.session.execute(select(literal(1)))
+            db.session.execute(select(literal(2)))
+
+        assert [
+            count
+            for statement, count in queries.shapes.items()
+            if 'anon_1' in statement
+        ] == [2]
+        assert queries.count >= 2  # plus the savepoint of the db_session fixture
+
+
+class TestAssertMaxQueries:
+    def test_create_user_route(self, test_client, db_session, assert_max_queries):
+        with assert_max_queries(2):
+            response = test_client.post(
+                '/api/users/user',
+                json={
+                    'username': 'picard',
+                    'email': 'picard@enterprise.org',
+                    'password': '12345678',
+                },
+            )
+        assert response.status_code == 201
+
+    def test_fails_over_the_limit(self, db_session, assert_max_queries):
+        with (
+            pytest.raises(AssertionError, match='2 SQL statements executed'),
+            assert_max_queries(1),
+        ):
+            db.session.execute(select(literal(1)))
+            db.session.execute(select(literal(2)))
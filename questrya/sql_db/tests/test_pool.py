@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+from questrya.extensions import db, reset_after_fork
+from questrya.sql_db.pool import TimedQueuePool, check_connection_budget
+
+
+class TestTimedQueuePool:
+    def test_engine_uses_timed_pool(self, app):
+        assert isinstance(db.engine.pool, TimedQueuePool)
+
+    def test_checkouts_are_measured(self, app):
+        pool = db.engine.pool
+        checkouts = pool.stats()['checkouts']
+
+        with db.engine.connect() as connection:
+            assert pool.stats()['checked_out'] >= 1
+            connection.exec_driver_sql('SELECT 1')
+
+        stats = pool.stats()
+        assert stats['checkouts'] == checkouts + 1
+        assert stats['max_wait_ms'] > 0
+
+
+class TestResetAfterFork:
+    def test_engines_get_a_new_pool_without_closing_the_inherited_connections(
+        self, app
+    ):
+        pool = db.engine.pool
+        with db.engine.connect() as connection:
+            inherited = connection.connection.dbapi_connection
+        assert pool.checkedin() >= 1
+
+        reset_after_fork(app)
+
+        assert db.engine.pool is not pool
+        assert isinstance(db.engine.pool, TimedQueuePool)
+        assert db.engine.pool.checkedin() == 0
+        assert inherited.closed == 0  # still usable by the master
+        inherited.close()
+
+
+class TestCheckConnectionBudget:
+    @patch('questrya.sql_db.pool.settings')
+    def test_within_budget(self, mock_settings):
+        mock_settings.DATABASE_POOL_SIZE = 5
+        mock_settings.DATABASE_MAX_OVERFLOW = 5
+        mock_settings.DATABASE_MAX_CONNECTIONS = 100
+
+        assert check_connection_budget(workers=10, threads=10) == []
+
+    @patch('questrya.sql_db.pool.settings')
+    def test_above_budget(self, mock_settings):
+        mock_settings.DATABASE_POOL_SIZE = 5
+        mock_settings.DATABASE_MAX_OVERFLOW = 10
+        mock_settings.DATABASE_MAX_CONNECTIONS = 100
+        mock_settings.DATABASE_POOL_TIMEOUT = 30
+
+        warnings = check_connection_budget(workers=9, threads=18)
+
+        assert len(warnings) == 2
+        assert '9 workers x 15 connections per worker' in warnings[0]
+        assert 'Each worker has 18 threads' in warnings[1]
@@ -0,0 +1,137 @@
+from datetime import UTC, datetime
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.pool import NullPool
+
+from questrya.extensions import replica_router, user_cache
+from questrya.factory import create_app
+from questrya.sql_db.models import UserSQLModel
+from questrya.sql_db.routing import STICKY_COOKIE
+from questrya.users.domain import User
+from questrya.users.repository import UserRepository
+from questrya.users.service import UserService
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Overrides the "app" fixture (so db_session uses it too): the app with a SQLite file
+    as its read replica, holding a user that does not exist on the primary.
+    """
+    replica_uri = f'sqlite:///{tmp_path / "replica.db"}'
+    engine = create_engine(replica_uri, poolclass=NullPool)
+    UserSQLModel.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(UserSQLModel.__table__).values(
+                uuid=uuid4(),
+                username='data',
+                email='data@enterprise.org',
+                password_hash='hash',
+                created_at=datetime.now(UTC).replace(tzinfo=None),
+                last_updated_at=datetime.now(UTC).replace(tzinfo=None),
+            )
+        )
+
+    with patch('questrya.extensions.settings.DATABASE_REPLICA_URIS', [replica_uri]):
+        app = create_app()
+    with app.app_context():
+        yield app
+        replica_router.dispose()
+
+
+class TestReplicaRouter:
+    def test_reads_from_the_replica(self, db_session):
+        found_domain_user = UserRepository.get_by_username(username='data')
+
+        assert found_domain_user.email.address == 'data@enterprise.org'
+
+    def test_reads_from_the_primary_after_a_write(
+        self, db_session, domain_user_data_picard
+    ):
+        UserRepository.save(user=User(**domain_user_data_picard))
+
+        assert (
+            UserRepository.get_by_username(username='picard') is not None
+        )  # only on the primary
+        assert (
+            UserRepository.get_by_username(username='data') is None
+        )  # only on the replica
+
+    def test_falls_back_to_the_primary_when_the_replica_fails(
+        self, db_session, tmp_path
+    ):
+        replica_router.engines['replica_0'].dispose()
+        (tmp_path / 'replica.db').unlink()  # so the replica has no users table
+
+        assert (
+            UserRepository.get_by_username(username='data') is None
+        )  # read from the primary
+        assert (
+            replica_router.get_replica_bind_key() is None
+        )  # the replica is skipped for a while
+
+    def test_replica_reads_are_not_cached(self, db_session):
+        user_cache.clear()
+
+        found_domain_user = UserRepository.get_by_username(username='data')
+
+        assert user_cache.get(f'uuid:{found_domain_user.uuid}') is None
+
+    def test_reads_that_feed_a_write_go_to_the_primary(
+        self, db_session, domain_user_data_picard
+    ):
+        replica_user = UserRepository.get_by_username(username='data')
+        domain_user = UserRepository.create(user=User(**domain_user_data_picard))
+        # as on a new request: the write of this one is forgotten
+        replica_router.configure(
+            engines=replica_router.engines,
+            sticky_seconds=replica_router.sticky_seconds,
+            retry_seconds=0,
+        )
+
+        assert UserRepository.get_by_uuid(uuid=replica_user.uuid, primary=True) is None
+        assert (
+            UserRepository.get_many_by_usernames(
+                usernames=['picard', 'data'], primary=True
+            )[1]
+            is None
+        )
+        assert (
+            UserService()
+            .update_user(domain_user.uuid, email='picard@starfleet.org')
+            .username
+            == 'picard'
+        )
+
+    def test_the_client_that_wrote_reads_from_the_primary_on_its_next_requests(
+        self, app
+    ):
+        # app.app_context(): each request has an app context (and flask.g) of its own,
+        # as when it is served
+        with app.app_context(), app.test_request_context():
+            replica_router.mark_write()
+            response = replica_router.set_sticky_cookie(app.response_class())
+        cookie = response.headers['Set-Cookie']
+        primary_until = cookie.split(';')[0].split('=')[1]
+
+        with (
+            app.app_context(),
+            app.test_request_context(
+                headers={'Cookie': f'{STICKY_COOKIE}={primary_until}'}
+            ),
+        ):
+            assert replica_router.get_replica_bind_key() is None
+        with app.app_context(), app.test_request_context():  # another client
+            assert replica_router.get_replica_bind_key() == 'replica_0'
+        with (
+            app.app_context(),
+            app.test_request_context(),
+        ):  # a request that did not write sets no cookie
+            assert (
+                'Set-Cookie'
+                not in replica_router.set_sticky_cookie(app.response_class()).headers
+            )
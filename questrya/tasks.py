@@ -4,10 +4,13 @@ from random import SystemRandom, randint
 
 from celery import shared_task
 
+from questrya.idempotency.decorators import deduplicated
+
 logger = logging.getLogger(__name__)
 
 
 @shared_task()
+@deduplicated()  # a redelivered message does not run it again
 def compute(random_number: int, now_timestamp: str) -> None:
     logger.info(
         f'Received random_number={random_number}, now_timestamp={now_timestamp}....'
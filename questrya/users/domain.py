@@ -12,10 +12,22 @@ from uuid import UUID
 
 from questrya.common.exceptions import DomainException
 from questrya.common.value_objects.email import Email
-from questrya.extensions import bcrypt
+from questrya.extensions import password_hasher
 
 
 class User:
+    # No per-instance __dict__: less memory and faster attribute access when
+    # loading many users (bulk jobs, get_many). User is an entity, so it stays
+    # mutable (see update()) and keeps the default identity equality/hash.
+    __slots__ = (
+        'created_at',
+        'email',
+        'last_updated_at',
+        'password_hash',
+        'username',
+        'uuid',
+    )
+
     def __init__(
         self,
         username: str,
@@ -31,21 +43,50 @@ class User:
         self.email = email
 
         if not password and not password_hash:
-            raise DomainException(message='User must be instantiated with either password or password_hash.')
-        self.password_hash = self.hash_password(password=password) if password else password_hash
+            raise DomainException(
+                message='User must be instantiated with either password or password_hash.'
+            )
+        self.password_hash = (
+            self.hash_password(password=password) if password else password_hash
+        )
 
         self.created_at = created_at or datetime.utcnow()
         self.last_updated_at = last_updated_at or datetime.utcnow()
 
+    @classmethod
+    def from_trusted(
+        cls,
+        uuid: UUID,
+        username: str,
+        email: Email,
+        password_hash: str,
+        created_at: datetime,
+        last_updated_at: datetime,
+    ) -> 'User':
+        """
+        Builds a User from data that is already valid (e.g. loaded from the database),
+        skipping the checks and the defaults of __init__.
+        """
+        user = cls.__new__(cls)
+        user.uuid = uuid
+        user.username = username
+        user.email = email
+        user.password_hash = password_hash
+        user.created_at = created_at
+        user.last_updated_at = last_updated_at
+        return user
+
     def hash_password(self, password: str):
-        return bcrypt.generate_password_hash(password=password).decode('utf-8')
+        return password_hasher.hash(password=password)
 
     def check_password(self, password: str) -> bool:
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(pw_hash=self.password_hash, password=password)
 
     def update(self, email: Email = None, password: str = None):
         if not self.uuid:
-            raise DomainException(message='You cannot update a user object that does not have a uuid.')
+            raise DomainException(
+                message='You cannot update a user object that does not have a uuid.'
+            )
         if email:
             self.email = email
         if password:
@@ -6,13 +6,60 @@ MUST NOT communicate with: Services, Routes
 
 This must be a translation layer between the ORM and the pure domain objects
 """
+
+import csv
+import io
 from datetime import datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy import Row, column, or_, select, table
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 
+from questrya.common.exceptions import DuplicateRecordException
+from questrya.common.timing import timed
 from questrya.common.value_objects.email import Email
+from questrya.extensions import db, replica_router, user_cache
 from questrya.sql_db.models import UserSQLModel
-from questrya.extensions import db
 from questrya.users.domain import User
-from uuid import UUID
+
+USERS_TABLE = UserSQLModel.__table__
+
+
+def build_upsert_statement(statement):
+    """
+    Built only once (at import time): the statement is always the same, only the
+    parameters change, so this also avoids rebuilding and re-hashing it for the
+    SQLAlchemy compiled cache on every save.
+    """
+    return statement.on_conflict_do_update(
+        index_elements=[USERS_TABLE.c.uuid],
+        set_={
+            'username': statement.excluded.username,
+            'email': statement.excluded.email,
+            'password_hash': statement.excluded.password_hash,
+            'last_updated_at': statement.excluded.last_updated_at,
+        },
+    ).returning(*USERS_TABLE.c)
+
+
+USER_COLUMNS = [user_column.name for user_column in USERS_TABLE.c]
+USERS_COPY_TABLE = 'users_copy'
+# From this many users on, save_many() streams them with COPY, instead of a batched
+# executemany of the upsert
+COPY_THRESHOLD = 1000
+
+USER_UPSERT_STATEMENT = build_upsert_statement(insert(USERS_TABLE))
+USER_COPY_UPSERT_STATEMENT = build_upsert_statement(
+    insert(USERS_TABLE).from_select(
+        USER_COLUMNS,
+        select(table(USERS_COPY_TABLE, *[column(name) for name in USER_COLUMNS])),
+    )
+)
+USER_INSERT_STATEMENT = (
+    insert(USERS_TABLE).on_conflict_do_nothing().returning(*USERS_TABLE.c)
+)
+UNIQUE_FIELDS = ('email', 'username')
 
 
 class UserRepository:
@@ -24,21 +71,147 @@ class UserRepository:
     """
 
     @staticmethod
-    def get_by_uuid(uuid: UUID) -> User:
-        db_user = UserSQLModel.query.filter_by(uuid=uuid).first()
-        return UserRepository.to_domain(user_model=db_user)
+    @timed('repository')
+    def get_by_uuid(uuid: UUID, primary: bool = False) -> User:
+        return UserRepository.get_by(field='uuid', value=uuid, primary=primary)
 
     @staticmethod
-    def get_by_email(email: Email) -> User:
-        db_user = UserSQLModel.query.filter_by(email=email.address).first()
-        return UserRepository.to_domain(user_model=db_user)
+    @timed('repository')
+    def get_by_email(email: Email, primary: bool = False) -> User:
+        return UserRepository.get_by(
+            field='email', value=email.address, primary=primary
+        )
 
     @staticmethod
+    @timed('repository')
     def get_by_username(username) -> User:
-        db_user = UserSQLModel.query.filter_by(username=username).first()
-        return UserRepository.to_domain(user_model=db_user)
+        return UserRepository.get_by(field='username', value=username)
+
+    @staticmethod
+    @timed('repository')
+    def get_by(field: str, value, primary: bool = False) -> User:
+        """
+        Read-through the user cache: on a miss, the user is loaded from the database and
+        cached.
+
+        Users are cached as plain snapshots (dicts) under "uuid:<uuid>", with
+        "email:<email>" and "username:<username>" pointing to the uuid. So save() only
+        needs to invalidate the uuid entry, and an index entry left pointing to a user
+        whose email/username changed is detected on read.
+
+        primary=True skips the cache and reads from the primary: for the reads that feed
+        a save(). Only the users read from the primary are cached (a replica may still
+        have the row from before the last save(), and caching it would serve it until
+        USER_CACHE_TTL).
+        """
+        snapshot = (
+            None
+            if primary
+            else UserRepository.get_cached_snapshot(field=field, value=value)
+        )
+        if snapshot is None:
+            snapshot, replica = replica_router.read(
+                lambda session: UserRepository.to_snapshot(
+                    db_row=session.execute(
+                        select(USERS_TABLE)
+                        .where(USERS_TABLE.c[field] == value)
+                        .limit(1)
+                    ).first()
+                ),
+                primary=primary,
+            )
+            if snapshot is None:
+                return None
+            if replica is None:
+                UserRepository.cache_snapshot(snapshot=snapshot)
+        return UserRepository.from_snapshot(snapshot=snapshot)
+
+    @staticmethod
+    @timed('repository')
+    def get_many_by_uuids(uuids: list[UUID]) -> list[User]:
+        return UserRepository.get_many_by(field='uuid', values=uuids)
+
+    @staticmethod
+    @timed('repository')
+    def get_many_by_usernames(
+        usernames: list[str], primary: bool = False
+    ) -> list[User]:
+        return UserRepository.get_many_by(
+            field='username', values=usernames, primary=primary
+        )
+
+    @staticmethod
+    @timed('repository')
+    def get_many_by(field: str, values: list, primary: bool = False) -> list[User]:
+        """
+        Loads all the users not found on the user cache with a single
+        "WHERE <field> IN (...)" query.
+
+        The users are returned in the same order as the values, with None for the ones
+        not found. primary=True skips the cache and reads from the primary, as on
+        get_by().
+        """
+        snapshots = {}
+        if not primary:
+            for value in values:
+                snapshot = UserRepository.get_cached_snapshot(field=field, value=value)
+                if snapshot is not None:
+                    snapshots[str(value)] = snapshot
+
+        missing_values = list(
+            {
+                str(value): value for value in values if str(value) not in snapshots
+            }.values()
+        )
+        if missing_values:
+            loaded_snapshots, replica = replica_router.read(
+                lambda session: [
+                    UserRepository.to_snapshot(db_row=db_row)
+                    for db_row in session.execute(
+                        select(USERS_TABLE).where(
+                            USERS_TABLE.c[field].in_(missing_values)
+                        )
+                    )
+                ],
+                primary=primary,
+            )
+            for snapshot in loaded_snapshots:
+                if replica is None:
+                    UserRepository.cache_snapshot(snapshot=snapshot)
+                snapshots[str(snapshot[field])] = snapshot
+
+        return [
+            UserRepository.from_snapshot(snapshot=snapshots[str(value)])
+            if str(value) in snapshots
+            else None
+            for value in values
+        ]
+
+    @staticmethod
+    def get_cached_snapshot(field: str, value) -> dict:
+        if not user_cache.enabled:
+            return None
+        if field == 'uuid':
+            return user_cache.get(f'uuid:{value}')
+
+        uuid = user_cache.get(f'{field}:{value}')
+        if uuid is None:
+            return None
+        snapshot = user_cache.get(f'uuid:{uuid}')
+        if snapshot is None or snapshot[field] != value:
+            return None
+        return snapshot
+
+    @staticmethod
+    def cache_snapshot(snapshot: dict):
+        if not user_cache.enabled:
+            return
+        user_cache.set(f'uuid:{snapshot["uuid"]}', snapshot)
+        user_cache.set(f'email:{snapshot["email"]}', snapshot['uuid'])
+        user_cache.set(f'username:{snapshot["username"]}', snapshot['uuid'])
 
     @staticmethod
+    @timed('repository')
     def save(user: User) -> User:
         """
         IMPORTANT: when calling this method, always override the value of the original domain object
@@ -49,39 +222,157 @@ class UserRepository:
         This way, after saving the object on the repository,
         the domain user will be updated with the new properties
         (uuid, created_at, etc...)
+
+        This is a single "INSERT ... ON CONFLICT (uuid) DO UPDATE ... RETURNING"
+        statement, so both creating and updating a user cost one round trip to the
+        database (plus the commit), instead of SELECT + INSERT/UPDATE + COMMIT + SELECT
+        (refresh) through the ORM.
+        """
+        db_row = db.session.execute(
+            USER_UPSERT_STATEMENT, UserRepository.to_parameters(user=user)
+        ).one()
+        db.session.commit()
+        replica_router.mark_write()
+        user_cache.delete(f'uuid:{db_row.uuid}')
+        return UserRepository.row_to_domain(db_row=db_row)
+
+    @staticmethod
+    @timed('repository')
+    def save_many(users: list[User]) -> list[User]:
         """
-        if getattr(user, 'uuid'):
-            # For existing users, fetch from DB first.
-            # If I do not do this, UserRepository.from_domain will create a new python object
-            # and SQLALchemy will treat the update as an INSERT rather than an UPDATE.
-            existing_db_user = UserSQLModel.query.filter_by(uuid=user.uuid).first()
-            if existing_db_user:
-                # Update fields from domain object
-                existing_db_user.username = user.username
-
-                if isinstance(user.email, Email):
-                    user.email = user.email._address
-
-                existing_db_user.email = user.email
-
-                existing_db_user.password_hash = user.password_hash
-                existing_db_user.last_updated_at = datetime.utcnow()
-                db_user = existing_db_user
+        Saves (creates or updates) all the users in a single transaction, returning them
+        in the same order.
+
+        Below COPY_THRESHOLD users, this is the same upsert as save(), executed as a
+        batched executemany (SQLAlchemy packs it into a few multi-row statements).
+        Bigger batches are streamed with COPY into a temporary table and upserted from
+        there with one statement.
+
+        A unique constraint violation (including inside the batch itself) is raised as
+        DuplicateRecordException, and nothing is saved.
+        """
+        if not users:
+            return []
+
+        parameters = [UserRepository.to_parameters(user=user) for user in users]
+        if len({row['uuid'] for row in parameters}) != len(parameters):
+            raise DuplicateRecordException(
+                field='uuid', message='The same user cannot be saved twice in a batch.'
+            )
+
+        try:
+            if len(parameters) >= COPY_THRESHOLD:
+                db_rows = UserRepository.copy_upsert(parameters=parameters)
             else:
-                db_user = UserRepository.from_domain(user=user)
-                db_user.last_updated_at = datetime.utcnow()
-        else:
-            # New user
-            db_user = UserRepository.from_domain(user=user)
+                db_rows = db.session.execute(USER_UPSERT_STATEMENT, parameters).all()
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            field = UserRepository.get_violated_unique_field(error=e)
+            raise DuplicateRecordException(
+                field=field, message=f'User {field} already exists.'
+            ) from e
+        replica_router.mark_write()
+
+        db_rows_by_uuid = {db_row.uuid: db_row for db_row in db_rows}
+        for uuid in db_rows_by_uuid:
+            user_cache.delete(f'uuid:{uuid}')
+        return [
+            UserRepository.row_to_domain(db_row=db_rows_by_uuid[row['uuid']])
+            for row in parameters
+        ]
+
+    @staticmethod
+    def copy_upsert(parameters: list[dict]) -> list[Row]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in parameters:
+            writer.writerow([row[name] for name in USER_COLUMNS])
+        buffer.seek(0)
+
+        connection = db.session.connection()
+        connection.exec_driver_sql(
+            f'CREATE TEMPORARY TABLE {USERS_COPY_TABLE} '
+            f'(LIKE {UserSQLModel.__tablename__})'
+        )
+        with connection.connection.driver_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {USERS_COPY_TABLE} ({", ".join(USER_COLUMNS)}) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+        db_rows = connection.execute(USER_COPY_UPSERT_STATEMENT).all()
+        connection.exec_driver_sql(f'DROP TABLE {USERS_COPY_TABLE}')
+        return db_rows
+
+    @staticmethod
+    def get_violated_unique_field(error: IntegrityError) -> str:
+        constraint_name = getattr(
+            getattr(error.orig, 'diag', None), 'constraint_name', None
+        )
+        for field in UNIQUE_FIELDS:
+            if constraint_name == f'{UserSQLModel.__tablename__}_{field}_key':
+                return field
+        return 'uuid'
+
+    @staticmethod
+    @timed('repository')
+    def create(user: User) -> User:
+        """
+        Inserts a new user with a single "INSERT ... ON CONFLICT DO NOTHING RETURNING"
+        statement.
+
+        There is no "check then insert": the unique constraints on users.email and
+        users.username decide, so two concurrent signups with the same email cannot both
+        get in. When the insert conflicts it returns no row, and only then the
+        conflicting field is looked up and raised as a DuplicateRecordException.
+        """
+        parameters = UserRepository.to_parameters(user=user)
+        db_row = db.session.execute(USER_INSERT_STATEMENT, parameters).one_or_none()
+        if db_row is None:
+            field = UserRepository.get_conflicting_field(parameters=parameters)
+            db.session.rollback()
+            raise DuplicateRecordException(
+                field=field, message=f'User {field} already exists.'
+            )
 
-        db.session.add(db_user)
         db.session.commit()
-        db.session.refresh(db_user)
-        updated_domain_user = UserRepository.to_domain(user_model=db_user)
-        return updated_domain_user
+        replica_router.mark_write()
+        return UserRepository.row_to_domain(db_row=db_row)
+
+    @staticmethod
+    def get_conflicting_field(parameters: dict) -> str:
+        existing_rows = db.session.execute(
+            select(USERS_TABLE.c.email, USERS_TABLE.c.username).where(
+                or_(
+                    USERS_TABLE.c.email == parameters['email'],
+                    USERS_TABLE.c.username == parameters['username'],
+                )
+            )
+        ).all()
+        for (
+            field
+        ) in UNIQUE_FIELDS:  # in this order, so an existing email is reported first
+            if any(getattr(row, field) == parameters[field] for row in existing_rows):
+                return field
+        return 'uuid'
+
+    @staticmethod
+    def to_parameters(user: User) -> dict:
+        now = datetime.utcnow()
+        return {
+            'uuid': user.uuid or uuid4(),
+            'username': user.username,
+            'email': user.email.address
+            if isinstance(user.email, Email)
+            else user.email,
+            'password_hash': user.password_hash,
+            'created_at': user.created_at or now,
+            'last_updated_at': now,
+        }
 
     @staticmethod
-    def to_domain(user_model: UserSQLModel) -> User:
+    def to_domain(user_model: UserSQLModel | Row) -> User:
         if not user_model:
             return None
 
@@ -91,10 +382,43 @@ class UserRepository:
             email=Email(user_model.email),
             password_hash=user_model.password_hash,
             created_at=user_model.created_at,
-            last_updated_at=user_model.last_updated_at
+            last_updated_at=user_model.last_updated_at,
         )
         return domain_user
 
+    @staticmethod
+    def row_to_domain(db_row: Row) -> User:
+        """
+        The fast path of to_domain, for rows of the users table read with SQLAlchemy
+        Core: no ORM identity map and no validation (the data on the database is already
+        trusted).
+        """
+        return User.from_trusted(
+            uuid=db_row.uuid,
+            username=db_row.username,
+            email=Email.from_trusted(db_row.email),
+            password_hash=db_row.password_hash,
+            created_at=db_row.created_at,
+            last_updated_at=db_row.last_updated_at,
+        )
+
+    @staticmethod
+    def to_snapshot(db_row: Row) -> dict:
+        if not db_row:
+            return None
+        return db_row._asdict()
+
+    @staticmethod
+    def from_snapshot(snapshot: dict) -> User:
+        return User.from_trusted(
+            uuid=snapshot['uuid'],
+            username=snapshot['username'],
+            email=Email.from_trusted(snapshot['email']),
+            password_hash=snapshot['password_hash'],
+            created_at=snapshot['created_at'],
+            last_updated_at=snapshot['last_updated_at'],
+        )
+
     @staticmethod
     def from_domain(user: User) -> UserSQLModel:
         if not user:
@@ -106,6 +430,6 @@ class UserRepository:
             email=user.email.address,  # Email is a Value Object with an 'address' property
             password_hash=user.password_hash,
             created_at=user.created_at,
-            last_updated_at=user.last_updated_at
+            last_updated_at=user.last_updated_at,
         )
         return db_user
@@ -8,25 +8,34 @@ This must have all the API endpoints
 """
 
 from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from questrya.auth.decorators import admin_required
+from questrya.common.exceptions import ServiceUnavailableException
 from questrya.common.schemas import (
     GenericClientResponseError,
     GenericServerResponseError,
 )
-from questrya.users.service import UserService
+from questrya.common.timing import timed_block
+from questrya.idempotency.decorators import idempotent
 from questrya.users.schemas import (
+    BulkUpsertedUser,
+    BulkUpsertUsersRequest,
+    BulkUpsertUsersResponseSuccess,
     CreateUserRequest,
     CreateUserResponseSuccess,
     GetUserResponseSuccess,
     UpdateUserRequest,
     UpdateUserResponseSuccess,
 )
+from questrya.users.service import UserService
 
 users_bp = Blueprint('users', __name__)
 user_service = UserService()
 
 
 @users_bp.route('/user', methods=['POST'])
+@idempotent
 def create_user():
     """
     Create a new user
@@ -43,6 +52,12 @@ def create_user():
       - name: password
         type: string
         required: true
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: a retry with the same key gets the response of the first
+                     request, without running it again.
     responses:
       201:
         description: created user data.
@@ -50,11 +65,19 @@ def create_user():
         description: client error
       500:
         description: server error
+      409:
+        description: a request with the same Idempotency-Key is still running,
+                     retry later
+      422:
+        description: the Idempotency-Key was already used by another request
+      503:
+        description: password hashing is saturated, retry later
     """
     data = request.get_json()
 
     try:
-        validated_data = CreateUserRequest.model_validate(data)
+        with timed_block('validation'):
+            validated_data = CreateUserRequest.model_validate(data)
 
         user = user_service.register_user(
             validated_data.username,
@@ -64,6 +87,8 @@ def create_user():
         return CreateUserResponseSuccess(uuid=user.uuid).model_dump(), 201
     except ValueError as e:
         return GenericClientResponseError(error=str(e)).model_dump(), 400
+    except ServiceUnavailableException as e:
+        return GenericServerResponseError(error=str(e)).model_dump(), 503
     except Exception as e:
         return GenericServerResponseError(error=str(e)).model_dump(), 500
 
@@ -90,6 +115,8 @@ def update_user():
         description: client error
       500:
         description: server error
+      503:
+        description: password hashing is saturated, retry later
     """
     data = request.get_json()
 
@@ -98,7 +125,8 @@ def update_user():
 
         print(f'update_user: user_uuid={user_uuid}')
 
-        validated_data = UpdateUserRequest.model_validate(data)
+        with timed_block('validation'):
+            validated_data = UpdateUserRequest.model_validate(data)
 
         user = user_service.update_user(
             user_uuid,
@@ -113,6 +141,8 @@ def update_user():
         )
     except ValueError as e:
         return GenericClientResponseError(error=str(e)).model_dump(), 400
+    except ServiceUnavailableException as e:
+        return GenericServerResponseError(error=str(e)).model_dump(), 503
     except Exception as e:
         return GenericServerResponseError(error=str(e)).model_dump(), 500
 
@@ -142,3 +172,82 @@ def get_user():
         )
     except Exception as e:
         return GenericServerResponseError(error=str(e)).model_dump(), 500
+
+
+@users_bp.route('/bulk', methods=['POST'])
+@admin_required
+@idempotent
+def bulk_upsert_users():
+    """
+    Create or update users in bulk (admin only)
+    ---
+    tags:
+      - Users
+    description: >
+      Users are matched by username: the ones that do not exist are created,
+      the existing ones get their email and password updated. The whole batch
+      is read with one query and written with another one, in a single
+      transaction (if any user fails, none is saved). A batch must have from 1
+      to 50 users (BULK_USERS_MAX_BATCH_SIZE), each username and email at most once.
+    parameters:
+      - name: users
+        type: array
+        required: true
+        description: list of {username, email, password}
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: a retry with the same key gets the response of the first
+                     request, without running it again.
+    responses:
+      200:
+        description: the saved users (uuid, username, email), in the same order
+                     as the request.
+      400:
+        description: client error
+      403:
+        description: the user is not an admin
+      409:
+        description: a request with the same Idempotency-Key is still running,
+                     retry later
+      422:
+        description: the Idempotency-Key was already used by another request
+      500:
+        description: server error
+      503:
+        description: password hashing is saturated, retry later
+    """
+    data = request.get_json()
+
+    try:
+        with timed_block('validation'):
+            validated_data = BulkUpsertUsersRequest.model_validate(data)
+
+        users = user_service.bulk_upsert_users(
+            [
+                {
+                    'username': user_data.username,
+                    'email': user_data.email,
+                    'password': user_data.password,
+                }
+                for user_data in validated_data.users
+            ]
+        )
+        return (
+            BulkUpsertUsersResponseSuccess(
+                users=[
+                    BulkUpsertedUser(
+                        uuid=user.uuid, username=user.username, email=user.email.address
+                    )
+                    for user in users
+                ]
+            ).model_dump(),
+            200,
+        )
+    except ValueError as e:
+        return GenericClientResponseError(error=str(e)).model_dump(), 400
+    except ServiceUnavailableException as e:
+        return GenericServerResponseError(error=str(e)).model_dump(), 503
+    except Exception as e:
+        return GenericServerResponseError(error=str(e)).model_dump(), 500
@@ -7,10 +7,16 @@ MUST NOT communicate with: ORM models, Repositories, Domain, Services, Routes
 This must contain serialization/validations rules used by the APIs
 """
 
-from pydantic import BaseModel, validator
-from questrya.common.value_objects.email import Email, InvalidEmailError
 from uuid import UUID
 
+from pydantic import BaseModel, Field, validator
+
+from questrya.common.value_objects.email import Email, InvalidEmailError
+
+# Every new user or password costs a full bcrypt round, so keep the batches
+# small enough to finish well within the gunicorn timeout.
+BULK_USERS_MAX_BATCH_SIZE = 50
+
 
 class CreateUserRequest(BaseModel):
     username: str
@@ -71,3 +77,27 @@ class GetUserResponseSuccess(BaseModel):
     uuid: UUID
     email: str
     username: str
+
+
+class BulkUpsertUsersRequest(BaseModel):
+    users: list[CreateUserRequest] = Field(
+        min_length=1, max_length=BULK_USERS_MAX_BATCH_SIZE
+    )
+
+    @validator('users')
+    def validate_unique_users(cls, value):
+        usernames = [user.username for user in value]
+        emails = [user.email.address for user in value]
+        if len(set(usernames)) != len(usernames) or len(set(emails)) != len(emails):
+            raise ValueError('Each username and email can appear only once per batch')
+        return value
+
+
+class BulkUpsertedUser(BaseModel):
+    uuid: UUID
+    username: str
+    email: str
+
+
+class BulkUpsertUsersResponseSuccess(BaseModel):
+    users: list[BulkUpsertedUser]
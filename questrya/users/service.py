@@ -7,28 +7,34 @@ MUST NOT communicate with: ORM models, Routes
 This must have the application use cases
 """
 
-from questrya.users.repository import UserRepository
+from questrya.common.exceptions import DuplicateRecordException
+from questrya.common.timing import timed
 from questrya.users.domain import User
+from questrya.users.repository import UserRepository
 
 
 class UserService:
     def __init__(self):
         self.user_repository = UserRepository()
 
+    @timed('service')
     def register_user(self, username, email, password) -> User:
-        if self.user_repository.get_by_email(email):
-            raise ValueError(f'Email already registered ({email})')
-
         # Create a domain object
-        user = User(
-            username=username,
-            email=email,
-            password=password
-        )
-        return self.user_repository.save(user=user)
+        user = User(username=username, email=email, password=password)
+
+        # No "get_by_email" before creating: the unique constraints are checked on the
+        # insert itself
+        try:
+            return self.user_repository.create(user=user)
+        except DuplicateRecordException as e:
+            if e.field == 'username':
+                raise ValueError(f'Username already registered ({username})') from e
+            raise ValueError(f'Email already registered ({email})') from e
 
+    @timed('service')
     def update_user(self, uuid, email=None, password=None) -> User:
-        user = self.user_repository.get_by_uuid(uuid)
+        # From the primary: save() writes back the whole row
+        user = self.user_repository.get_by_uuid(uuid, primary=True)
         if not user:
             raise ValueError(f'User not found (uuid="{uuid}")')
 
@@ -36,9 +42,37 @@ class UserService:
         user.update(email=email, password=password)
         return self.user_repository.save(user=user)
 
+    @timed('service')
     def get_user(self, uuid) -> User:
         user = self.user_repository.get_by_uuid(uuid)
         if not user:
             raise ValueError(f'User not found (uuid="{uuid}")')
 
         return user
+
+    @timed('service')
+    def bulk_upsert_users(self, users_data: list[dict]) -> list[User]:
+        """
+        Creates the users whose username does not exist yet, and updates the email and
+        password of the ones that do, with one query to read (on the primary: a replica
+        may not have the users created a moment ago yet) and one to write.
+        """
+        usernames = [user_data['username'] for user_data in users_data]
+        existing_users = self.user_repository.get_many_by_usernames(
+            usernames, primary=True
+        )
+
+        users = []
+        for user_data, user in zip(users_data, existing_users):
+            if user:
+                user.update(email=user_data['email'], password=user_data['password'])
+            else:
+                user = User(**user_data)
+            users.append(user)
+
+        try:
+            return self.user_repository.save_many(users)
+        except DuplicateRecordException as e:
+            raise ValueError(
+                f'A user with the same {e.field} is already registered'
+            ) from e
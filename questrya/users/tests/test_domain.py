@@ -1,6 +1,6 @@
 from copy import deepcopy
-from typing import Dict
-from uuid import uuid4, UUID
+from datetime import datetime
+from uuid import UUID, uuid4
 
 import pytest
 
@@ -10,17 +10,23 @@ from questrya.users.domain import User
 
 
 class TestUserDomain:
-    def test_instantiate_user_successfully_when_password_provided(self, domain_user_data_picard: Dict):
+    def test_instantiate_user_successfully_when_password_provided(
+        self, domain_user_data_picard: dict
+    ):
         assert domain_user_data_picard['password']
-        assert 'password_hash' not in domain_user_data_picard.keys()
+        assert 'password_hash' not in domain_user_data_picard
         user_instance = User(**domain_user_data_picard)
         for key, value in domain_user_data_picard.items():
             if key == 'password':
-                assert getattr(user_instance, 'password_hash') != domain_user_data_picard['password']
+                assert (
+                    user_instance.password_hash != domain_user_data_picard['password']
+                )
                 continue
             assert getattr(user_instance, key) == value
 
-    def test_instantiate_user_successfully_when_password_hash_provided(self, domain_user_data_picard: Dict):
+    def test_instantiate_user_successfully_when_password_hash_provided(
+        self, domain_user_data_picard: dict
+    ):
         user_data = deepcopy(domain_user_data_picard)
         user_data.pop('password')
         user_data['password_hash'] = 'hashed-12345678'
@@ -28,7 +34,9 @@ class TestUserDomain:
         for key, value in user_data.items():
             assert getattr(user_instance, key) == value
 
-    def test_instantiate_user_must_fail_when_no_password_or_password_hash(self, domain_user_data_picard: Dict):
+    def test_instantiate_user_must_fail_when_no_password_or_password_hash(
+        self, domain_user_data_picard: dict
+    ):
         invalid_data = deepcopy(domain_user_data_picard)
         invalid_data['password'] = None
         invalid_data['password_hash'] = None
@@ -37,27 +45,31 @@ class TestUserDomain:
             user_instance = User(**invalid_data)
 
         assert exception_instance.type is DomainException
-        expected_exception_value = 'User must be instantiated with either password or password_hash.'
+        expected_exception_value = (
+            'User must be instantiated with either password or password_hash.'
+        )
         assert exception_instance.value.args[0] == expected_exception_value
 
-    def test_check_password_when_equal(self, domain_user_data_picard: Dict):
+    def test_check_password_when_equal(self, domain_user_data_picard: dict):
         user_instance = User(**domain_user_data_picard)
         assert user_instance.check_password(password='12345678') is True
 
-    def test_check_password_when_different(self, domain_user_data_picard: Dict):
+    def test_check_password_when_different(self, domain_user_data_picard: dict):
         user_instance = User(**domain_user_data_picard)
         assert user_instance.check_password(password='23456789') is False
 
-    def test_does_not_update_when_no_uuid(self, domain_user_data_picard: Dict):
+    def test_does_not_update_when_no_uuid(self, domain_user_data_picard: dict):
         user_instance = User(**domain_user_data_picard)
         with pytest.raises(DomainException) as exception_instance:
             user_instance.update(email='newpicard@enterprise.org')
 
         assert exception_instance.type is DomainException
-        expected_exception_value = 'You cannot update a user object that does not have a uuid.'
+        expected_exception_value = (
+            'You cannot update a user object that does not have a uuid.'
+        )
         assert exception_instance.value.args[0] == expected_exception_value
 
-    def test_update_successfully(self, domain_user_data_picard: Dict):
+    def test_update_successfully(self, domain_user_data_picard: dict):
         user_instance = User(**domain_user_data_picard)
         user_instance.uuid = uuid4()
         assert isinstance(user_instance.uuid, UUID)
@@ -73,3 +85,28 @@ class TestUserDomain:
         assert user_instance.email == new_email
         assert user_instance.created_at == original_created_at
         assert user_instance.last_updated_at > original_updated_at
+
+    def test_from_trusted_skips_hashing_and_defaults(self):
+        user_uuid = uuid4()
+        created_at = datetime(2025, 1, 1)
+
+        user_instance = User.from_trusted(
+            uuid=user_uuid,
+            username='picard',
+            email=Email.from_trusted('jean_luc_picard@enterprise.org'),
+            password_hash='hashed-12345678',
+            created_at=created_at,
+            last_updated_at=created_at,
+        )
+
+        assert user_instance.uuid == user_uuid
+        assert user_instance.email == Email('jean_luc_picard@enterprise.org')
+        assert user_instance.password_hash == 'hashed-12345678'
+        assert user_instance.created_at == created_at
+        assert user_instance.last_updated_at == created_at
+
+    def test_user_is_slotted(self, domain_user_data_picard: dict):
+        user_instance = User(**domain_user_data_picard)
+        assert not hasattr(user_instance, '__dict__')
+        with pytest.raises(AttributeError):
+            user_instance.nickname = 'Locutus'
@@ -1,11 +1,16 @@
 from datetime import datetime
+from unittest.mock import patch
 from uuid import UUID, uuid4
 
+import pytest
+from sqlalchemy import select
+
+from questrya.common.exceptions import DuplicateRecordException
 from questrya.common.value_objects.email import Email
 from questrya.extensions import bcrypt
 from questrya.sql_db.models import UserSQLModel
-from questrya.users.repository import UserRepository
 from questrya.users.domain import User
+from questrya.users.repository import UserRepository
 
 
 class TestUserRepository:
@@ -20,7 +25,7 @@ class TestUserRepository:
         assert isinstance(domain_user, User)
         for key, value in domain_user_data_picard.items():
             if key == 'password':
-                hash_value = getattr(domain_user, 'password_hash')
+                hash_value = domain_user.password_hash
                 assert hash_value != value
                 continue
             assert getattr(domain_user, key) == value
@@ -62,7 +67,7 @@ class TestUserRepository:
         assert isinstance(found_domain_user, User)
         for key, value in domain_user_data_picard.items():
             if key == 'password':
-                password_hash = getattr(found_domain_user, 'password_hash')
+                password_hash = found_domain_user.password_hash
                 assert isinstance(password_hash, str)
                 continue
             assert getattr(found_domain_user, key) == value
@@ -81,7 +86,7 @@ class TestUserRepository:
         assert isinstance(found_domain_user.uuid, UUID)
         for key, value in domain_user_data_picard.items():
             if key == 'password':
-                password_hash = getattr(found_domain_user, 'password_hash')
+                password_hash = found_domain_user.password_hash
                 assert isinstance(password_hash, str)
                 continue
             assert getattr(found_domain_user, key) == value
@@ -108,7 +113,9 @@ class TestUserRepository:
 
     def test_from_sqlmodel_to_domain(self, domain_user_data_picard, db_session):
         # GIVEN
-        hashed_password = bcrypt.generate_password_hash(password=domain_user_data_picard['password']).decode('utf-8')
+        hashed_password = bcrypt.generate_password_hash(
+            password=domain_user_data_picard['password']
+        ).decode('utf-8')
         db_user = UserSQLModel(
             username=domain_user_data_picard['username'],
             email=domain_user_data_picard['email'].address,
@@ -128,7 +135,279 @@ class TestUserRepository:
         assert domain_user.email.address == db_user.email
 
         assert domain_user.password_hash == hashed_password
-        assert domain_user.check_password(password=domain_user_data_picard['password']) is True
+        assert (
+            domain_user.check_password(password=domain_user_data_picard['password'])
+            is True
+        )
 
         assert domain_user.created_at == db_user.created_at
         assert domain_user.last_updated_at == db_user.last_updated_at
+
+    def test_save_existing_user_keeps_uuid_and_created_at(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN
+        domain_user = UserRepository.save(user=User(**domain_user_data_picard))
+        original_uuid = domain_user.uuid
+        original_created_at = domain_user.created_at
+        original_last_updated_at = domain_user.last_updated_at
+
+        # WHEN
+        domain_user.username = 'locutus'
+        domain_user = UserRepository.save(user=domain_user)
+
+        # THEN
+        assert domain_user.uuid == original_uuid
+        assert domain_user.username == 'locutus'
+        assert domain_user.created_at == original_created_at
+        assert domain_user.last_updated_at > original_last_updated_at
+        assert db_session.query(UserSQLModel).filter_by(uuid=original_uuid).count() == 1
+
+    def test_save_user_with_unknown_uuid_inserts_it(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN
+        domain_user = User(**domain_user_data_picard)
+        domain_user.uuid = uuid4()
+
+        # WHEN
+        saved_domain_user = UserRepository.save(user=domain_user)
+
+        # THEN
+        assert saved_domain_user.uuid == domain_user.uuid
+        assert (
+            UserRepository.get_by_uuid(uuid=domain_user.uuid).username
+            == domain_user.username
+        )
+
+    def test_get_by_uuid_is_served_from_cache(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN
+        domain_user = UserRepository.save(user=User(**domain_user_data_picard))
+        UserRepository.get_by_uuid(uuid=domain_user.uuid)  # miss, now cached
+
+        # WHEN
+        with patch('questrya.users.repository.replica_router') as mock_replica_router:
+            found_domain_user = UserRepository.get_by_uuid(uuid=domain_user.uuid)
+
+        # THEN
+        mock_replica_router.read.assert_not_called()
+        assert found_domain_user.uuid == domain_user.uuid
+        assert found_domain_user is not UserRepository.get_by_uuid(
+            uuid=domain_user.uuid
+        )
+
+    def test_save_invalidates_cached_user(self, domain_user_data_picard, db_session):
+        # GIVEN
+        domain_user = UserRepository.save(user=User(**domain_user_data_picard))
+        original_email = domain_user.email
+        assert UserRepository.get_by_email(email=original_email)  # cached
+
+        # WHEN
+        domain_user.email = Email('picard-new@enterprise.org')
+        UserRepository.save(user=domain_user)
+
+        # THEN
+        assert UserRepository.get_by_email(email=original_email) is None
+        assert (
+            UserRepository.get_by_uuid(uuid=domain_user.uuid).email.address
+            == 'picard-new@enterprise.org'
+        )
+        assert (
+            UserRepository.get_by_username(username='picard').email.address
+            == 'picard-new@enterprise.org'
+        )
+
+    def test_primary_reads_skip_a_stale_cached_user(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN: the password changed on another worker, which cannot invalidate the
+        # cache of this one
+        domain_user = UserRepository.save(user=User(**domain_user_data_picard))
+        assert UserRepository.get_by_email(email=domain_user.email)  # cached
+        db_session.execute(
+            UserSQLModel.__table__.update()
+            .where(UserSQLModel.uuid == domain_user.uuid)
+            .values(password_hash='new-password-hash')
+        )
+
+        # WHEN
+        found_domain_user = UserRepository.get_by_email(
+            email=domain_user.email, primary=True
+        )
+
+        # THEN
+        assert found_domain_user.password_hash == 'new-password-hash'
+        assert (
+            UserRepository.get_by_email(email=domain_user.email).password_hash
+            == 'new-password-hash'
+        )
+
+    def test_create_new_user(self, domain_user_data_picard, db_session):
+        # WHEN
+        domain_user = UserRepository.create(user=User(**domain_user_data_picard))
+
+        # THEN
+        assert isinstance(domain_user.uuid, UUID)
+        assert UserRepository.get_by_uuid(uuid=domain_user.uuid).username == 'picard'
+
+    def test_create_must_fail_on_duplicate_email(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN
+        _ = UserRepository.create(user=User(**domain_user_data_picard))
+        duplicate_user = User(**domain_user_data_picard)
+        duplicate_user.username = 'locutus'
+
+        # WHEN/THEN
+        with pytest.raises(DuplicateRecordException) as exception_instance:
+            _ = UserRepository.create(user=duplicate_user)
+
+        assert exception_instance.value.field == 'email'
+
+    def test_get_many_by_uuids_in_input_order(self, db_session):
+        # GIVEN
+        users = UserRepository.save_many(
+            users=[
+                User(
+                    username=f'crew-{index}',
+                    email=Email(f'crew-{index}@enterprise.org'),
+                    password_hash='hash',
+                )
+                for index in range(3)
+            ]
+        )
+        missing_uuid = uuid4()
+
+        # WHEN
+        found_users = UserRepository.get_many_by_uuids(
+            uuids=[users[2].uuid, missing_uuid, users[0].uuid]
+        )
+
+        # THEN
+        assert [user.username if user else None for user in found_users] == [
+            'crew-2',
+            None,
+            'crew-0',
+        ]
+
+    def test_get_many_by_usernames_in_input_order(self, db_session):
+        # GIVEN
+        UserRepository.save_many(
+            users=[
+                User(
+                    username=f'crew-{index}',
+                    email=Email(f'crew-{index}@enterprise.org'),
+                    password_hash='hash',
+                )
+                for index in range(3)
+            ]
+        )
+
+        # WHEN
+        found_users = UserRepository.get_many_by_usernames(
+            usernames=['crew-1', 'q', 'crew-0', 'crew-1']
+        )
+
+        # THEN
+        assert [user.username if user else None for user in found_users] == [
+            'crew-1',
+            None,
+            'crew-0',
+            'crew-1',
+        ]
+
+    def test_save_many_creates_and_updates_in_input_order(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN
+        existing_user = UserRepository.save(user=User(**domain_user_data_picard))
+        existing_user.username = 'locutus'
+        new_user = User(
+            username='riker', email=Email('riker@enterprise.org'), password_hash='hash'
+        )
+
+        # WHEN
+        saved_users = UserRepository.save_many(users=[new_user, existing_user])
+
+        # THEN
+        assert [user.username for user in saved_users] == ['riker', 'locutus']
+        assert saved_users[1].uuid == existing_user.uuid
+        assert isinstance(saved_users[0].uuid, UUID)
+        assert UserRepository.get_by_uuid(uuid=existing_user.uuid).username == 'locutus'
+
+    def test_save_many_with_copy(self, db_session):
+        # GIVEN
+        users = [
+            User(
+                username=f'crew-{index}',
+                email=Email(f'crew-{index}@enterprise.org'),
+                password_hash='hash',
+            )
+            for index in range(5)
+        ]
+
+        # WHEN
+        with patch('questrya.users.repository.COPY_THRESHOLD', 2):
+            saved_users = UserRepository.save_many(users=users)
+            assert [user.username for user in saved_users] == [
+                f'crew-{index}' for index in range(5)
+            ]
+            saved_users[0].username = 'crew-updated'
+            updated_users = UserRepository.save_many(users=saved_users[:2])
+
+        # THEN
+        assert [user.username for user in updated_users] == ['crew-updated', 'crew-1']
+        assert (
+            db_session.query(UserSQLModel)
+            .filter(UserSQLModel.username.like('crew-%'))
+            .count()
+            == 5
+        )
+
+    def test_save_many_must_fail_on_duplicate_email(self, db_session):
+        # GIVEN
+        users = [
+            User(
+                username=f'crew-{index}',
+                email=Email('crew@enterprise.org'),
+                password_hash='hash',
+            )
+            for index in range(2)
+        ]
+
+        # WHEN/THEN
+        with pytest.raises(DuplicateRecordException) as exception_instance:
+            _ = UserRepository.save_many(users=users)
+
+        assert exception_instance.value.field == 'email'
+        assert (
+            db_session.query(UserSQLModel)
+            .filter(UserSQLModel.username.like('crew-%'))
+            .count()
+            == 0
+        )
+
+    def test_row_to_domain(self, domain_user_data_picard, db_session):
+        # GIVEN
+        domain_user = UserRepository.save(user=User(**domain_user_data_picard))
+        db_row = db_session.execute(
+            select(UserSQLModel.__table__).filter_by(uuid=domain_user.uuid)
+        ).first()
+
+        # WHEN
+        hydrated_domain_user = UserRepository.row_to_domain(db_row=db_row)
+
+        # THEN
+        assert isinstance(hydrated_domain_user, User)
+        assert isinstance(hydrated_domain_user.email, Email)
+        for key in (
+            'uuid',
+            'username',
+            'email',
+            'password_hash',
+            'created_at',
+            'last_updated_at',
+        ):
+            assert getattr(hydrated_domain_user, key) == getattr(domain_user, key)
@@ -1,10 +1,15 @@
 import json
+
 # import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock, patch
 from uuid import UUID
 
+from flask_jwt_extended import create_access_token
+
+from questrya.common.exceptions import ServiceUnavailableException
 from questrya.common.value_objects.email import Email
 from questrya.users.domain import User
+from questrya.users.schemas import BULK_USERS_MAX_BATCH_SIZE
 from questrya.users.service import UserService
 from questrya.users.tests.data_factory import get_creation_data
 
@@ -18,16 +23,16 @@ class TestUserCreateRoute:
         mock_user_service.register_user.return_value = mock_user
 
         request_data = {
-            "username": "testuser",
-            "email": "test@example.com",
-            "password": "password123"
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123',
         }
 
         # WHEN
         response = test_client.post(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         # THEN
@@ -35,7 +40,7 @@ class TestUserCreateRoute:
 
         # Verify service was called with correct parameters
         mock_user_service.register_user.assert_called_once_with(
-            "testuser", Email("test@example.com"), "password123"
+            'testuser', Email('test@example.com'), 'password123'
         )
 
         response_data = json.loads(response.data)
@@ -45,15 +50,15 @@ class TestUserCreateRoute:
     def test_create_user_invalid_data_must_fail(self, test_client):
         # invalid email
         request_data = {
-            "username": "testuser",
-            "email": "invalid-email",
-            "password": "password123"
+            'username': 'testuser',
+            'email': 'invalid-email',
+            'password': 'password123',
         }
 
         response = test_client.post(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         assert response.status_code == 400
@@ -62,32 +67,35 @@ class TestUserCreateRoute:
 
         # short password
         request_data = {
-            "username": "testuser",
-            "email": "test@example.com",
-            "password": "short"
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'short',
         }
 
         response = test_client.post(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         assert response.status_code == 400
         response_data = json.loads(response.data)
-        assert 'password must be at least 8 characters long' in response_data['error'].lower()
+        assert (
+            'password must be at least 8 characters long'
+            in response_data['error'].lower()
+        )
 
         # empty username
         request_data = {
-            "username": "",
-            "email": "test@example.com",
-            "password": "password123"
+            'username': '',
+            'email': 'test@example.com',
+            'password': 'password123',
         }
 
         response = test_client.post(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         assert response.status_code == 400
@@ -97,50 +105,79 @@ class TestUserCreateRoute:
     @patch('questrya.users.routes.user_service')
     def test_create_user_service_error(self, mock_user_service, test_client):
         # GIVEN
-        mock_user_service.register_user.side_effect = ValueError("User already exists")
+        mock_user_service.register_user.side_effect = ValueError('User already exists')
 
         request_data = {
-            "username": "testuser",
-            "email": "test@example.com",
-            "password": "password123"
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123',
         }
 
         # WHEN
         response = test_client.post(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         # THEN
         assert response.status_code == 400
         response_data = json.loads(response.data)
         assert 'error' in response_data
-        assert response_data['error'] == "User already exists"
+        assert response_data['error'] == 'User already exists'
 
     @patch('questrya.users.routes.user_service')
     def test_create_user_server_error(self, mock_user_service, test_client):
         # GIVEN
-        mock_user_service.register_user.side_effect = Exception("Database connection error")
+        mock_user_service.register_user.side_effect = Exception(
+            'Database connection error'
+        )
 
         request_data = {
-            "username": "testuser",
-            "email": "test@example.com",
-            "password": "password123"
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123',
         }
 
         # WHEN
         response = test_client.post(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         # THEN
         assert response.status_code == 500
         response_data = json.loads(response.data)
         assert 'error' in response_data
-        assert response_data['error'] == "Database connection error"
+        assert response_data['error'] == 'Database connection error'
+
+    @patch('questrya.users.routes.user_service')
+    def test_create_user_password_hasher_busy(self, mock_user_service, test_client):
+        # GIVEN
+        mock_user_service.register_user.side_effect = ServiceUnavailableException(
+            message='Password hashing queue is full, try again later.'
+        )
+
+        request_data = {
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123',
+        }
+
+        # WHEN
+        response = test_client.post(
+            '/api/users/user',
+            data=json.dumps(request_data),
+            content_type='application/json',
+        )
+
+        # THEN
+        assert response.status_code == 503
+        response_data = json.loads(response.data)
+        assert (
+            response_data['error'] == 'Password hashing queue is full, try again later.'
+        )
 
 
 class TestUserUpdateRoute:
@@ -149,7 +186,7 @@ class TestUserUpdateRoute:
         response = test_client.post(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
         assert response.status_code == 201
         response_data = response.json
@@ -168,16 +205,13 @@ class TestUserUpdateRoute:
 
         mock_jwt_identity.return_value = str(created_user.uuid)
 
-        request_data = {
-            "email": "updated@example.com",
-            "password": "newpassword123"
-        }
+        request_data = {'email': 'updated@example.com', 'password': 'newpassword123'}
 
         # WHEN
         response = test_client.patch(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         # THEN
@@ -193,27 +227,26 @@ class TestUserUpdateRoute:
         response_data = json.loads(response.data)
         assert 'uuid' in response_data
         assert response_data['uuid'] == created_user.uuid
-        assert response_data['email'] == "updated@example.com"
-        assert response_data['password'] == "UPDATED"
+        assert response_data['email'] == 'updated@example.com'
+        assert response_data['password'] == 'UPDATED'
 
     @patch('questrya.users.routes.user_service')
     @patch('questrya.users.routes.get_jwt_identity')
-    def test_update_user_invalid_data_must_fail(self, mock_jwt_identity, mock_user_service, test_client):
+    def test_update_user_invalid_data_must_fail(
+        self, mock_jwt_identity, mock_user_service, test_client
+    ):
         # GIVEN
         user_uuid = '12345678-1234-5678-1234-567812345678'
         mock_jwt_identity.return_value = user_uuid
 
         # invalid email
-        request_data = {
-            "email": "invalid-email",
-            "password": "newpassword123"
-        }
+        request_data = {'email': 'invalid-email', 'password': 'newpassword123'}
 
         # WHEN
         response = test_client.patch(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         # THEN
@@ -222,86 +255,88 @@ class TestUserUpdateRoute:
         assert 'invalid email address' in response_data['error'].lower()
 
         # short password
-        request_data = {
-            "email": "valid@example.com",
-            "password": "short"
-        }
+        request_data = {'email': 'valid@example.com', 'password': 'short'}
 
         response = test_client.patch(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         assert response.status_code == 400
         response_data = json.loads(response.data)
-        assert 'password must be at least 8 characters long' in response_data['error'].lower()
+        assert (
+            'password must be at least 8 characters long'
+            in response_data['error'].lower()
+        )
 
     @patch('questrya.users.routes.user_service')
     @patch('questrya.users.routes.get_jwt_identity')
-    def test_update_user_service_error(self, mock_jwt_identity, mock_user_service, test_client):
+    def test_update_user_service_error(
+        self, mock_jwt_identity, mock_user_service, test_client
+    ):
         # GIVEN
         user_uuid = '12345678-1234-5678-1234-567812345678'
         mock_jwt_identity.return_value = user_uuid
-        mock_user_service.update_user.side_effect = ValueError("User not found")
+        mock_user_service.update_user.side_effect = ValueError('User not found')
 
-        request_data = {
-            "email": "updated@example.com",
-            "password": "newpassword123"
-        }
+        request_data = {'email': 'updated@example.com', 'password': 'newpassword123'}
 
         # WHEN
         response = test_client.patch(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         # THEN
         assert response.status_code == 400
         response_data = json.loads(response.data)
         assert 'error' in response_data
-        assert response_data['error'] == "User not found"
+        assert response_data['error'] == 'User not found'
 
     @patch('questrya.users.routes.user_service')
     @patch('questrya.users.routes.get_jwt_identity')
-    def test_update_user_server_error(self, mock_jwt_identity, mock_user_service, test_client):
+    def test_update_user_server_error(
+        self, mock_jwt_identity, mock_user_service, test_client
+    ):
         # GIVEN
         user_uuid = '12345678-1234-5678-1234-567812345678'
         mock_jwt_identity.return_value = user_uuid
-        mock_user_service.update_user.side_effect = Exception("Database connection error")
+        mock_user_service.update_user.side_effect = Exception(
+            'Database connection error'
+        )
 
-        request_data = {
-            "email": "updated@example.com",
-            "password": "newpassword123"
-        }
+        request_data = {'email': 'updated@example.com', 'password': 'newpassword123'}
 
         # WHEN
         response = test_client.patch(
             '/api/users/user',
             data=json.dumps(request_data),
-            content_type='application/json'
+            content_type='application/json',
         )
 
         # THEN
         assert response.status_code == 500
         response_data = json.loads(response.data)
         assert 'error' in response_data
-        assert response_data['error'] == "Database connection error"
+        assert response_data['error'] == 'Database connection error'
 
 
 class TestUserGetRoute:
     @patch('questrya.users.routes.user_service')
     @patch('questrya.users.routes.get_jwt_identity')
-    def test_get_user_successfully(self, mock_jwt_identity, mock_user_service, test_client):
+    def test_get_user_successfully(
+        self, mock_jwt_identity, mock_user_service, test_client
+    ):
         # GIVEN
         user_uuid = '12345678-1234-5678-1234-567812345678'
         mock_jwt_identity.return_value = user_uuid
 
         mock_user = MagicMock(spec=User)
         mock_user.uuid = UUID(user_uuid)
-        mock_user.email = "user@example.com"
-        mock_user.username = "testuser"
+        mock_user.email = 'user@example.com'
+        mock_user.username = 'testuser'
         mock_user_service.get_user.return_value = mock_user
 
         # WHEN
@@ -316,16 +351,18 @@ class TestUserGetRoute:
         response_data = json.loads(response.data)
         assert 'uuid' in response_data
         assert response_data['uuid'] == user_uuid
-        assert response_data['email'] == "user@example.com"
-        assert response_data['username'] == "testuser"
+        assert response_data['email'] == 'user@example.com'
+        assert response_data['username'] == 'testuser'
 
     @patch('questrya.users.routes.user_service')
     @patch('questrya.users.routes.get_jwt_identity')
-    def test_get_user_server_error(self, mock_jwt_identity, mock_user_service, test_client):
+    def test_get_user_server_error(
+        self, mock_jwt_identity, mock_user_service, test_client
+    ):
         # GIVEN
         user_uuid = '12345678-1234-5678-1234-567812345678'
         mock_jwt_identity.return_value = user_uuid
-        mock_user_service.get_user.side_effect = Exception("Database connection error")
+        mock_user_service.get_user.side_effect = Exception('Database connection error')
 
         # WHEN
         response = test_client.get('/api/users/user')
@@ -334,4 +371,92 @@ class TestUserGetRoute:
         assert response.status_code == 500
         response_data = json.loads(response.data)
         assert 'error' in response_data
-        assert response_data['error'] == "Database connection error"
+        assert response_data['error'] == 'Database connection error'
+
+
+class TestUserBulkUpsertRoute:
+    ADMIN_UUID = '12345678-1234-5678-1234-567812345678'
+
+    def get_headers(self, identity: str) -> dict:
+        return {'Authorization': f'Bearer {create_access_token(identity=identity)}'}
+
+    @patch('questrya.auth.decorators.settings.ADMIN_USER_UUIDS', [ADMIN_UUID])
+    @patch('questrya.users.routes.user_service')
+    def test_bulk_upsert_users_successfully(self, mock_user_service, test_client):
+        # GIVEN
+        mock_user = MagicMock(spec=User)
+        mock_user.uuid = UUID('87654321-1234-5678-1234-567812345678')
+        mock_user.username = 'testuser'
+        mock_user.email = Email('test@example.com')
+        mock_user_service.bulk_upsert_users.return_value = [mock_user]
+
+        request_data = {
+            'users': [
+                {
+                    'username': 'testuser',
+                    'email': 'test@example.com',
+                    'password': 'password123',
+                }
+            ]
+        }
+
+        # WHEN
+        response = test_client.post(
+            '/api/users/bulk',
+            data=json.dumps(request_data),
+            content_type='application/json',
+            headers=self.get_headers(identity=self.ADMIN_UUID),
+        )
+
+        # THEN
+        assert response.status_code == 200
+        mock_user_service.bulk_upsert_users.assert_called_once_with(
+            [
+                {
+                    'username': 'testuser',
+                    'email': Email('test@example.com'),
+                    'password': 'password123',
+                }
+            ]
+        )
+        assert response.json == {
+            'users': [
+                {
+                    'uuid': '87654321-1234-5678-1234-567812345678',
+                    'username': 'testuser',
+                    'email': 'test@example.com',
+                }
+            ]
+        }
+
+    @patch('questrya.auth.decorators.settings.ADMIN_USER_UUIDS', [ADMIN_UUID])
+    def test_bulk_upsert_users_must_fail_when_not_admin(self, test_client):
+        response = test_client.post(
+            '/api/users/bulk',
+            data=json.dumps({'users': []}),
+            content_type='application/json',
+            headers=self.get_headers(identity='87654321-1234-5678-1234-567812345678'),
+        )
+
+        assert response.status_code == 403
+
+    @patch('questrya.auth.decorators.settings.ADMIN_USER_UUIDS', [ADMIN_UUID])
+    def test_bulk_upsert_users_must_fail_on_invalid_batch(self, test_client):
+        user_data = {
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123',
+        }
+        for users in (
+            [],
+            [user_data, user_data],
+            [user_data] * (BULK_USERS_MAX_BATCH_SIZE + 1),
+        ):
+            response = test_client.post(
+                '/api/users/bulk',
+                data=json.dumps({'users': users}),
+                content_type='application/json',
+                headers=self.get_headers(identity=self.ADMIN_UUID),
+            )
+
+            assert response.status_code == 400
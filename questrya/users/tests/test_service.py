@@ -2,6 +2,7 @@ from uuid import UUID, uuid4
 
 import pytest
 
+from questrya.common.value_objects.email import Email
 from questrya.users.domain import User
 from questrya.users.service import UserService
 
@@ -22,12 +23,17 @@ class TestUserService:
         assert new_user.email.address == domain_user_data_picard['email'].address
 
         assert isinstance(new_user.password_hash, str)
-        assert new_user.check_password(password=domain_user_data_picard['password']) is True
+        assert (
+            new_user.check_password(password=domain_user_data_picard['password'])
+            is True
+        )
 
         assert new_user.created_at
         assert new_user.last_updated_at
 
-    def test_register_user_must_fail_if_user_email_exists(self, domain_user_data_picard, db_session):
+    def test_register_user_must_fail_if_user_email_exists(
+        self, domain_user_data_picard, db_session
+    ):
         # GIVEN
         service = UserService()
         new_user = service.register_user(**domain_user_data_picard)
@@ -39,9 +45,30 @@ class TestUserService:
             _ = service.register_user(**domain_user_data_picard)
 
         assert exception_instance.type is ValueError
-        expected_exception_value = f'Email already registered ({domain_user_data_picard["email"].address})'
+        expected_exception_value = (
+            f'Email already registered ({domain_user_data_picard["email"].address})'
+        )
         assert exception_instance.value.args[0] == expected_exception_value
 
+    def test_register_user_must_fail_if_username_exists(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN
+        service = UserService()
+        _ = service.register_user(**domain_user_data_picard)
+
+        # WHEN/THEN
+        with pytest.raises(ValueError) as exception_instance:
+            _ = service.register_user(
+                username=domain_user_data_picard['username'],
+                email=Email('another_picard@enterprise.org'),
+                password=domain_user_data_picard['password'],
+            )
+
+        assert (
+            exception_instance.value.args[0] == 'Username already registered (picard)'
+        )
+
     def test_update_user_successfully(self, domain_user_data_picard, db_session):
         # GIVEN
         service = UserService()
@@ -52,7 +79,9 @@ class TestUserService:
         # WHEN
         email = 'captain-picard@startrek.com'
         password = 'ABC123abc'
-        updated_user = service.update_user(uuid=new_user.uuid, email=email, password=password)
+        updated_user = service.update_user(
+            uuid=new_user.uuid, email=email, password=password
+        )
 
         assert isinstance(updated_user, User)
         assert isinstance(updated_user.uuid, UUID)
@@ -68,7 +97,9 @@ class TestUserService:
         password = 'ABC123abc'
         non_existing_uuid = uuid4()
         with pytest.raises(ValueError) as exception_instance:
-            _ = service.update_user(uuid=non_existing_uuid, email=email, password=password)
+            _ = service.update_user(
+                uuid=non_existing_uuid, email=email, password=password
+            )
 
         assert exception_instance.type is ValueError
         expected_exception_value = f'User not found (uuid="{non_existing_uuid}")'
@@ -100,3 +131,32 @@ class TestUserService:
         assert exception_instance.type is ValueError
         expected_exception_value = f'User not found (uuid="{non_existing_uuid}")'
         assert exception_instance.value.args[0] == expected_exception_value
+
+    def test_bulk_upsert_users_creates_and_updates(
+        self, domain_user_data_picard, db_session
+    ):
+        # GIVEN
+        service = UserService()
+        existing_user = service.register_user(**domain_user_data_picard)
+
+        # WHEN
+        users = service.bulk_upsert_users(
+            [
+                {
+                    'username': 'riker',
+                    'email': Email('riker@enterprise.org'),
+                    'password': 'number-one',
+                },
+                {
+                    'username': 'picard',
+                    'email': Email('captain@enterprise.org'),
+                    'password': 'make-it-so',
+                },
+            ]
+        )
+
+        # THEN
+        assert [user.username for user in users] == ['riker', 'picard']
+        assert users[1].uuid == existing_user.uuid
+        assert users[1].email.address == 'captain@enterprise.org'
+        assert users[1].check_password(password='make-it-so') is True